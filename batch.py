@@ -0,0 +1,182 @@
+"""
+Batch mode: lex and parse many .cat files in a process pool.
+
+    python batch.py src/ "tests/**/*.cat" --workers 8 --chunksize 16 --output-dir out
+
+Every file gets <name>.tokens.csv and <name>.errors.csv in the output directory
+(same layout as main() writes), and all syntax errors are collected into one
+report CSV with the file each came from. Lexer warnings are captured per file
+instead of being printed from the workers.
+
+With --cache, results are looked up in a result_cache.ResultCache by file
+content first; a hit skips the lexer and Parser entirely. --max-errors N stops
+each file's parse after its first N syntax errors (a cached full result is cut
+to the same N, and budgeted results are not stored).
+"""
+import argparse
+import contextlib
+import csv
+import glob
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from main import LEXER_ENGINES, analyze, lex_file, write_errors_to_csv, write_tokens_to_csv
+
+# One open ResultCache per (path, max bytes) in each worker process
+_caches = {}
+
+
+def collect_files(patterns):
+    """Expands directories (recursively), globs and plain paths into a sorted list of .cat files."""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files.update(glob.glob(os.path.join(pattern, "**", "*.cat"), recursive=True))
+        elif glob.has_magic(pattern):
+            files.update(path for path in glob.glob(pattern, recursive=True) if path.endswith(".cat"))
+        else:
+            files.add(pattern)
+    return sorted(files)
+
+
+def output_stem(path, output_dir, root):
+    """Output path prefix for `path`: its path relative to `root`, with separators flattened."""
+    relative = os.path.relpath(os.path.abspath(path), root)
+    name = relative[:-len(".cat")].replace(os.sep, "__")
+    return os.path.join(output_dir, name)
+
+
+def _open_cache(cache_path, cache_size):
+    from result_cache import DEFAULT_MAX_BYTES, ResultCache
+    key = (cache_path, cache_size)
+    if key not in _caches:
+        _caches[key] = ResultCache(cache_path, DEFAULT_MAX_BYTES if cache_size is None else cache_size)
+    return _caches[key]
+
+
+def process_file(path, output_dir, root, engine, cache_path=None, cache_size=None, max_errors=None):
+    """
+    Lexes and parses one file (runs in a worker process), or takes the result from the cache.
+    Returns a dict with the file name, token count, errors, warnings, any failure message,
+    whether it was a cache hit and the seconds the lex and parse took (or saved, on a hit).
+    """
+    result = {"file": path, "tokens": 0, "errors": [], "warnings": [], "failure": None,
+              "cached": False, "seconds": 0.0}
+    captured = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(captured):
+            stem = output_stem(path, output_dir, root) if output_dir else None
+            cache = key = hit = None
+            if cache_path:
+                from result_cache import file_key
+                cache = _open_cache(cache_path, cache_size)
+                key = file_key(path)
+                saved_before = cache.saved_seconds
+                hit = cache.get(key)
+            if hit:
+                tokens, result["warnings"], errors = hit
+                result["errors"] = errors if max_errors is None else errors[:max_errors]
+                result["tokens"] = len(tokens)
+                result["cached"] = True
+                result["seconds"] = cache.saved_seconds - saved_before
+                if stem:
+                    write_tokens_to_csv(tokens, f"{stem}.tokens.csv")
+                    write_errors_to_csv(result["errors"], f"{stem}.errors.csv")
+                return result
+            started = time.perf_counter()
+            tokens = lex_file(path, engine)
+            result["warnings"] = captured.getvalue().splitlines()
+            result["tokens"] = len(tokens)
+            _, result["errors"] = analyze(tokens, stem and f"{stem}.tokens.csv", stem and f"{stem}.errors.csv",
+                                          max_errors)
+            result["seconds"] = time.perf_counter() - started
+            if cache is not None and max_errors is None:
+                cache.put(key, tokens, result["warnings"], result["errors"], result["seconds"])
+    except Exception as e:
+        result["failure"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def run_batch(files, output_dir=None, workers=None, chunksize=1, engine="reference", cache_path=None,
+              cache_size=None, max_errors=None):
+    """Processes `files` in a pool of `workers` processes and returns their results in input order."""
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    root = os.path.commonpath([os.path.abspath(os.path.dirname(path)) for path in files]) if files else os.getcwd()
+    count = len(files)
+    if workers == 1:
+        return [process_file(path, output_dir, root, engine, cache_path, cache_size, max_errors) for path in files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(process_file, files, [output_dir] * count, [root] * count, [engine] * count,
+                             [cache_path] * count, [cache_size] * count, [max_errors] * count,
+                             chunksize=chunksize))
+
+
+def write_report(results, filename):
+    """Writes one CSV with every error, lexer warning and failure of the batch, tagged with its file."""
+    total_errors = 0
+    with open(filename, mode="w", newline="", encoding="utf-8") as report:
+        writer = csv.writer(report)
+        writer.writerow(["File", "Error Message"])
+        for result in results:
+            if result["failure"]:
+                writer.writerow([result["file"], f"❌ Failed: {result['failure']}"])
+            for warning in result["warnings"]:
+                writer.writerow([result["file"], warning])
+            for error in result["errors"]:
+                writer.writerow([result["file"], error])
+            total_errors += len(result["errors"])
+        writer.writerow([f"Total Files: {len(results)}", f"Total Errors: {total_errors}"])
+    return total_errors
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Lex and parse .cat files in parallel.")
+    arg_parser.add_argument("paths", nargs="+", help="directories, globs or .cat files")
+    arg_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    arg_parser.add_argument("--chunksize", type=int, default=8, help="files sent to a worker at a time")
+    arg_parser.add_argument("--output-dir", default=None, help="where to write per-file token and error CSVs")
+    arg_parser.add_argument("--report", default="batch_errors.csv", help="aggregated error report CSV")
+    arg_parser.add_argument("--engine", choices=LEXER_ENGINES, default="reference", help="lexer engine")
+    arg_parser.add_argument("--max-errors", type=int, default=None, metavar="N",
+                            help="stop parsing a file after its first N syntax errors")
+    arg_parser.add_argument("--cache", nargs="?", const="", default=None, metavar="PATH",
+                            help="reuse results from a content-keyed cache (default path: $CATHARSIS_CACHE "
+                                 "or .catharsis_cache/results.sqlite)")
+    arg_parser.add_argument("--cache-size", type=int, default=None, metavar="MB", help="cache size limit in MB")
+    args = arg_parser.parse_args(argv)
+
+    files = collect_files(args.paths)
+    if not files:
+        print("No .cat files found.")
+        return 1
+
+    cache_path = cache_size = None
+    if args.cache is not None:
+        from result_cache import DEFAULT_CACHE_PATH
+        cache_path = args.cache or DEFAULT_CACHE_PATH
+        cache_size = args.cache_size and args.cache_size * 1024 * 1024
+
+    started = time.perf_counter()
+    results = run_batch(files, args.output_dir, args.workers, args.chunksize, args.engine, cache_path, cache_size,
+                        args.max_errors)
+    elapsed = time.perf_counter() - started
+
+    total_errors = write_report(results, args.report)
+    failures = sum(1 for result in results if result["failure"])
+    tokens = sum(result["tokens"] for result in results)
+    print(f"Processed {len(files)} files ({tokens:,} tokens) in {elapsed:.2f}s: "
+          f"{total_errors} errors, {failures} failures. Report written to {args.report}")
+    if cache_path:
+        hits = [result for result in results if result["cached"]]
+        saved = sum(result["seconds"] for result in hits)
+        print(f"Cache {cache_path}: {len(hits)} hits, {len(results) - len(hits) - failures} misses, "
+              f"about {saved:.2f}s of lexing and parsing saved")
+    return 1 if total_errors or failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
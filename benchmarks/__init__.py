@@ -0,0 +1,5 @@
+"""
+Benchmarks for the Catharsis lexer and parser.
+
+Run them from the repository root, e.g. python -m benchmarks.stream_memory
+"""
@@ -0,0 +1,232 @@
+"""
+Generator for synthetic .cat programs that Parser accepts.
+
+Programs are a sequence of `int main() { ... }` functions built from the
+statements Parser knows: declarations, printf, gc() blocks, if/else, for
+loops, `x--;`, return and // comments (Parser treats /* */ as an unexpected
+statement, so block comments are not generated). Knobs:
+
+    size             approximate output size in bytes
+    depth            how deep if/else, for and gc() blocks may nest
+    comment_density  probability of a // comment before each statement
+    error_rate       probability that a declaration or printf gets one syntax error injected
+    constant_rate    probability that an if condition is constant: two literals (`1 == 2`) or
+                     a variable compared with itself (`x >= x`), as generated code has them
+    runnable         only use names declared in scope, with values, printf arguments and
+                     conditions of matching types and loops of at most 3 iterations, so the VM
+                     (vm.py) compiles and runs each main; declarations then also use compound
+                     operators and other variables, for the optimizer (optimizer.py) to fold and
+                     remove
+
+With error_rate=0 the output parses without errors. Generation is
+deterministic for a given seed.
+
+    python -m benchmarks.corpus out.cat --size 4M --depth 4 --comments 0.2 --errors 0.01 --constants 0.3
+    python -m benchmarks.corpus out.cat --size 4K --runnable --constants 0.3
+"""
+import argparse
+import random
+import re
+
+from benchmarks.stream_memory import parse_size
+
+# Type keywords Parser accepts at the start of a declaration, with a value of that type
+_TYPES = {
+    "int": lambda rng: str(rng.randrange(1000)),
+    "float": lambda rng: f"{rng.randrange(100)}.{rng.randrange(1, 100)}",
+    "double": lambda rng: f"{rng.randrange(100)}.{rng.randrange(1, 10 ** 8)}",
+    "string": lambda rng: f'"text {rng.randrange(1000)}"',
+    "char": lambda rng: f"'{rng.choice('abcxyz')}'",
+}
+_REL_OPS = ["==", "!=", "<", ">", "<=", ">="]
+_NUMERIC = {"int", "float", "double"}
+_COUNTER = "counter"  # runnable: type of a for loop's variable, an int the body never decrements
+_COMPOUND_OPS = ["+=", "-=", "*=", "/=", "%="]
+_WORDS = ["value", "total", "count", "done", "next", "result", "check", "loop"]
+_IDENTIFIERS = [f"{word}{index}" for word in _WORDS for index in range(8)]
+_TIGHT = [(re.compile(r" ([,;)]|\+\+|--)"), r"\1"), (re.compile(r"\( "), "("), (re.compile(r"(printf|gc) \("), r"\1(")]
+
+
+def _render(parts):
+    """Joins statement parts with C-style spacing: `printf("x", a);`, `for (i = 0; i < 3; i++)`."""
+    text = " ".join(parts)
+    for pattern, replacement in _TIGHT:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class _Generator:
+
+    def __init__(self, depth, comment_density, error_rate, seed, constant_rate=0.0, runnable=False):
+        self.depth = depth
+        self.comment_density = comment_density
+        self.error_rate = error_rate
+        self.constant_rate = constant_rate
+        self.runnable = runnable
+        self.rng = random.Random(seed)
+        self.lines = []
+        self.scopes = [{}]  # runnable: name -> type of each name declared, innermost scope last
+
+    def identifier(self, types=None):
+        """A name; when runnable, a visible one of one of `types` (any type if None), or None if there is none."""
+        if not self.runnable:
+            return self.rng.choice(_IDENTIFIERS)
+        visible = {}
+        for scope in self.scopes:
+            visible.update(scope)
+        names = [name for name, type_name in visible.items() if types is None or type_name in types]
+        return self.rng.choice(sorted(names)) if names else None
+
+    def emit(self, level, text):
+        if self.rng.random() < self.comment_density:
+            self.lines.append(f"{'    ' * level}// {self.rng.choice(_WORDS)} {self.rng.choice(_WORDS)}")
+        self.lines.append(f"{'    ' * level}{text}")
+
+    def faulty(self, parts):
+        """
+        Joins statement parts, dropping or breaking one between the leading keyword and the
+        closing ";" when an error is injected. Only declarations and printf go through here:
+        Parser recovers from those within the statement, while a broken block header, `x--`,
+        return, keyword or ";" can make it skip past a `}` and leave an `else` at statement
+        level, which Parser never gets past.
+        """
+        if len(parts) > 2 and self.rng.random() < self.error_rate:
+            index = self.rng.randrange(1, len(parts) - 1)
+            if self.rng.random() < 0.5:
+                del parts[index]
+            else:
+                parts[index] = "?"
+        return _render(parts)
+
+    def declaration(self, level):
+        type_name = self.rng.choice(list(_TYPES))
+        if self.runnable:
+            return self.emit(level, _render(self.runnable_declaration(type_name)))
+        parts = [type_name]
+        for index in range(self.rng.randint(1, 3)):
+            if index:
+                parts.append(",")
+            parts.append(self.identifier())
+            if self.rng.random() < 0.7:
+                parts += ["=", _TYPES[type_name](self.rng)]
+        self.emit(level, self.faulty(parts + [";"]))
+
+    def runnable_declaration(self, type_name):
+        """Declaration parts of new names in the innermost scope, valued from literals or variables of the type."""
+        scope, parts = self.scopes[-1], [type_name]
+        for name in self.rng.sample([name for name in _IDENTIFIERS if name not in scope], self.rng.randint(1, 3)):
+            if len(parts) > 1:
+                parts.append(",")
+            parts.append(name)
+            if self.rng.random() < 0.7:
+                operator = self.rng.choice(_COMPOUND_OPS) if type_name in _NUMERIC and \
+                    self.rng.random() < 0.3 else "="
+                readable = {type_name, _COUNTER} if type_name == "int" else {type_name}
+                value = self.identifier(readable) if self.rng.random() < 0.3 else None
+                parts += [operator, value or _TYPES[type_name](self.rng)]
+            scope[name] = type_name
+        return parts + [";"]
+
+    def printf(self, level):
+        if self.runnable:
+            name = self.identifier({"int", _COUNTER})
+            if name and self.rng.random() < 0.5:
+                return self.emit(level, f'printf("{self.rng.choice(_WORDS)} is %d\\n", {name});')
+            return self.emit(level, f'printf("{self.rng.choice(_WORDS)}\\n");')
+        parts = ["printf", "(", f'"{self.rng.choice(_WORDS)} is"']
+        for _ in range(self.rng.randrange(3)):
+            parts += [",", self.identifier()]
+        self.emit(level, self.faulty(parts + [")", ";"]))
+
+    def decrement(self, level):
+        name = self.identifier({"int"})
+        if name is None:
+            return self.printf(level)
+        self.emit(level, f"{name}--;")
+
+    def block(self, level, header, names=None):
+        self.emit(level, _render(header) + " {")
+        self.scopes.append(dict(names or {}))
+        self.statements(level + 1, self.rng.randint(1, 4))
+        self.scopes.pop()
+        self.lines.append(f"{'    ' * level}}}")
+
+    def if_else(self, level):
+        name = self.identifier(_NUMERIC | {_COUNTER}) or "0"
+        condition = [name, self.rng.choice(_REL_OPS), str(self.rng.randrange(100))]
+        if self.constant_rate and self.rng.random() < self.constant_rate:
+            if self.rng.random() < 0.5:
+                condition[0], condition[2] = str(self.rng.randrange(3)), str(self.rng.randrange(3))
+            else:
+                condition[2] = condition[0]
+        self.block(level, ["if", "(", *condition, ")"])
+        if self.rng.random() < 0.5:
+            self.lines[-1] += " else {"
+            self.scopes.append({})
+            self.statements(level + 1, self.rng.randint(1, 3))
+            self.scopes.pop()
+            self.lines.append(f"{'    ' * level}}}")
+
+    def for_loop(self, level):
+        name = self.rng.choice("ijk")
+        limit = self.rng.randint(1, 3 if self.runnable else 100)
+        self.block(level, ["for", "(", "int", name, "=", "0", ";", name, "<", str(limit), ";", name, "++", ")"],
+                   {name: _COUNTER})
+
+    def gc(self, level):
+        self.block(level, ["gc", "(", ")"])
+
+    def statements(self, level, count):
+        simple = [self.declaration] * 5 + [self.printf] * 3 + [self.decrement]
+        nested = [self.if_else] * 2 + [self.for_loop, self.gc]
+        for _ in range(count):
+            if level < self.depth + 1 and self.rng.random() < 0.25:
+                self.rng.choice(nested)(level)
+            else:
+                self.rng.choice(simple)(level)
+
+    def program(self, size):
+        written = 0
+        while written < size:
+            start = len(self.lines)
+            self.lines.append("int main() {")
+            self.scopes = [{}]
+            self.statements(1, self.rng.randint(5, 20))
+            self.emit(1, "return 0;")
+            self.lines.append("}")
+            written += sum(len(line) + 1 for line in self.lines[start:])
+        return "\n".join(self.lines) + "\n"
+
+
+def generate(size, depth=3, comment_density=0.1, error_rate=0.0, seed=0, constant_rate=0.0, runnable=False):
+    """Returns a synthetic .cat program of at least `size` bytes."""
+    return _Generator(depth, comment_density, error_rate, seed, constant_rate, runnable).program(size)
+
+
+def write_corpus(path, size, depth=3, comment_density=0.1, error_rate=0.0, seed=0, constant_rate=0.0,
+                 runnable=False):
+    """Writes generate(...) to `path` and returns the number of characters written."""
+    text = generate(size, depth, comment_density, error_rate, seed, constant_rate, runnable)
+    with open(path, "w") as file:
+        file.write(text)
+    return len(text)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("output", help=".cat file to write")
+    arg_parser.add_argument("--size", default="1M", help="approximate size, e.g. 64K, 4M")
+    arg_parser.add_argument("--depth", type=int, default=3, help="maximum block nesting depth")
+    arg_parser.add_argument("--comments", type=float, default=0.1, help="comment density (0-1)")
+    arg_parser.add_argument("--errors", type=float, default=0.0, help="error injection rate per statement (0-1)")
+    arg_parser.add_argument("--seed", type=int, default=0, help="random seed")
+    arg_parser.add_argument("--constants", type=float, default=0.0, help="constant if-condition rate (0-1)")
+    arg_parser.add_argument("--runnable", action="store_true", help="generate programs the VM can run")
+    args = arg_parser.parse_args()
+    written = write_corpus(args.output, parse_size(args.size), args.depth, args.comments, args.errors, args.seed,
+                           args.constants, args.runnable)
+    print(f"Wrote {written:,} characters to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
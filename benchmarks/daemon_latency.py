@@ -0,0 +1,69 @@
+"""
+Round-trip time of a daemon parse request against starting a process per file.
+
+Starts daemon.py on a temporary Unix socket, sends --requests parse requests
+for a small program and reports latency percentiles, then times a few runs of
+`python cli.py` on the same program for comparison.
+
+    python -m benchmarks.daemon_latency --requests 5000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.stream_memory import BLOCK
+from daemon import DaemonClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, percent):
+    return sorted_values[min(len(sorted_values) - 1, len(sorted_values) * percent // 100)]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--requests", type=int, default=5000, help="daemon requests to time")
+    arg_parser.add_argument("--processes", type=int, default=5, help="cli.py runs to time")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "daemon.sock")
+        source = os.path.join(directory, "small.cat")
+        with open(source, "w") as file:
+            file.write(BLOCK)
+
+        daemon = subprocess.Popen([sys.executable, os.path.join(ROOT, "daemon.py"), "--socket", path],
+                                  stderr=subprocess.DEVNULL)
+        try:
+            while not os.path.exists(path):
+                time.sleep(0.01)
+            with DaemonClient(path) as client:
+                latencies = []
+                for _ in range(args.requests):
+                    started = time.perf_counter()
+                    client.call("parse", text=BLOCK)
+                    latencies.append(time.perf_counter() - started)
+                client.call("shutdown")
+        finally:
+            daemon.wait(timeout=10)
+
+        process_seconds = []
+        for _ in range(args.processes):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(ROOT, "cli.py"), source, "--no-tokens"],
+                           stdout=subprocess.DEVNULL)
+            process_seconds.append(time.perf_counter() - started)
+
+    latencies.sort()
+    print(f"Input: {len(BLOCK)} characters")
+    print(f"Daemon round trip:  p50 {percentile(latencies, 50) * 1000:7.3f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:7.3f} ms")
+    print(f"Process per file:   mean {sum(process_seconds) / len(process_seconds) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Parse time of deeply nested programs with Parser and StackParser.
+
+Builds `int main() { ... }` with if/else, for and gc() blocks nested --depth
+levels deep (a declaration in every block, a syntax error in every else and
+at the innermost level so recovery is exercised; Parser drops the errors of
+blocks inside a for loop, so only the outermost else reports one), then
+parses it with the recursive Parser, which runs out of stack past a few
+hundred levels, and with StackParser. For the depths both can handle, their
+errors are checked to be identical.
+
+    python -m benchmarks.deep_nesting --depths 100 1000 10000 100000
+"""
+import argparse
+import time
+
+from dfa_lexer import lexer
+from parser import Parser
+from stack_parser import StackParser
+
+_OPENERS = [
+    ("if (depth{0} > 1) {{", "}} else {{\nint other{0} = {0};\nint = ;\n}}"),
+    ("for (int i = 0; i < {0}; i++) {{", "}}"),
+    ("gc() {{", "}}"),
+]
+
+
+def nested_program(depth):
+    """A main function with blocks nested `depth` levels deep and syntax errors along the way."""
+    lines = ["int main() {"]
+    closers = []
+    for level in range(depth):
+        opener, closer = _OPENERS[level % len(_OPENERS)]
+        lines.append(opener.format(level))
+        lines.append(f"int depth{level} = {level};")
+        closers.append(closer.format(level))
+    lines.append("int = ;")
+    lines.extend(reversed(closers))
+    lines.append("return 0;")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def parse(parser_class, tokens):
+    """All errors and the wall time of one full parse; errors is None on RecursionError."""
+    started = time.perf_counter()
+    parser = parser_class(tokens)
+    errors = []
+    try:
+        while parser.current_token():
+            errors.extend(parser.parse_statement() or [])
+    except RecursionError:
+        errors = None
+    return errors, time.perf_counter() - started
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--depths", type=int, nargs="+", default=[100, 1000, 10000, 100000],
+                            help="nesting depths to parse")
+    args = arg_parser.parse_args()
+
+    print(f"{'depth':>8} {'tokens':>10} {'Parser s':>10} {'StackParser s':>14} {'tokens/s':>12} {'errors':>7}")
+    for depth in args.depths:
+        tokens = lexer(nested_program(depth))
+        recursive_errors, recursive_seconds = parse(Parser, tokens)
+        stack_errors, stack_seconds = parse(StackParser, tokens)
+        if recursive_errors is not None and recursive_errors != stack_errors:
+            raise SystemExit(f"❌ Parser and StackParser disagree at depth {depth}")
+        recursive_text = "recursion" if recursive_errors is None else f"{recursive_seconds:.3f}"
+        print(f"{depth:>8,} {len(tokens):>10,} {recursive_text:>10} {stack_seconds:>14.3f} "
+              f"{len(tokens) / stack_seconds:>12,.0f} {len(stack_errors):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Cost of syntax errors: Diagnostic records against message strings, and --max-errors.
+
+Parses a generated corpus in which every statement has an injected error
+(benchmarks.corpus, --errors 1.0 by default), best of --repeat, with no error
+budget and with each --budgets value, and reports the parse time, the peak
+traced memory (tracemalloc) and the errors returned. It then compares the
+bytes the unbudgeted error list holds as Diagnostic records with the same
+errors as message strings (what Parser used to collect), and times building
+those strings, which is what writing the errors costs on top of parsing.
+
+    python -m benchmarks.error_budget --size 4M --budgets 1 100 1000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate
+from benchmarks.stream_memory import parse_size
+from dfa_lexer import lexer
+from main import parse_tokens
+
+
+def best_of(repeat, function, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def traced(function, *args):
+    """Peak bytes allocated while `function` runs and the bytes its result still holds."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = function(*args)
+        current, peak = tracemalloc.get_traced_memory()
+        return peak, current, result
+    finally:
+        tracemalloc.stop()
+
+
+def messages(errors):
+    return [str(error) for error in errors]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--size", default="4M", help="corpus size, e.g. 512K, 4M")
+    arg_parser.add_argument("--errors", type=float, default=1.0, help="error injection rate per statement (0-1)")
+    arg_parser.add_argument("--budgets", type=int, nargs="+", default=[1, 100, 10000], metavar="N",
+                            help="--max-errors values to compare")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement (best is reported)")
+    args = arg_parser.parse_args()
+
+    tokens = lexer(generate(parse_size(args.size), error_rate=args.errors))
+    print(f"Corpus: {len(tokens):,} tokens")
+    print(f"{'budget':>8} {'parse s':>8} {'tokens/s':>12} {'peak MB':>8} {'errors':>8}")
+    for budget in [None] + args.budgets:
+        seconds, errors = best_of(args.repeat, parse_tokens, tokens, None, budget)
+        peak = traced(parse_tokens, tokens, None, budget)[0]
+        print(f"{'none' if budget is None else budget:>8} {seconds:>8.3f} {len(tokens) / seconds:>12,.0f} "
+              f"{peak / (1 << 20):>8.1f} {len(errors):>8,}")
+
+    errors = traced(parse_tokens, tokens)[2]
+    if not errors:
+        return
+    record_bytes = traced(parse_tokens, tokens)[1]
+    text_seconds, text = best_of(args.repeat, messages, errors)
+    text_bytes = traced(messages, errors)[1]
+    del text
+    print(f"{len(errors):,} errors: parse retains {record_bytes / len(errors):.0f} bytes per error with "
+          f"Diagnostic records; the message strings alone take {text_bytes / len(errors):.0f} bytes per error "
+          f"and {text_seconds:.3f} s to build")
+
+
+if __name__ == "__main__":
+    main()
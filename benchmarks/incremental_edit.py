@@ -0,0 +1,49 @@
+"""
+Latency of one-line edits with IncrementalLexer against a full re-lex.
+
+Builds a document of about --lines lines from the sample program, then types
+into random lines (insert a character, delete it again) and reports the median
+and worst edit time next to the time of lexing the whole document.
+
+    python -m benchmarks.incremental_edit --lines 100000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks.stream_memory import BLOCK
+from dfa_lexer import lexer
+from incremental_lexer import IncrementalLexer
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--lines", type=int, default=100000, help="approximate document size in lines")
+    arg_parser.add_argument("--edits", type=int, default=2000, help="number of edits to time")
+    args = arg_parser.parse_args()
+
+    text = BLOCK * max(1, args.lines // BLOCK.count("\n"))
+    started = time.perf_counter()
+    lexer(text)
+    full = time.perf_counter() - started
+
+    incremental = IncrementalLexer(text)
+    line_starts = [0] + [index + 1 for index, char in enumerate(text) if char == "\n"][:-1]
+    rng = random.Random(0)
+    timings = []
+    for _ in range(args.edits // 2):
+        offset = rng.choice(line_starts) + 4
+        for start, end, new_text in ((offset, offset, "x"), (offset, offset + 1, "")):
+            started = time.perf_counter()
+            incremental.edit(start, end, new_text)
+            timings.append(time.perf_counter() - started)
+
+    print(f"Document: {text.count(chr(10)):,} lines, {len(incremental):,} tokens")
+    print(f"Full re-lex:      {full * 1000:10.2f} ms")
+    print(f"Edit (median):    {statistics.median(timings) * 1e6:10.1f} us")
+    print(f"Edit (max):       {max(timings) * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Reparse time with IncrementalParser after a one-statement edit.
+
+Lexes --blocks copies of the sample program, parses them once to fill the
+cache, then repeatedly changes one declaration in a random copy, re-lexes and
+times a full Parser run against IncrementalParser.parse() on the new tokens.
+
+    python -m benchmarks.incremental_parse --blocks 2000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.stream_memory import BLOCK
+from dfa_lexer import lexer
+from incremental_parser import IncrementalParser
+from parser import Parser
+
+
+def full_parse(tokens):
+    parser = Parser(tokens)
+    errors = []
+    while parser.current_token():
+        errors.extend(parser.parse_statement() or [])
+    return errors
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--blocks", type=int, default=2000, help="copies of the sample program")
+    arg_parser.add_argument("--edits", type=int, default=10, help="number of edits to time")
+    args = arg_parser.parse_args()
+
+    blocks = [BLOCK] * args.blocks
+    incremental = IncrementalParser()
+    incremental.parse(lexer("".join(blocks)))
+    rng = random.Random(0)
+    full_seconds = incremental_seconds = 0.0
+    for edit in range(args.edits):
+        index = rng.randrange(args.blocks)
+        blocks[index] = BLOCK.replace("int a = 5", f"int a = {edit}" if edit % 2 else "int a = ;")
+        tokens = lexer("".join(blocks))
+
+        started = time.perf_counter()
+        expected = full_parse(tokens)
+        full_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        errors = incremental.parse(tokens)
+        incremental_seconds += time.perf_counter() - started
+        assert errors == expected
+
+    print(f"Tokens: {len(tokens):,}  statements reused on the last parse: {incremental.hits:,}, "
+          f"parsed: {incremental.misses:,}")
+    print(f"Full parse:        {full_seconds / args.edits * 1000:10.2f} ms")
+    print(f"Incremental parse: {incremental_seconds / args.edits * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+What optimizer.optimize() removes from generated programs, and what it saves the passes after it.
+
+For each --constants rate, generates a corpus (benchmarks.corpus) in which
+that fraction of the if conditions is constant, parses it, and runs
+optimize(), best of --repeat. Reports the optimization time, the share of
+statements and tokens eliminated with the counts of its Report, and then
+the time of semantic.check() and of statements() (nodes) on the parsed
+tree and after optimizing it: the work every later pass is spared.
+
+Before that, checks that optimizing changes nothing a program does: for
+each rate, --programs runnable corpora (one main each) are compiled and
+run with the VM (vm.py) as parsed and after optimize(), and the printed
+output and the return value or runtime error must be the same.
+
+    python -m benchmarks.optimizer_gain --size 4M --constants 0 0.25 0.5
+"""
+import argparse
+import io
+import time
+
+from benchmarks.corpus import generate
+from benchmarks.stream_memory import parse_size
+from dfa_lexer import lexer
+from optimizer import optimize
+from parser import Parser
+from semantic import check
+from vm import ExecutionError, compile_program, run
+
+
+def parse(tokens):
+    parser = Parser(tokens)
+    while parser.current_token():
+        parser.parse_statement()
+    return parser.tree
+
+
+def execute(tree):
+    """What running a parsed program with the VM does: (printed output, return value or runtime error)."""
+    program, diagnostics = compile_program(tree)
+    if program is None:
+        raise SystemExit("\n".join(str(diagnostic) for diagnostic in diagnostics))
+    out = io.StringIO()
+    try:
+        result = run(program, out)
+    except ExecutionError as error:
+        result = str(error)
+    return out.getvalue(), result
+
+
+def verify(rate, count, depth):
+    """Runs `count` runnable programs with and without optimize(); returns the share of their tokens eliminated."""
+    tokens = left = 0
+    for seed in range(count):
+        tree = parse(lexer(generate(2048, depth, seed=seed, constant_rate=rate, runnable=True)))
+        optimized, report = optimize(tree)
+        before, after = execute(tree), execute(optimized)
+        if before != after:
+            raise SystemExit(f"❌ Optimizing the runnable corpus of seed {seed} at constant rate {rate} changed "
+                             f"what it does: {before!r} became {after!r}")
+        tokens, left = tokens + report.tokens, left + report.tokens_left
+    return 1 - left / tokens if tokens else 0.0
+
+
+def best_of(repeat, function, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--size", default="1M", help="corpus size, e.g. 512K, 4M")
+    arg_parser.add_argument("--depth", type=int, default=3, help="maximum block nesting depth")
+    arg_parser.add_argument("--constants", type=float, nargs="+", default=[0.0, 0.25, 0.5], metavar="RATE",
+                            help="constant if-condition rates to compare")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement (best is reported)")
+    arg_parser.add_argument("--programs", type=int, default=200,
+                            help="runnable programs per rate run with and without optimizing (0 to skip)")
+    args = arg_parser.parse_args()
+
+    if args.programs:
+        for rate in args.constants:
+            eliminated = verify(rate, args.programs, args.depth)
+            print(f"constants {rate:.2f}: {args.programs} runnable programs do the same after optimizing "
+                  f"({eliminated:.1%} of their tokens eliminated)")
+
+    print(f"{'constants':>9} {'tokens':>10} {'optimize s':>10} {'statements':>11} {'tokens':>7} {'branches':>8} "
+          f"{'variables':>9} {'check s':>8} {'after':>6} {'nodes s':>8} {'after':>6}")
+    for rate in args.constants:
+        tokens = lexer(generate(parse_size(args.size), args.depth, constant_rate=rate))
+        tree = parse(tokens)
+        optimize_seconds, (optimized, report) = best_of(args.repeat, optimize, tree)
+        check_before = best_of(args.repeat, check, tree)[0]
+        check_after = best_of(args.repeat, check, optimized)[0]
+        nodes_before = best_of(args.repeat, tree.statements)[0]
+        nodes_after = best_of(args.repeat, optimized.statements)[0]
+        print(f"{rate:>9.2f} {len(tokens):>10,} {optimize_seconds:>10.3f} "
+              f"{1 - report.records_left / report.records:>10.1%} {report.eliminated:>7.1%} {report.branches:>8,} "
+              f"{report.variables:>9,} {check_before:>8.3f} {check_after:>6.3f} {nodes_before:>8.3f} {nodes_after:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Speedup of parallel_lex() over lexer() on one large source, by worker count.
+
+    python -m benchmarks.parallel_lexing --blocks 50000 --workers 1,2,4,8
+"""
+import argparse
+import os
+import time
+
+from benchmarks.stream_memory import BLOCK
+from dfa_lexer import lexer
+from parallel_lexer import parallel_lex
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--blocks", type=int, default=50000, help="copies of the sample program")
+    arg_parser.add_argument("--workers", default=None, help="comma-separated worker counts (default: 1,2,4.. up to CPU count)")
+    args = arg_parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    if args.workers:
+        counts = [int(count) for count in args.workers.split(",")]
+    else:
+        counts = [1 << power for power in range(cpus.bit_length()) if 1 << power <= cpus]
+
+    source = BLOCK * args.blocks
+    started = time.perf_counter()
+    expected = lexer(source)
+    serial = time.perf_counter() - started
+    print(f"Source: {len(source) / (1 << 20):.1f} MB, {len(expected):,} tokens, {cpus} CPUs")
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8}")
+    print(f"{'serial':>8} {serial:>9.2f} {1.0:>8.2f}")
+    for count in counts:
+        started = time.perf_counter()
+        tokens = parallel_lex(source, workers=count, parts=max(2, count))
+        elapsed = time.perf_counter() - started
+        assert tokens == expected
+        print(f"{count:>8} {elapsed:>9.2f} {serial / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Time of the semantic pass next to lexing and parsing, at growing sizes.
+
+For each --sizes corpus (benchmarks.corpus) lexes it with dfa_lexer, parses
+it with Parser and runs semantic.check() on the tree, best of --repeat, and
+reports each phase's seconds, check()'s nanoseconds per token (flat across
+sizes when the pass is linear) and how many scopes, symbols and findings
+it produced.
+
+    python -m benchmarks.semantic_cost --sizes 1M 2M 4M 8M --depth 6
+"""
+import argparse
+import time
+
+from benchmarks.corpus import generate
+from benchmarks.stream_memory import parse_size
+from dfa_lexer import lexer
+from parser import Parser
+from semantic import check
+
+
+def parse(tokens):
+    parser = Parser(tokens)
+    while parser.current_token():
+        parser.parse_statement()
+    return parser.tree
+
+
+def best_of(repeat, function, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--sizes", nargs="+", default=["1M", "2M", "4M"], help="corpus sizes, e.g. 512K 4M")
+    arg_parser.add_argument("--depth", type=int, default=3, help="maximum block nesting depth")
+    arg_parser.add_argument("--errors", type=float, default=0.0, help="error injection rate per statement (0-1)")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement (best is reported)")
+    args = arg_parser.parse_args()
+
+    print(f"{'size':>6} {'tokens':>10} {'lex s':>7} {'parse s':>8} {'check s':>8} {'check/lex':>9} "
+          f"{'ns/token':>8} {'scopes':>8} {'symbols':>8} {'findings':>8}")
+    for size in args.sizes:
+        text = generate(parse_size(size), args.depth, error_rate=args.errors)
+        lex_seconds, tokens = best_of(args.repeat, lexer, text)
+        parse_seconds, tree = best_of(args.repeat, parse, tokens)
+        check_seconds, (table, diagnostics) = best_of(args.repeat, check, tree)
+        print(f"{size:>6} {len(tokens):>10,} {lex_seconds:>7.3f} {parse_seconds:>8.3f} {check_seconds:>8.3f} "
+              f"{check_seconds / lex_seconds:>9.2f} {check_seconds / len(tokens) * 1e9:>8.0f} "
+              f"{len(table.scope_kinds):>8,} {len(table):>8,} {len(diagnostics):>8,}")
+
+
+if __name__ == "__main__":
+    main()
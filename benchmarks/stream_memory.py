@@ -0,0 +1,121 @@
+"""
+Peak memory of the streaming lexer on large synthetic .cat files.
+
+Each size is lexed in a fresh interpreter so ru_maxrss is the peak of that run
+alone. With iter_tokens() the peak should stay flat as the input grows; pass
+--whole to also measure file.read() + lexer() for comparison (small sizes only)
+and --mmap for the byte-level lexer over a memory map (mmap_lexer.lex_mmap).
+
+    python -m benchmarks.stream_memory --sizes 16M,128M,1G
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# One block of generated code: declarations, comments, strings and nested blocks
+BLOCK = """int main() {
+    int a = 5, b = 10;
+    float ratio = 0.125;
+    double precise = 3.14159265;
+    /* multi-line comment
+       spanning two lines */
+    printf("a and b are ", a, b);
+    gc() {
+        if(a > b) {
+            printf("a wins");
+        } else {
+            a--;
+        }
+    }
+    for(int i = 0; i < 10; i++) {
+        string name = "Catharsis"; // trailing comment
+    }
+    return 0;
+}
+"""
+
+UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def write_synthetic(path, size):
+    """Writes about `size` bytes of repeated BLOCK text to `path`."""
+    block = BLOCK * max(1, (1 << 20) // len(BLOCK))
+    written = 0
+    with open(path, "w") as file:
+        while written < size:
+            piece = block[:size - written]
+            cut = piece.rfind("\n") + 1 or len(piece)  # keep whole lines
+            file.write(piece[:cut])
+            written += cut
+
+
+def child(path, mode, chunk_size):
+    """Lexes `path` and prints a JSON result line (runs in a subprocess)."""
+    started = time.perf_counter()
+    count = 0
+    if mode == "stream":
+        from stream_lexer import iter_tokens
+        with open(path, "r") as file:
+            for _ in iter_tokens(file, chunk_size):
+                count += 1
+    elif mode == "mmap":
+        from mmap_lexer import lex_mmap
+        count = len(lex_mmap(path))
+    else:
+        from dfa_lexer import lexer
+        with open(path, "r") as file:
+            count = len(lexer(file.read()))
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"tokens": count, "seconds": elapsed, "peak_rss_mb": peak_kb / 1024}))
+
+
+def run(path, mode, chunk_size):
+    command = [sys.executable, "-m", "benchmarks.stream_memory", "--child", path, mode, str(chunk_size)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--sizes", default="16M,128M,1G", help="comma-separated input sizes (K/M/G suffixes)")
+    arg_parser.add_argument("--chunk-size", type=int, default=1 << 20, help="characters per read")
+    arg_parser.add_argument("--whole", action="store_true", help="also lex each file with read() + lexer()")
+    arg_parser.add_argument("--mmap", action="store_true", help="also lex each file from a memory map")
+    arg_parser.add_argument("--dir", default=None, help="where to write the synthetic files")
+    arg_parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], int(args.child[2]))
+        return
+
+    modes = ["stream"] + ["whole"] * args.whole + ["mmap"] * args.mmap
+    print(f"{'size':>8} {'mode':>7} {'tokens':>12} {'seconds':>9} {'MB/s':>7} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory(dir=args.dir) as workdir:
+        for size_text in args.sizes.split(","):
+            size = parse_size(size_text)
+            path = os.path.join(workdir, f"synthetic_{size}.cat")
+            write_synthetic(path, size)
+            for mode in modes:
+                result = run(path, mode, args.chunk_size)
+                rate = size / (1 << 20) / result["seconds"]
+                print(f"{size_text:>8} {mode:>7} {result['tokens']:>12,} {result['seconds']:>9.2f} "
+                      f"{rate:>7.2f} {result['peak_rss_mb']:>12.1f}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
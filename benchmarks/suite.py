@@ -0,0 +1,183 @@
+"""
+Benchmark suite over a generated corpus, with results saved as JSON.
+
+Generates one program with benchmarks.corpus and measures, best of --repeat:
+
+    lex_reference   main.lexer()          tokens per second
+    lex_dfa         dfa_lexer.lexer()     tokens per second
+    parse           Parser                statements per second (nested ones included)
+    bracket_index   BracketIndex()        tokens per second
+    parse_indexed   Parser + BracketIndex statements per second
+    parse_ll1       ll1_parser            statements per second
+    semantic        semantic.check()      statements per second
+    csv_write       write_tokens_to_csv   tokens per second
+    csv_read        read_tokens_from_csv  tokens per second
+
+then the peak traced memory (tracemalloc) of lexing and of parsing, in a
+separate pass so tracing does not slow the timed runs. --compare prints the
+change against an earlier results file.
+
+    python -m benchmarks.suite --size 4M --output before.json
+    python -m benchmarks.suite --size 4M --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate
+from bracket_index import BracketIndex
+from benchmarks.stream_memory import parse_size
+from dfa_lexer import lexer as dfa_lexer
+from ll1_parser import parse_tokens as parse_ll1
+from main import lexer, parse_tokens, write_tokens_to_csv
+from parser import Parser
+from semantic import check
+from token_binary import read_tokens_from_csv
+
+
+class _CountingParser(Parser):
+
+    def __init__(self, tokens):
+        super().__init__(tokens)
+        self.statements = 0
+
+    def parse_statement(self):
+        self.statements += 1
+        return super().parse_statement()
+
+
+def count_statements(tokens):
+    """Number of parse_statement calls a full parse makes, nested statements included."""
+    parser = _CountingParser(tokens)
+    while parser.current_token():
+        parser.parse_statement()
+    return parser.statements
+
+
+def best_of(repeat, function, *args):
+    """Smallest wall time of `repeat` calls, and the last call's result."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def traced_peak(function, *args):
+    """Peak bytes allocated while `function` runs, as tracemalloc sees them."""
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(text, repeat):
+    tokens = lexer(text)
+    statements = count_statements(tokens)
+    results = {}
+
+    def record(name, seconds, count, unit):
+        results[name] = {"seconds": seconds, "count": count, "unit": unit, "rate": count / seconds}
+
+    record("lex_reference", best_of(repeat, lexer, text)[0], len(tokens), "tokens/s")
+    record("lex_dfa", best_of(repeat, dfa_lexer, text)[0], len(tokens), "tokens/s")
+    record("parse", best_of(repeat, parse_tokens, tokens)[0], statements, "statements/s")
+    seconds, index = best_of(repeat, BracketIndex, tokens)
+    record("bracket_index", seconds, len(tokens), "tokens/s")
+    record("parse_indexed", best_of(repeat, parse_tokens, tokens, index)[0], statements, "statements/s")
+    record("parse_ll1", best_of(repeat, parse_ll1, tokens)[0], statements, "statements/s")
+    parser = Parser(tokens)
+    while parser.current_token():
+        parser.parse_statement()
+    record("semantic", best_of(repeat, check, parser.tree)[0], statements, "statements/s")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tokens.csv")
+        with contextlib.redirect_stdout(io.StringIO()):
+            record("csv_write", best_of(repeat, write_tokens_to_csv, tokens, path)[0], len(tokens), "tokens/s")
+            record("csv_read", best_of(repeat, read_tokens_from_csv, path)[0], len(tokens), "tokens/s")
+
+    memory = {"lex_peak_bytes": traced_peak(lexer, text),
+              "parse_peak_bytes": traced_peak(parse_tokens, tokens),
+              "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    return results, memory, len(tokens), statements
+
+
+def print_results(report, baseline=None):
+    print(f"Corpus: {report['corpus']['characters']:,} characters, {report['corpus']['tokens']:,} tokens, "
+          f"{report['corpus']['statements']:,} statements")
+    header = f"{'benchmark':>14} {'seconds':>9} {'rate':>14} {'unit':<13}"
+    print(header + (f" {'change':>8}" if baseline else ""))
+    for name, result in report["results"].items():
+        line = f"{name:>14} {result['seconds']:>9.3f} {result['rate']:>14,.0f} {result['unit']:<13}"
+        if baseline and name in baseline["results"]:
+            line += f" {result['rate'] / baseline['results'][name]['rate'] - 1:>+8.1%}"
+        print(line)
+    for name, value in report["memory"].items():
+        line = f"{name:>16} {value:>14,}"
+        if baseline and name in baseline.get("memory", {}):
+            line += f" {value / baseline['memory'][name] - 1:>+8.1%}"
+        print(line)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--size", default="2M", help="corpus size, e.g. 512K, 4M")
+    arg_parser.add_argument("--depth", type=int, default=3, help="maximum block nesting depth")
+    arg_parser.add_argument("--comments", type=float, default=0.1, help="comment density (0-1)")
+    arg_parser.add_argument("--errors", type=float, default=0.0, help="error injection rate (0-1)")
+    arg_parser.add_argument("--seed", type=int, default=0, help="corpus random seed")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark (best is kept)")
+    arg_parser.add_argument("--output", default="benchmark_results.json", help="JSON file for the results")
+    arg_parser.add_argument("--compare", default=None, metavar="JSON", help="earlier results to compare against")
+    args = arg_parser.parse_args()
+
+    corpus = {"size": parse_size(args.size), "depth": args.depth, "comment_density": args.comments,
+              "error_rate": args.errors, "seed": args.seed}
+    text = generate(corpus["size"], args.depth, args.comments, args.errors, args.seed)
+    results, memory, token_count, statements = run_suite(text, args.repeat)
+    corpus.update(characters=len(text), tokens=token_count, statements=statements)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "corpus": corpus,
+        "results": results,
+        "memory": memory,
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline.get("corpus", {}).get("size") != corpus["size"]:
+            print("Note: the baseline used a different corpus size; rates are still comparable.")
+    print_results(report, baseline)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Size and speed of the token CSV against the binary token format.
+
+Writes the tokens of a synthetic source both ways, then times reading each
+back (csv.reader row by row against token_binary.load_tokens).
+
+    python -m benchmarks.token_files --blocks 20000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.stream_memory import BLOCK
+from dfa_lexer import lexer
+from main import write_tokens_to_csv
+from token_binary import dump_tokens, load_tokens, read_tokens_from_csv
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--blocks", type=int, default=20000, help="copies of the sample program")
+    args = arg_parser.parse_args()
+
+    tokens = lexer(BLOCK * args.blocks)
+    print(f"Tokens: {len(tokens):,}")
+    print(f"{'format':>8} {'MB':>8} {'write s':>8} {'read s':>8}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, write, read in (("csv", write_tokens_to_csv, read_tokens_from_csv),
+                                  ("binary", dump_tokens, load_tokens)):
+            path = os.path.join(workdir, f"tokens.{name}")
+            _, write_seconds = timed(write, tokens, path)
+            loaded, read_seconds = timed(read, path)
+            assert len(loaded) == len(tokens)
+            print(f"{name:>8} {os.path.getsize(path) / (1 << 20):>8.1f} {write_seconds:>8.2f} {read_seconds:>8.2f}")
+            del loaded
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Memory of the dict-per-token model against TokenBuffer.
+
+Lexes a synthetic source into a list of token dicts and into a TokenBuffer and
+reports the bytes held by each (tracemalloc), plus the time to parse both.
+
+    python -m benchmarks.token_memory --blocks 20000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.stream_memory import BLOCK
+from dfa_lexer import lexer as dfa_lexer
+from parser import Parser
+from token_buffer import lex_to_buffer
+
+
+def measure(build, source):
+    """Returns (result, bytes still allocated by `build`, seconds of an untraced run)."""
+    started = time.perf_counter()
+    build(source)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    tracemalloc.start()
+    result = build(source)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def parse_time(tokens):
+    parser = Parser(tokens)
+    started = time.perf_counter()
+    while parser.current_token():
+        parser.parse_statement()
+    return time.perf_counter() - started
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--blocks", type=int, default=20000, help="copies of the sample program")
+    args = arg_parser.parse_args()
+
+    source = BLOCK * args.blocks
+    print(f"Source: {len(source) / (1 << 20):.1f} MB")
+    print(f"{'model':>12} {'tokens':>10} {'MB':>9} {'bytes/token':>12} {'lex s':>7} {'parse s':>8}")
+    for name, build in (("dicts", dfa_lexer), ("TokenBuffer", lex_to_buffer)):
+        tokens, size, lex_seconds = measure(build, source)
+        parse_seconds = parse_time(tokens)
+        print(f"{name:>12} {len(tokens):>10,} {size / (1 << 20):>9.1f} {size / len(tokens):>12.1f} "
+              f"{lex_seconds:>7.2f} {parse_seconds:>8.2f}")
+        del tokens
+
+
+if __name__ == "__main__":
+    main()
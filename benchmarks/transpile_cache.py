@@ -0,0 +1,56 @@
+"""
+Start-up and run time of the Python backend, with and without its code cache.
+
+For each loop program of benchmarks.vm_loops, best of --repeat, times
+transpile.load() with no cache (lex, parse, check, transpile and compile())
+and from a warm cache directory (hash, read, unmarshal), then runs the code
+object with transpile.run() and compiles and runs the same program on the
+VM. Checks that both print and return what the Python function does, and
+reports the start-up times, the run times and the run time of each backend
+relative to the plain Python loops.
+
+    python -m benchmarks.transpile_cache --scale 4
+"""
+import argparse
+import tempfile
+
+from benchmarks.vm_loops import PROGRAMS, best_of, build, captured
+from transpile import load, run
+from vm import run as run_vm
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--scale", type=int, default=1, help="outer iterations, in hundreds")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement (best is reported)")
+    arg_parser.add_argument("--programs", nargs="+", choices=list(PROGRAMS), default=list(PROGRAMS),
+                            help="programs to run")
+    args = arg_parser.parse_args()
+
+    outer = 100 * args.scale
+    print(f"{'program':>10} {'cold ms':>8} {'cached ms':>9} {'speedup':>8} {'python s':>9} {'run s':>7} "
+          f"{'vs python':>9} {'vm s':>7} {'vs python':>9}")
+    with tempfile.TemporaryDirectory() as cache:
+        for name in args.programs:
+            template, function, _ = PROGRAMS[name]
+            text = template % {"outer": outer}
+            cold_seconds, (code, lines, errors, _) = best_of(args.repeat, load, text, name, None)
+            if code is None:
+                raise SystemExit("\n".join(str(error) for error in errors))
+            load(text, name, cache)
+            cached_seconds, (_, _, _, hit) = best_of(args.repeat, load, text, name, cache)
+            if not hit:
+                raise SystemExit(f"❌ {name}: not found in the cache")
+            python_seconds, expected = best_of(args.repeat, captured, function, outer)
+            run_seconds, result = best_of(args.repeat, captured, run, code, lines)
+            vm_seconds, vm_result = best_of(args.repeat, captured, run_vm, build(text))
+            for backend, value in (("transpiled", result), ("VM", vm_result)):
+                if value != expected:
+                    raise SystemExit(f"❌ {name}: the {backend} program returned {value!r}, Python {expected!r}")
+            print(f"{name:>10} {cold_seconds * 1e3:>8.2f} {cached_seconds * 1e3:>9.3f} "
+                  f"{cold_seconds / cached_seconds:>7.0f}x {python_seconds:>9.3f} {run_seconds:>7.3f} "
+                  f"{run_seconds / python_seconds:>8.2f}x {vm_seconds:>7.3f} {vm_seconds / python_seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
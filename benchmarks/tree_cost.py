@@ -0,0 +1,80 @@
+"""
+Time and memory of building the syntax tree while parsing.
+
+Parses a generated corpus (benchmarks.corpus) with Parser(tree=False) and
+with the default Parser(tree=True), best of --repeat, and reports the parse
+time of each, the bytes still allocated once the parse is done (tracemalloc:
+the tree records and the declared-variable set, not the tokens) and the
+number of records. For the tree it then times statements(), which turns the
+records into node objects, and dumps() of those to JSON.
+
+    python -m benchmarks.tree_cost --size 4M --errors 0.1
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate
+from benchmarks.stream_memory import parse_size
+from dfa_lexer import lexer
+from parser import Parser
+from syntax_tree import dumps, walk
+
+
+def parse(tokens, tree):
+    parser = Parser(tokens, tree=tree)
+    while parser.current_token():
+        parser.parse_statement()
+    return parser
+
+
+def retained(tokens, tree):
+    """Bytes a finished parse still holds, as tracemalloc sees them."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        parser = parse(tokens, tree)
+        return tracemalloc.get_traced_memory()[0], parser
+    finally:
+        tracemalloc.stop()
+
+
+def best_of(repeat, function, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--size", default="4M", help="corpus size, e.g. 512K, 4M")
+    arg_parser.add_argument("--errors", type=float, default=0.0, help="error injection rate per statement (0-1)")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement (best is reported)")
+    args = arg_parser.parse_args()
+
+    tokens = lexer(generate(parse_size(args.size), error_rate=args.errors))
+    print(f"Corpus: {len(tokens):,} tokens")
+    print(f"{'mode':>8} {'parse s':>8} {'tokens/s':>12} {'retained MB':>12} {'records':>10}")
+    results = {}
+    for name, tree in (("no tree", False), ("tree", True)):
+        seconds = best_of(args.repeat, parse, tokens, tree)[0]
+        size, parser = retained(tokens, tree)
+        records = len(parser.tree) if tree else 0
+        results[name] = seconds, size
+        print(f"{name:>8} {seconds:>8.3f} {len(tokens) / seconds:>12,.0f} {size / (1 << 20):>12.1f} {records:>10,}")
+    (plain_seconds, plain_size), (tree_seconds, tree_size) = results["no tree"], results["tree"]
+    print(f"Tree: {(tree_seconds / plain_seconds - 1) * 100:+.1f}% parse time, "
+          f"{(tree_size - plain_size) / len(tokens):.1f} bytes per token")
+
+    statements_seconds, statements = best_of(args.repeat, parser.tree.statements)
+    json_seconds, text = best_of(args.repeat, dumps, statements)
+    print(f"statements(): {statements_seconds:.3f} s for {sum(1 for _ in walk(statements)):,} nodes; "
+          f"dumps(): {json_seconds:.3f} s, {len(text) / (1 << 20):.1f} MB of JSON")
+
+
+if __name__ == "__main__":
+    main()
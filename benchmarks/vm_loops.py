@@ -0,0 +1,195 @@
+"""
+Speed of the bytecode VM on loop-heavy programs, against the same loops in Python.
+
+Each program below is a .cat source and a Python function running the same
+loops the same way (while loops stepping one variable, like the bytecode).
+For each, lexes and parses the source, compiles it with vm.compile_program()
+and runs it with vm.run(), best of --repeat, checks that the printed output
+and the return value match the Python function's, and reports the compile
+time, the bytecode size, the run time, loop iterations per second and the
+run time relative to Python's.
+
+    python -m benchmarks.vm_loops --scale 4
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from dfa_lexer import lexer
+from parser import Parser
+from vm import compile_program, run
+
+NESTED = """
+int main() {
+    int count = 0;
+    for (int i = 0; i < %(outer)d; i++) {
+        for (int j = 0; j < 1000; j++) {
+            count--;
+        }
+    }
+    printf("count %%d\\n", count);
+    return 0;
+}
+"""
+
+
+def nested(outer):
+    count = 0
+    i = 0
+    while i < outer:
+        j = 0
+        while j < 1000:
+            count -= 1
+            j += 1
+        i += 1
+    print(f"count {count}")
+    return 0
+
+
+BRANCHES = """
+int main() {
+    int low = 0, high = 0;
+    for (int i = 0; i < %(outer)d; i++) {
+        for (int j = 0; j < 1000; j++) {
+            if (j < 300) {
+                low--;
+            } else {
+                high--;
+            }
+        }
+    }
+    printf("low %%d high %%d\\n", low, high);
+    return 0;
+}
+"""
+
+
+def branches(outer):
+    low = high = 0
+    i = 0
+    while i < outer:
+        j = 0
+        while j < 1000:
+            if j < 300:
+                low -= 1
+            else:
+                high -= 1
+            j += 1
+        i += 1
+    print(f"low {low} high {high}")
+    return 0
+
+
+DOUBLING = """
+int main() {
+    int steps = 0;
+    for (int i = 0; i < %(outer)d; i++) {
+        for (int j = 1; j <= 1000000000; j *= 2) {
+            steps--;
+        }
+    }
+    printf("steps %%d\\n", steps);
+    return 0;
+}
+"""
+
+
+def doubling(outer):
+    steps = 0
+    i = 0
+    while i < outer:
+        j = 1
+        while j <= 1000000000:
+            steps -= 1
+            j *= 2
+        i += 1
+    print(f"steps {steps}")
+    return 0
+
+
+FLOATS = """
+int main() {
+    int count = 0;
+    for (double x = 0.0; x < %(outer)d.0; x += 0.001) {
+        count--;
+    }
+    printf("count %%d\\n", count);
+    return 0;
+}
+"""
+
+
+def floats(outer):
+    count = 0
+    x = 0.0
+    while x < outer:
+        count -= 1
+        x += 0.001
+    print(f"count {count}")
+    return 0
+
+
+# name: (source, Python function, inner iterations per outer step)
+PROGRAMS = {
+    "nested": (NESTED, nested, 1000),
+    "branches": (BRANCHES, branches, 1000),
+    "doubling": (DOUBLING, doubling, 30),
+    "floats": (FLOATS, floats, 1000),
+}
+
+
+def build(source):
+    parser = Parser(lexer(source))
+    while parser.current_token():
+        if parser.parse_statement():
+            raise SystemExit("❌ Benchmark program does not parse.")
+    program, diagnostics = compile_program(parser.tree)
+    if program is None:
+        raise SystemExit("\n".join(str(diagnostic) for diagnostic in diagnostics))
+    return program
+
+
+def captured(function, *args):
+    """Return value and printed output of `function`."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        value = function(*args)
+    return value, out.getvalue()
+
+
+def best_of(repeat, function, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--scale", type=int, default=1, help="outer iterations, in hundreds")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement (best is reported)")
+    arg_parser.add_argument("--programs", nargs="+", choices=list(PROGRAMS), default=list(PROGRAMS),
+                            help="programs to run")
+    args = arg_parser.parse_args()
+
+    outer = 100 * args.scale
+    print(f"{'program':>10} {'compile ms':>10} {'instrs':>7} {'run s':>7} {'iterations/s':>13} "
+          f"{'python s':>9} {'vs python':>9}")
+    for name in args.programs:
+        template, function, inner = PROGRAMS[name]
+        source = template % {"outer": outer}
+        compile_seconds, program = best_of(args.repeat, build, source)
+        run_seconds, result = best_of(args.repeat, captured, run, program)
+        python_seconds, expected = best_of(args.repeat, captured, function, outer)
+        if result != expected:
+            raise SystemExit(f"❌ {name}: the VM returned {result!r}, Python {expected!r}")
+        iterations = outer * inner
+        print(f"{name:>10} {compile_seconds * 1e3:>10.2f} {len(program):>7} {run_seconds:>7.3f} "
+              f"{iterations / run_seconds:>13,.0f} {python_seconds:>9.3f} {run_seconds / python_seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Bracket matching and error-recovery sync points, computed in one pass over the tokens.
+
+After a syntax error Parser scans forward token by token to the next point it
+can resume at. BracketIndex precomputes, for every token position, where each
+of those scans ends, so a parser given the index recovers with one array
+lookup:
+
+    statement_sync[i]     where skip_to_next_statement() leaves the parser from i
+    declaration_sync[i]   where skip_to_next_declaration() leaves it
+    paren_sync[i]         just past the next `)` at or after i
+    curl_sync[i]          just past the next `}` at or after i (for_loop_sync() chains the two)
+
+and, for other passes, match[i]: the position of the bracket matching the
+(, ), [, ], { or } at i, or -1 for unmatched brackets and other tokens. The
+arrays have len(tokens) + 1 entries so the end of the input is a valid
+position.
+
+    index = BracketIndex(tokens)
+    parser = Parser(tokens, index)
+"""
+import operator
+from array import array
+from itertools import chain, compress, repeat
+
+from parser import DECLARATION_SYNC_TYPES, STATEMENT_SYNC_TYPES
+
+BRACKET_PAIRS = {
+    "OPEN-PAREN_DELI": "CLOSE-PAREN_DELI",
+    "OPEN-BRAC_DELI": "CLOSE-BRAC_DELI",
+    "OPEN-CURL-BRAC_DELI": "CLOSE-CURL-BRAC_DELI",
+}
+
+# Every token becomes one byte so the scans below run over bytes in C instead of over tokens
+_CODES = {
+    "SEMI-COLON_DELI": b";", "OPEN-PAREN_DELI": b"(", "CLOSE-PAREN_DELI": b")", "OPEN-BRAC_DELI": b"[",
+    "CLOSE-BRAC_DELI": b"]", "OPEN-CURL-BRAC_DELI": b"{", "CLOSE-CURL-BRAC_DELI": b"}",
+}
+for _type in set(STATEMENT_SYNC_TYPES) | set(DECLARATION_SYNC_TYPES):
+    # "k": both scans stop here, "s"/"d": only skip_to_next_statement / skip_to_next_declaration does
+    _CODES.setdefault(_type, b"k" if _type in STATEMENT_SYNC_TYPES and _type in DECLARATION_SYNC_TYPES
+                      else b"s" if _type in STATEMENT_SYNC_TYPES else b"d")
+_OTHER = b"."
+_BRACKETS = b"()[]{}"
+_PAIRS = {ord(closer): ord(opener) for opener, closer in ["()", "[]", "{}"]}
+
+
+def token_codes(tokens):
+    """One byte per token: the codes above for delimiters and sync keywords, "." for the rest."""
+    if hasattr(tokens, "kinds"):
+        # TokenBuffer: translate each kind once, then the whole column in one step
+        table = [_CODES.get(name, _OTHER) for name in tokens.type_names]
+        return b"".join(map(table.__getitem__, tokens.kinds))
+    get = _CODES.get
+    return b"".join([get(token["type"], _OTHER) for token in tokens])
+
+
+def _positions(codes, wanted):
+    """Positions of the tokens whose code is in `wanted`, and the bytes.translate table marking them."""
+    mask = bytes(1 if code in wanted else 0 for code in range(256))
+    flags = codes.translate(mask)
+    return list(compress(range(len(codes)), flags)), flags
+
+
+def _sync_points(codes, offsets):
+    """
+    For every position, where a forward scan from it stops: at the first token whose code is in
+    `offsets`, plus that code's offset (1 = just past it); len(codes) when no such token follows.
+    """
+    size = len(codes)
+    stops, flags = _positions(codes, offsets)
+    shifts = codes.translate(bytes(offsets.get(code, 0) for code in range(256)))
+    values = list(map(operator.add, stops, compress(shifts, flags)))
+    values.append(size)
+    # Every position up to and including a stop gets that stop's value; the positions after the last get `size`
+    counts = map(operator.sub, stops + [size], [-1] + stops)
+    return array("q", chain.from_iterable(map(repeat, values, counts)))
+
+
+class BracketIndex:
+    """Matching brackets and recovery sync points for one token list; see the module docstring."""
+
+    def __init__(self, tokens):
+        codes = token_codes(tokens)
+        self.size = size = len(codes)
+        self.match = match = array("q", [-1]) * size
+
+        # Brackets match innermost first; a closer that does not match the innermost opener stays unmatched
+        open_brackets = []
+        for position in _positions(codes, _BRACKETS)[0]:
+            code = codes[position]
+            opener = _PAIRS.get(code)
+            if opener is None:
+                open_brackets.append(position)
+            elif open_brackets and codes[open_brackets[-1]] == opener:
+                other = open_brackets.pop()
+                match[other] = position
+                match[position] = other
+
+        semicolon, close_paren, close_curl, both, statement, declaration = b";)}ksd"
+        self.statement_sync = _sync_points(codes, {both: 0, statement: 0, semicolon: 1, close_curl: 1})
+        self.declaration_sync = _sync_points(codes, {both: 0, declaration: 0, semicolon: 1, close_curl: 0})
+        self.paren_sync = _sync_points(codes, {close_paren: 1})
+        self.curl_sync = _sync_points(codes, {close_curl: 1})
+
+    def __len__(self):
+        return self.size
+
+    def for_loop_sync(self, position):
+        """Where skip_to_next_for_loop() leaves the parser: past the next `)`, then past the next `}`."""
+        return self.curl_sync[self.paren_sync[position]]
+
+    def matching(self, position):
+        """The position of the bracket matching the one at `position`, or None."""
+        other = self.match[position]
+        return None if other < 0 else other
+
@@ -0,0 +1,210 @@
+"""
+Non-interactive command line: lex and parse .cat files, writing NDJSON.
+
+    python cli.py prog.cat other.cat > out.ndjson
+    python cli.py prog.cat --no-tokens | jq -r .message
+    python cli.py prog.cat --tokens tokens.ndjson --diagnostics errors.ndjson
+
+Every output line is one JSON object with a "kind":
+
+    token       {"kind": "token", "file", "type", "value", "line"}
+    error       {"kind": "error", "file", "code", "line", "start", "end", "args", "message"}
+                                                                  syntax errors from Parser (diagnostics.py)
+    warning     {"kind": "warning", "file", "line", "message"}    lexer warnings
+    failure     {"kind": "failure", "file", "message"}            the file could not be processed
+    summary     {"kind": "summary", "file", "tokens", "errors", "warnings"}
+
+Tokens are written as the streaming lexer produces them, and errors as soon
+as the parser knows they stand (its on_error callback): as each statement of
+a main, gc, if or else body is parsed. The errors of a for loop's body wait
+for the loop to end, since Parser drops them when the body closes; nothing
+else is collected for the output. Files are parsed with StackParser, so
+nesting depth is not bounded by Python's recursion limit; a file the parser
+fails on gets a failure record and the next file is processed. Records are
+flushed in batches of --flush-every and at the end of every file. With
+--max-errors N a file's parse stops after its first N syntax errors. --semantic also checks
+each file's variables (semantic.py) once it is parsed: its errors are error
+records and its warnings warning records, both with the diagnostic fields.
+
+Exit status: 0 if no errors were found, 1 if any file had syntax errors (or,
+with --semantic, semantic errors), 2 if any file could not be processed.
+"""
+import argparse
+import contextlib
+import json
+import os
+import re
+import sys
+
+from diagnostics import error_dict
+from main import validate_file_extension
+from profiling import Profiler, phase
+from stack_parser import StackParser
+from stream_lexer import iter_tokens
+
+DEFAULT_BATCH_SIZE = 1024
+
+EXIT_OK = 0
+EXIT_ERRORS = 1
+EXIT_FAILURE = 2
+
+_LINE = re.compile(r"\bline (\d+)")
+
+
+class NDJSONWriter:
+    """Writes one JSON object per line, flushing after every `batch_size` records."""
+
+    def __init__(self, file, batch_size=DEFAULT_BATCH_SIZE):
+        self.file = file
+        self.batch_size = max(1, batch_size)
+        self.pending = []
+
+    def write(self, record):
+        self.pending.append(json.dumps(record, ensure_ascii=False))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.file.write("\n".join(self.pending) + "\n")
+            self.pending.clear()
+        self.file.flush()
+
+
+class _WarningStream:
+    """Stands in for stdout while lexing and turns each printed line into a warning record."""
+
+    def __init__(self, emit):
+        self.emit = emit
+        self.partial = ""
+        self.count = 0
+
+    def write(self, text):
+        lines = (self.partial + text).split("\n")
+        self.partial = lines.pop()
+        for line in lines:
+            if line:
+                self.count += 1
+                self.emit(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def _line_of(message):
+    match = _LINE.search(message)
+    return int(match.group(1)) if match else None
+
+
+def process_file(filename, tokens_out, diagnostics_out, max_errors=None, semantic=False):
+    """
+    Lexes and parses one file, writing its records as they are produced.
+    `tokens_out` may be None to skip the tokens; `max_errors` stops the parse after that
+    many syntax errors; `semantic` runs semantic.check() on the result. Returns the file's exit status.
+    """
+    def warn(message):
+        diagnostics_out.write({"kind": "warning", "file": filename, "line": _line_of(message), "message": message})
+
+    try:
+        validate_file_extension(filename)
+        warnings = _WarningStream(warn)
+        tokens = []
+        with phase(f"lex {filename}"), open(filename, "r") as file, contextlib.redirect_stdout(warnings):
+            for token in iter_tokens(file):
+                tokens.append(token)
+                if tokens_out is not None:
+                    tokens_out.write({"kind": "token", "file": filename, "type": token["type"],
+                                      "value": token["value"], "line": token["line_number"]})
+    except Exception as e:
+        diagnostics_out.write({"kind": "failure", "file": filename, "message": f"{type(e).__name__}: {e}"})
+        return EXIT_FAILURE
+
+    error_count = 0
+
+    def report(error):
+        nonlocal error_count
+        if error_count != max_errors:  # not those past the budget that the statements still open report at the end
+            error_count += 1
+            diagnostics_out.write({"kind": "error", "file": filename, **error_dict(error)})
+
+    try:
+        with phase(f"parse {filename}"):
+            parser = StackParser(tokens, max_errors=max_errors, on_error=report)
+            while parser.current_token():
+                for error in parser.parse_statement() or []:
+                    report(error)
+    except Exception as e:
+        diagnostics_out.write({"kind": "failure", "file": filename, "message": f"{type(e).__name__}: {e}"})
+        return EXIT_FAILURE
+
+    warning_count = warnings.count
+    if semantic:
+        from semantic import check
+        with phase(f"check {filename}"):
+            for diagnostic in check(parser.tree)[1]:
+                if diagnostic.severity == "error":
+                    error_count += 1
+                else:
+                    warning_count += 1
+                diagnostics_out.write({"kind": diagnostic.severity, "file": filename, **diagnostic.to_dict()})
+
+    diagnostics_out.write({"kind": "summary", "file": filename, "tokens": len(tokens), "errors": error_count,
+                           "warnings": warning_count})
+    return EXIT_ERRORS if error_count else EXIT_OK
+
+
+def _open_output(path, writers, batch_size):
+    """Returns the writer for `path` ("-" is stdout); outputs naming the same path share one writer."""
+    key = "-" if path == "-" else os.path.abspath(path)
+    if key not in writers:
+        file = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+        writers[key] = NDJSONWriter(file, batch_size)
+    return writers[key]
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Lex and parse .cat files, writing tokens and diagnostics as NDJSON.")
+    arg_parser.add_argument("files", nargs="+", help=".cat files to process")
+    arg_parser.add_argument("--tokens", default="-", metavar="PATH", help="where to write token records (default: stdout)")
+    arg_parser.add_argument("--diagnostics", default="-", metavar="PATH",
+                            help="where to write error, warning, failure and summary records (default: stdout)")
+    arg_parser.add_argument("--no-tokens", action="store_true", help="do not write token records")
+    arg_parser.add_argument("--max-errors", type=int, default=None, metavar="N",
+                            help="stop parsing a file after its first N syntax errors")
+    arg_parser.add_argument("--semantic", action="store_true",
+                            help="also report undeclared, redeclared and shadowed variables")
+    arg_parser.add_argument("--flush-every", type=int, default=DEFAULT_BATCH_SIZE, metavar="N",
+                            help="records buffered before each flush")
+    arg_parser.add_argument("--profile", default=None, metavar="TRACE",
+                            help="time lexing and parsing, print a summary to stderr and write a Chrome trace")
+    arg_parser.add_argument("--no-profile-memory", action="store_true", help="profile without tracemalloc")
+    args = arg_parser.parse_args(argv)
+
+    writers = {}
+    status = EXIT_OK
+    profiler = Profiler(memory=not args.no_profile_memory).start() if args.profile else None
+    try:
+        tokens_out = None if args.no_tokens else _open_output(args.tokens, writers, args.flush_every)
+        diagnostics_out = _open_output(args.diagnostics, writers, args.flush_every)
+        for filename in args.files:
+            status = max(status, process_file(filename, tokens_out, diagnostics_out, args.max_errors, args.semantic))
+            for writer in writers.values():
+                writer.flush()
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); stop quietly without a second error at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_FAILURE
+    finally:
+        for writer in writers.values():
+            if writer.file is not sys.stdout:
+                writer.file.close()
+        if profiler:
+            profiler.stop()
+            print(profiler.summary(), file=sys.stderr)
+            profiler.write_chrome_trace(args.profile)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
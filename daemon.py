@@ -0,0 +1,434 @@
+"""
+Analysis daemon: keeps the lexer and parser loaded and answers JSON-RPC 2.0.
+
+    python daemon.py --socket /tmp/catharsis.sock    # any number of clients
+    python daemon.py --stdio                         # one client on stdin/stdout
+
+Framing is one JSON object per line in each direction. Methods:
+
+    lex        {"text"}  -> {"tokens": [token dicts], "warnings": [...]}
+    parse      {"text"}  -> {"tokens": count, "errors": [...], "warnings": [...]}
+    diagnose   {"path"}  -> {"file", "tokens": count, "errors": [...], "warnings": [...]}
+    metrics    {}        -> request counts and latency percentiles per method, worker restarts
+    shutdown   {}        -> stops the server once the requests in flight are answered
+
+parse and diagnose also take an optional "max_errors" (stop after that many
+syntax errors) and "structured": true, which sends each error as a
+diagnostics.error_dict() object (code, line, token span, args, message)
+instead of its message line.
+
+Every request except metrics and shutdown also takes an optional "timeout" in
+seconds (default --timeout). Requests run in a pool of worker processes, so a
+slow one never holds up the others, and several requests from one client may
+be in flight at once; responses carry the request id and may arrive out of
+order. A request that times out gets an error reply and its worker is killed
+and replaced, so input the parser never finishes on (it loops forever on some,
+such as a stray `else`) cannot use up the pool. After shutdown, requests get a
+shutting-down error; those already in flight are answered before the server
+stops.
+
+DaemonClient is a small blocking client for the socket mode.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from diagnostics import error_dict
+from main import LEXER_ENGINES, get_lexer, lex_file, parse_tokens
+
+DEFAULT_TIMEOUT = 10.0
+# Largest request line accepted, in bytes
+MAX_REQUEST_SIZE = 256 * 1024 * 1024
+# Latencies kept per method for the percentiles
+LATENCY_WINDOW = 4096
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+TIMEOUT_ERROR = -32001
+ANALYSIS_ERROR = -32002
+SHUTTING_DOWN = -32003
+
+
+class RPCError(Exception):
+    """An error reply: JSON-RPC error code and message."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _text_param(params, name):
+    value = params.get(name)
+    if not isinstance(value, str):
+        raise RPCError(INVALID_PARAMS, f"Parameter '{name}' must be a string.")
+    return value
+
+
+def _errors(tokens, params):
+    """The syntax errors of `tokens` as the parse and diagnose params ask for them."""
+    max_errors = params.get("max_errors")
+    if max_errors is not None and (not isinstance(max_errors, int) or isinstance(max_errors, bool) or max_errors < 1):
+        raise RPCError(INVALID_PARAMS, "Parameter 'max_errors' must be a positive integer.")
+    errors = parse_tokens(tokens, max_errors=max_errors)
+    return [error_dict(error) for error in errors] if params.get("structured") else [str(error) for error in errors]
+
+
+class _Handlers:
+    """The lex, parse and diagnose methods, as a worker process runs them."""
+
+    def __init__(self, engine):
+        self.lexer = get_lexer(engine)
+        self.engine = engine
+        self.methods = {"lex": self.lex, "parse": self.parse, "diagnose": self.diagnose}
+
+    def lex(self, params):
+        text = _text_param(params, "text")
+        with contextlib.redirect_stdout(io.StringIO()) as captured:
+            tokens = self.lexer(text)
+        return {"tokens": tokens, "warnings": captured.getvalue().splitlines()}
+
+    def parse(self, params):
+        text = _text_param(params, "text")
+        with contextlib.redirect_stdout(io.StringIO()) as captured:
+            tokens = self.lexer(text)
+        return {"tokens": len(tokens), "errors": _errors(tokens, params),
+                "warnings": captured.getvalue().splitlines()}
+
+    def diagnose(self, params):
+        path = _text_param(params, "path")
+        try:
+            with contextlib.redirect_stdout(io.StringIO()) as captured:
+                tokens = lex_file(path, self.engine)
+        except (OSError, ValueError) as e:
+            raise RPCError(ANALYSIS_ERROR, str(e))
+        return {"file": path, "tokens": len(tokens), "errors": _errors(tokens, params),
+                "warnings": captured.getvalue().splitlines()}
+
+
+def _serve_worker(connection, engine):
+    """A worker process: answers (method, params) from `connection` until it closes."""
+    sys.stdout = sys.stderr  # stray prints must not reach the --stdio protocol stream
+    handlers = _Handlers(engine)
+    handlers.parse({"text": "int main() { int a = 1; }"})  # warm up the lexer tables and the parser
+    while True:
+        try:
+            method, params = connection.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            reply = ("result", handlers.methods[method](params))
+        except RPCError as e:
+            reply = ("error", e.code, e.message)
+        except Exception as e:
+            reply = ("error", ANALYSIS_ERROR, f"{type(e).__name__}: {e}")
+        connection.send(reply)
+
+
+class _Worker:
+    """One worker process and the pipe to it."""
+
+    def __init__(self, context, engine):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_serve_worker, args=(child, engine), daemon=True)
+        self.process.start()
+        child.close()
+
+    def call(self, method, params):
+        """Runs one request in the process (blocking); returns its result or raises RPCError."""
+        try:
+            self.connection.send((method, params))
+            reply = self.connection.recv()
+        except (EOFError, OSError):
+            # killed after a timeout, or crashed
+            self.connection.close()
+            self.process.join()
+            raise RPCError(ANALYSIS_ERROR, "The worker process exited.") from None
+        if reply[0] == "error":
+            raise RPCError(reply[1], reply[2])
+        return reply[1]
+
+    def kill(self):
+        self.process.kill()
+
+
+class _StdoutWriter:
+    """The part of asyncio.StreamWriter handle_connection uses, writing straight to a binary stream."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, data):
+        self.stream.write(data)
+
+    async def drain(self):
+        self.stream.flush()
+
+    def close(self):
+        self.stream.flush()
+
+
+class Daemon:
+    """Request dispatcher and metrics shared by every connection."""
+
+    def __init__(self, engine="dfa", timeout=DEFAULT_TIMEOUT, workers=None):
+        get_lexer(engine)  # fails here on an unknown engine rather than in every worker
+        self.engine = engine
+        self.timeout = timeout
+        workers = max(1, workers or os.cpu_count() or 1)
+        # forkserver: workers (and their replacements) start from a clean, preloaded process, not this threaded one
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.context = multiprocessing.get_context(method)
+        if method == "forkserver":
+            self.context.set_forkserver_preload(["daemon"])
+        self.workers = [_Worker(self.context, engine) for _ in range(workers)]
+        self.idle = None  # asyncio.Queue of the workers not running a request, made in the server's loop
+        # Threads that wait on the workers' pipes, one per worker
+        self.waiters = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="catharsis")
+        self.methods = {"lex", "parse", "diagnose"}
+        self.latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self.counts = defaultdict(lambda: {"requests": 0, "errors": 0, "timeouts": 0})
+        self.restarts = 0  # workers killed after a timeout or found dead, and replaced
+        self.started = time.time()
+        self.stopped = None
+        self.stopping = False  # shutdown was requested: new requests are refused
+        self.requests = set()  # respond() tasks in flight, over all connections
+
+    def metrics(self):
+        methods = {}
+        for method, counts in self.counts.items():
+            latencies = sorted(self.latencies[method])
+            entry = dict(counts)
+            if latencies:
+                entry.update({f"p{percent}_ms": latencies[min(len(latencies) - 1, len(latencies) * percent // 100)]
+                              * 1000 for percent in (50, 90, 99)})
+                entry["mean_ms"] = sum(latencies) / len(latencies) * 1000
+            methods[method] = entry
+        return {"uptime_seconds": time.time() - self.started, "engine": self.engine, "workers": len(self.workers),
+                "worker_restarts": self.restarts, "methods": methods}
+
+    # Dispatch
+
+    async def call(self, method, params):
+        """Runs a request on an idle worker; one still running when this is cancelled (timed out) is replaced."""
+        if self.idle is None:
+            self.idle = asyncio.Queue()
+            for worker in self.workers:
+                self.idle.put_nowait(worker)
+        worker = await self.idle.get()
+        finished = False
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.waiters, worker.call, method, params)
+            finished = True
+            return result
+        except RPCError:
+            finished = worker.process.is_alive()
+            raise
+        finally:
+            if not finished:
+                worker.kill()
+                self.restarts += 1
+                replacement = _Worker(self.context, self.engine)
+                self.workers[self.workers.index(worker)] = replacement
+                worker = replacement
+            self.idle.put_nowait(worker)
+
+    async def dispatch(self, request):
+        """Runs one decoded request and returns its result; raises RPCError for error replies."""
+        if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or not isinstance(request.get("method"), str):
+            raise RPCError(INVALID_REQUEST, "Expected a JSON-RPC 2.0 request object.")
+        method = request["method"]
+        params = request.get("params", {})
+        if not isinstance(params, dict):
+            raise RPCError(INVALID_PARAMS, "Parameters must be an object.")
+        if method == "metrics":
+            return self.metrics()
+        if self.stopping:
+            raise RPCError(SHUTTING_DOWN, "The daemon is shutting down.")
+        if method == "shutdown":
+            self.stopping = True
+            others = self.requests - {asyncio.current_task()}
+            if others:
+                await asyncio.wait(others)
+            return None
+        if method not in self.methods:
+            raise RPCError(METHOD_NOT_FOUND, f"Unknown method: {method}")
+
+        counts = self.counts[method]
+        counts["requests"] += 1
+        timeout = params.get("timeout", self.timeout)
+        if not isinstance(timeout, (int, float)) or timeout <= 0:
+            raise RPCError(INVALID_PARAMS, "Parameter 'timeout' must be a positive number of seconds.")
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(self.call(method, params), timeout)
+        except asyncio.TimeoutError:
+            counts["timeouts"] += 1
+            raise RPCError(TIMEOUT_ERROR, f"Request timed out after {timeout}s.")
+        except RPCError:
+            counts["errors"] += 1
+            raise
+        except Exception as e:
+            counts["errors"] += 1
+            raise RPCError(ANALYSIS_ERROR, f"{type(e).__name__}: {e}")
+        finally:
+            self.latencies[method].append(time.perf_counter() - started)
+
+    async def respond(self, line, writer):
+        request_id = None
+        shutdown = False
+        try:
+            request = json.loads(line)
+            if isinstance(request, dict):
+                request_id = request.get("id")
+            response = {"jsonrpc": "2.0", "id": request_id, "result": await self.dispatch(request)}
+            shutdown = request["method"] == "shutdown"
+        except json.JSONDecodeError as e:
+            response = {"jsonrpc": "2.0", "id": None, "error": {"code": PARSE_ERROR, "message": str(e)}}
+        except RPCError as e:
+            response = {"jsonrpc": "2.0", "id": request_id, "error": {"code": e.code, "message": e.message}}
+        try:
+            if request_id is None and "result" in response:
+                return  # a notification: no reply
+            writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+            await writer.drain()
+        finally:
+            if shutdown:
+                self.stopped.set()  # only once its reply, the last, is written
+
+    async def handle_connection(self, reader, writer):
+        """Serves one client until it disconnects; its requests run concurrently."""
+        pending = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    error = {"code": INVALID_REQUEST, "message": f"Request larger than {MAX_REQUEST_SIZE} bytes."}
+                    writer.write(json.dumps({"jsonrpc": "2.0", "id": None, "error": error}).encode("utf-8") + b"\n")
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(self.respond(line, writer))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                    self.requests.add(task)
+                    task.add_done_callback(self.requests.discard)
+            if pending:
+                await asyncio.wait(pending)
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # the client went away, or the server is shutting down
+        finally:
+            for task in pending:
+                task.cancel()
+            with contextlib.suppress(ConnectionError, RuntimeError):
+                writer.close()
+
+    # Transports
+
+    async def serve_socket(self, path):
+        self.stopped = asyncio.Event()
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self.handle_connection, path, limit=MAX_REQUEST_SIZE)
+        print(f"Listening on {path}", file=sys.stderr)
+        try:
+            async with server:
+                await self.stopped.wait()
+        finally:
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+
+    async def serve_stdio(self):
+        self.stopped = asyncio.Event()
+        # Nothing but replies may reach stdout: stray prints go to stderr
+        sys.stdout = sys.stderr
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=MAX_REQUEST_SIZE)
+
+        # A thread feeds stdin in, so it works for pipes, terminals and redirected files alike
+        def pump():
+            for chunk in iter(lambda: sys.stdin.buffer.read1(1 << 16), b""):
+                loop.call_soon_threadsafe(reader.feed_data, chunk)
+            loop.call_soon_threadsafe(reader.feed_eof)
+
+        threading.Thread(target=pump, daemon=True).start()
+        connection = asyncio.ensure_future(self.handle_connection(reader, _StdoutWriter(sys.__stdout__.buffer)))
+        stopped = asyncio.ensure_future(self.stopped.wait())
+        await asyncio.wait([connection, stopped], return_when=asyncio.FIRST_COMPLETED)
+        stopped.cancel()
+
+    def close(self):
+        for worker in self.workers:
+            worker.kill()
+        self.waiters.shutdown(wait=False)
+
+
+class DaemonClient:
+    """Blocking client for a daemon listening on a Unix socket."""
+
+    def __init__(self, path):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(path)
+        self.file = self.socket.makefile("rb")
+        self.next_id = 0
+
+    def call(self, method, **params):
+        """Sends one request and returns its result; error replies raise RPCError."""
+        self.next_id += 1
+        request = {"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params}
+        self.socket.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("The daemon closed the connection.")
+        response = json.loads(line)
+        if "error" in response:
+            raise RPCError(response["error"]["code"], response["error"]["message"])
+        return response["result"]
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Serve lex and parse requests over JSON-RPC.")
+    transport = arg_parser.add_mutually_exclusive_group(required=True)
+    transport.add_argument("--socket", metavar="PATH", help="listen on this Unix socket")
+    transport.add_argument("--stdio", action="store_true", help="serve one client on stdin/stdout")
+    arg_parser.add_argument("--engine", choices=LEXER_ENGINES, default="dfa", help="lexer engine")
+    arg_parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="default per-request timeout in seconds")
+    arg_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = arg_parser.parse_args(argv)
+
+    daemon = Daemon(args.engine, args.timeout, args.workers)
+    try:
+        asyncio.run(daemon.serve_stdio() if args.stdio else daemon.serve_socket(args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
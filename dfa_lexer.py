@@ -0,0 +1,540 @@
+"""
+Table-driven DFA lexer for .cat sources.
+
+The transition tables are generated from the token tables in main.py
+(KEYWORDS, RES_WORDS, NOISE_WORDS, BOOL, DELI, SPECIAL_CHAR and the operator
+list), minimized, and cached on disk so that later runs only unpickle them.
+Token types are taken from the process_* functions themselves, so the engine
+emits exactly the same tokens as main.lexer().
+
+Usage: python dfa_lexer.py file.cat   (compares throughput with main.lexer)
+"""
+import hashlib
+import os
+import pickle
+import re
+import sys
+import time
+
+from main import (BOOL, DELI, KEYWORDS, NOISE_WORDS, OPERATOR_CHARS, RES_WORDS, SPECIAL_CHAR,
+                  UNARY_CONTEXT_TYPES, VALID_OPERATORS, process_deli, process_number,
+                  process_operator, process_quotes, process_word)
+
+# Bump when the layout of the pickled tables changes
+TABLE_FORMAT = 3
+
+# How a token's value is cut out of the source
+RAW = 1         # text[start:end]
+QUOTED = 2      # text between the quotes
+ML_CLOSED = 3   # "/* ... */" with the newlines removed
+ML_OPEN = 4     # unterminated "/* ..." with the newlines removed, "*/" appended
+# Action kinds that are not value kinds
+CONTEXT = 5     # "+" / "-": unary or arithmetic depending on the previous token
+DROP = 6        # valid operator without a token type: warn and skip one character
+
+# Start-state handling of whitespace classes
+SKIP_SPACE = 1
+SKIP_NEWLINE = 2
+
+# process_number switches from FLOAT to DOUBLE at this many decimals
+FRAC_LIMIT = 8
+
+# States that loop on all but this many classes (comment bodies, long strings)
+# are skipped with one regex match instead of one transition per character
+BULK_MAX_STOPS = 3
+
+# Representative characters for everything outside ASCII
+OTHER_ALPHA = "\u00e9"  # e acute
+OTHER_DIGIT = "\u0663"  # Arabic-Indic three
+OTHER_ALNUM = "\u00bd"  # vulgar fraction one half
+OTHER_SPACE = "\u2003"  # em space
+OTHER = "\u20ac"        # euro sign
+
+_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__")
+_tables = None
+
+
+class DFATables:
+    """Minimized transition tables plus the character class map."""
+    def __init__(self, classes, other_classes, continuation, ncls, start, start_trans, trans, bulk_skip, accept,
+                 actions, skip):
+        self.classes = classes              # char -> class id (ASCII)
+        self.other_classes = other_classes  # representative char -> class id (non-ASCII)
+        self.continuation = continuation    # class of UTF-8 continuation bytes: loops in every state
+        self.ncls = ncls
+        self.start = start
+        self.start_trans = start_trans      # class -> first state of a token, or -1
+        self.trans = trans                  # flat list: trans[state * ncls + cls] -> state, -1, or -2 - bulk state
+        self.bulk_skip = bulk_skip          # bulk state -> regex match over the classes it loops on
+        self.accept = accept                # state -> action id (0 = not accepting)
+        self.actions = actions              # action id -> (kind, type, alt_type)
+        self.skip = skip                    # class -> 0, SKIP_SPACE or SKIP_NEWLINE
+        self.unary_context = frozenset(UNARY_CONTEXT_TYPES)
+        self.ascii_codes = bytes(classes.get(chr(code), 0) for code in range(256))
+        self.translation = {ord(char): chr(cls) for char, cls in classes.items()}
+
+    def classify(self, char):
+        """Returns the class of a character, caching non-ASCII characters by their properties."""
+        if char.isspace():
+            rep = OTHER_SPACE
+        elif char.isalpha():
+            rep = OTHER_ALPHA
+        elif char.isdigit():
+            rep = OTHER_DIGIT
+        elif char.isalnum():
+            rep = OTHER_ALNUM
+        else:
+            rep = OTHER
+        cls = self.other_classes[rep]
+        self.classes[char] = cls
+        self.translation[ord(char)] = chr(cls)
+        return cls
+
+    def class_codes(self, text):
+        """Maps every character of `text` to its class id, one byte per character."""
+        if text.isascii():
+            return text.encode("ascii").translate(self.ascii_codes)
+        for char in set(text).difference(self.classes):
+            self.classify(char)
+        return text.translate(self.translation).encode("latin-1")
+
+
+# === Table generation ===
+
+def _word_char(char):
+    return char.isalnum() or char == "_" or char in SPECIAL_CHAR
+
+
+def _word_start(char):
+    return char.isalpha() or char == "_" or char in SPECIAL_CHAR
+
+
+class _Builder:
+    """Explores the token automaton over state descriptors and records its actions."""
+    def __init__(self):
+        self.reserved = KEYWORDS + RES_WORDS + BOOL + NOISE_WORDS
+        self.prefixes = {word[:i] for word in self.reserved for i in range(1, len(word) + 1)}
+        self.op_prefixes = {op[:i] for op in VALID_OPERATORS for i in range(1, len(op) + 1)}
+
+    def word_state(self, state, char):
+        """Next word state after consuming `char` in `state` (None for the start of a word)."""
+        if state is None:
+            if char == "_":
+                return ("under",)
+            if char in self.prefixes and char.isalnum():
+                return ("kw", char)
+            return ("word", char in SPECIAL_CHAR, False)
+        if state[0] == "kw":
+            prefix = state[1] + char
+            if prefix in self.prefixes and char.isalnum():
+                return ("kw", prefix)
+            state = ("word", False, False)
+        if state[0] == "under":
+            return state
+        special, last_under = state[1], state[2]
+        if char == "_" and last_under:
+            return ("under",)  # contains "__"
+        return ("word", special or char in SPECIAL_CHAR, char == "_")
+
+    def step(self, state, char):
+        kind = state[0]
+        if kind == "start":
+            if char in ("'", '"'):
+                return ("quote", char, 0)
+            if char in DELI:
+                return ("deli", char)
+            if char in OPERATOR_CHARS:
+                return ("op", char) if char in self.op_prefixes else ("op_bad",)
+            if char.isdigit():
+                return ("int",)
+            if char == ".":
+                return ("lead_dot",)
+            if _word_start(char):
+                return self.word_state(None, char)
+            return None
+        if kind == "quote":
+            if char == state[1]:
+                return ("closed", state[2])
+            if char == "\n":
+                return None
+            return ("quote", state[1], min(state[2] + 1, 2))
+        if kind == "op":
+            seq = state[1]
+            if char in OPERATOR_CHARS:
+                return ("op", seq + char) if seq + char in self.op_prefixes else ("op_bad",)
+            if seq == "//" and char != "\n":
+                return ("sl",)
+            if seq == "/*":
+                return ("ml", False)
+            return None
+        if kind == "op_bad":
+            return state if char in OPERATOR_CHARS else None
+        if kind == "sl":
+            return None if char == "\n" else state
+        if kind == "ml":
+            if char == "/" and state[1]:
+                return ("ml_done",)
+            return ("ml", char == "*")
+        if kind == "int":
+            if char.isdigit():
+                return state
+            if char == ".":
+                return ("dot",)
+            return ("num_inval",) if char.isalpha() else None
+        if kind == "dot":
+            return ("frac", 1) if char.isdigit() else None
+        if kind == "frac":
+            if char.isdigit():
+                return ("frac", min(state[1] + 1, FRAC_LIMIT))
+            return ("num_inval",) if char.isalpha() else None
+        if kind == "num_inval":
+            return state if char.isalnum() or char == "_" else None
+        if kind == "lead_dot":
+            if char.isdigit():
+                return ("frac", 1)
+            return self.word_state(("word", True, False), char) if _word_char(char) else None
+        if kind in ("kw", "word", "under"):
+            return self.word_state(state, char) if _word_char(char) else None
+        return None  # deli, closed, ml_done
+
+    def action(self, state):
+        """Returns the (kind, type, alt_type) accepted in `state`, or None."""
+        kind = state[0]
+        if kind == "deli":
+            return (RAW, process_deli(state[1], 0)["type"], None)
+        if kind == "quote":
+            token, _ = process_quotes(state[1] + "x" * state[2] + "\n", 0, 0)
+            return (RAW, token["type"], None)
+        if kind == "closed":
+            token, _ = process_quotes("'" + "x" * state[1] + "'", 0, 0)
+            return (QUOTED, token["type"], None)
+        if kind in ("op", "op_bad"):
+            seq = state[1] if kind == "op" else "||||"
+            unary, _ = process_operator(seq, 0, None, 0)
+            binary, _ = process_operator(seq, 0, {"type": "INTEGER"}, 0)
+            if unary is None and binary is None:
+                return (DROP, None, None)
+            if seq == "/*":
+                return (ML_OPEN, unary["type"], None)
+            if unary["type"] != binary["type"]:
+                return (CONTEXT, unary["type"], binary["type"])
+            return (RAW, unary["type"], None)
+        if kind == "sl":
+            token, _ = process_operator("//", 0, None, 0)
+            return (RAW, token["type"], None)
+        if kind in ("ml", "ml_done"):
+            token, _ = process_operator("/*", 0, None, 0)
+            return (ML_OPEN if kind == "ml" else ML_CLOSED, token["type"], None)
+        if kind == "int":
+            return (RAW, process_number("0", 0, 0)[0]["type"], None)
+        if kind == "frac":
+            return (RAW, process_number("0." + "0" * state[1], 0, 0)[0]["type"], None)
+        if kind == "num_inval":
+            return (RAW, process_number("0a", 0, 0)[0]["type"], None)
+        if kind == "lead_dot":
+            return (RAW, process_word(".", 0, 0)[0]["type"], None)
+        if kind == "kw":
+            return (RAW, process_word(state[1], 0, 0)[0]["type"], None)
+        if kind == "under":
+            return (RAW, process_word("_", 0, 0)[0]["type"], None)
+        if kind == "word":
+            # smallest words with the same flags: "a~", "a~_", "a_" and "a"
+            sample = "a" + ("~" if state[1] else "") + ("_" if state[2] else "")
+            return (RAW, process_word(sample, 0, 0)[0]["type"], None)
+        return None  # dot: only reachable after an accepting integer
+
+
+def _alphabet():
+    return [chr(code) for code in range(128)] + [OTHER_ALPHA, OTHER_DIGIT, OTHER_ALNUM, OTHER_SPACE, OTHER]
+
+
+def _skip_kind(char):
+    if char == "\n":
+        return SKIP_NEWLINE
+    return SKIP_SPACE if char.isspace() else 0
+
+
+def build_tables():
+    """Builds and minimizes the DFA from the token tables in main.py."""
+    builder = _Builder()
+    alphabet = _alphabet()
+
+    # Explore every reachable state descriptor
+    ids = {("start",): 0}
+    order = [("start",)]
+    edges = []
+    for state in order:
+        row = []
+        for char in alphabet:
+            nxt = None if state == ("start",) and _skip_kind(char) else builder.step(state, char)
+            if nxt is not None and nxt not in ids:
+                ids[nxt] = len(order)
+                order.append(nxt)
+            row.append(-1 if nxt is None else ids[nxt])
+        edges.append(row)
+
+    actions = [None]
+    action_ids = {}
+    accept = []
+    for state in order:
+        act = builder.action(state)
+        if act is None:
+            accept.append(0)
+            continue
+        if act not in action_ids:
+            action_ids[act] = len(actions)
+            actions.append(act)
+        accept.append(action_ids[act])
+
+    # Moore partition refinement; the start state keeps its own block
+    block = [(-1 if i == 0 else accept[i]) for i in range(len(order))]
+    while True:
+        signatures = {}
+        refined = []
+        for i, row in enumerate(edges):
+            sig = (block[i], tuple(block[t] if t >= 0 else None for t in row))
+            refined.append(signatures.setdefault(sig, len(signatures)))
+        if len(signatures) == len(set(block)):
+            block = refined
+            break
+        block = refined
+
+    nstates = len(set(block))
+    min_edges = [None] * nstates
+    min_accept = [0] * nstates
+    for i, row in enumerate(edges):
+        b = block[i]
+        if min_edges[b] is None:
+            min_edges[b] = [block[t] if t >= 0 else -1 for t in row]
+            min_accept[b] = accept[i]
+
+    # Merge characters whose columns (and whitespace handling) are identical
+    columns = {}
+    char_class = []
+    skip = []
+    for c, char in enumerate(alphabet):
+        sig = (_skip_kind(char), tuple(row[c] for row in min_edges))
+        if sig not in columns:
+            columns[sig] = len(columns)
+            skip.append(sig[0])
+        char_class.append(columns[sig])
+    # UTF-8 continuation bytes when scanning bytes: they never change the state
+    continuation = len(columns)
+    skip.append(SKIP_SPACE)
+    ncls = continuation + 1
+    class_reps = {}
+    for c, char in enumerate(alphabet):
+        class_reps.setdefault(char_class[c], c)
+
+    start = block[0]
+    rows = [[row[class_reps[cls]] for cls in range(continuation)] + [-1 if state == start else state]
+            for state, row in enumerate(min_edges)]
+
+    bulk_skip = {}
+    for state, row in enumerate(rows):
+        stops = bytes(cls for cls in range(ncls) if row[cls] != state)
+        if state != start and len(stops) <= BULK_MAX_STOPS:
+            bulk_skip[state] = re.compile(b"[^" + re.escape(stops) + b"]*").match
+
+    trans = []
+    for row in rows:
+        trans.extend(-2 - target if target in bulk_skip else target for target in row)
+
+    classes = {alphabet[c]: char_class[c] for c in range(128)}
+    other_classes = {alphabet[c]: char_class[c] for c in range(128, len(alphabet))}
+    return DFATables(classes, other_classes, continuation, ncls, start, rows[start], trans, bulk_skip, min_accept, actions, skip)
+
+
+def _tables_key():
+    digest = hashlib.sha256(str(TABLE_FORMAT).encode())
+    import main
+    for path in (main.__file__, __file__):
+        with open(path, "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest()[:16]
+
+
+def get_tables():
+    """Returns the DFA tables, loading them from the on-disk cache when possible."""
+    global _tables
+    if _tables is not None:
+        return _tables
+
+    path = os.path.join(_CACHE_DIR, f"dfa_tables.{_tables_key()}.pickle")
+    try:
+        with open(path, "rb") as cached:
+            _tables = pickle.load(cached)
+        return _tables
+    except (OSError, pickle.PickleError, EOFError, AttributeError):
+        pass
+
+    _tables = build_tables()
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as cached:
+            pickle.dump(_tables, cached, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # read-only checkout: just rebuild next time
+    return _tables
+
+
+# === Scanning ===
+
+def token_value(text, kind, start, end):
+    """Cuts the value of a token of the given value kind out of the source."""
+    if kind == QUOTED:
+        return text[start + 1:end - 1]
+    if kind == ML_CLOSED:
+        return "/*" + text[start + 2:end - 2].replace("\n", "") + "*/"
+    if kind == ML_OPEN:
+        return "/*" + text[start + 2:end].replace("\n", "") + "*/"
+    return text[start:end]
+
+
+def _last_accept(trans, ncls, accept, codes, state, start, end):
+    """Re-runs a token to find its longest accepting prefix: returns (state, end) or (-1, start)."""
+    last_state, last_end = (state, start + 1) if accept[state] else (-1, start)
+    for index in range(start + 1, end):
+        state = trans[state * ncls + codes[index]]
+        if state < -1:
+            state = -2 - state
+        if accept[state]:
+            last_state, last_end = state, index + 1
+    return last_state, last_end
+
+
+def _char_at(text, index):
+    """The character at `index` of a str, or starting at byte `index` of UTF-8 bytes."""
+    if isinstance(text, str):
+        return text[index]
+    return bytes(text[index:index + 4]).decode("utf-8", "replace")[0]
+
+
+def scan(text, pos=0, end=None, line_number=1, prev_type=None, final=True, origin=0, codes=None):
+    """
+    Scans text[pos:end] and returns (raw_tokens, pos, line_number, prev_type).
+
+    Raw tokens are (type, value_kind, start, end, line_number) tuples. When `final`
+    is False, scanning stops before a token that runs into `end`, since more input
+    could still extend it; the returned pos is where scanning has to resume.
+    `origin` is the offset of text[0] in the whole input, used in warnings.
+    `codes` are precomputed class codes of text[pos:end] (see mmap_lexer for bytes).
+    """
+    tables = get_tables()
+    start_trans = tables.start_trans
+    trans = tables.trans
+    bulk_skip = tables.bulk_skip
+    ncls = tables.ncls
+    accept = tables.accept
+    actions = tables.actions
+    skip = tables.skip
+    unary_context = tables.unary_context
+    if end is None:
+        end = len(text)
+
+    base = pos
+    if codes is None:
+        codes = tables.class_codes(text[pos:end] if pos or end != len(text) else text)
+    length = len(codes)
+    index = 0
+    tokens = []
+    append = tokens.append
+    while index < length:
+        cls = codes[index]
+        skip_kind = skip[cls]
+        if skip_kind:
+            if skip_kind == SKIP_NEWLINE:
+                line_number += 1
+            index += 1
+            continue
+
+        state = start_trans[cls]
+        if state < 0:
+            print(f"Warning: Unrecognized character '{_char_at(text, base + index)}' at index {origin + base + index}, line {line_number}")
+            index += 1
+            continue
+
+        # Run the DFA until it has no transition left
+        stop = index + 1
+        while stop < length:
+            next_state = trans[state * ncls + codes[stop]]
+            if next_state < 0:
+                if next_state == -1:
+                    break
+                # Entering a comment body or string: jump to the next character that leaves it
+                state = -2 - next_state
+                stop = bulk_skip[state](codes, stop + 1).end()
+                continue
+            state = next_state
+            stop += 1
+        else:
+            if not final:
+                break  # the token may continue in the next chunk
+
+        if not accept[state]:
+            state, stop = _last_accept(trans, ncls, accept, codes, start_trans[cls], index, stop)
+            if state < 0:
+                print(f"Warning: Unrecognized character '{_char_at(text, base + index)}' at index {origin + base + index}, line {line_number}")
+                index += 1
+                continue
+
+        kind, token_type, alt_type = actions[accept[state]]
+        if kind == DROP:
+            print(f"Warning: Unrecognized character '{_char_at(text, base + index)}' at index {origin + base + index}, line {line_number}")
+            index += 1
+            continue
+        if kind == CONTEXT:
+            if prev_type is not None and prev_type not in unary_context:
+                token_type = alt_type
+            kind = RAW
+        append((token_type, kind, base + index, base + stop, line_number))
+        prev_type = token_type
+        index = stop
+
+    return tokens, base + index, line_number, prev_type
+
+
+def lexer(input_text):
+    """Drop-in replacement for main.lexer() driven by the DFA tables."""
+    raw_tokens = scan(input_text)[0]
+    return [{"type": token_type,
+             "value": input_text[start:end] if kind == RAW else token_value(input_text, kind, start, end),
+             "line_number": line_number}
+            for token_type, kind, start, end, line_number in raw_tokens]
+
+
+def compare_engines(input_text, repeat=3):
+    """Times main.lexer() against the DFA lexer and checks that their tokens agree."""
+    import contextlib
+    import io
+    from main import lexer as reference_lexer
+
+    get_tables()
+    results = {}
+    for name, engine in (("reference", reference_lexer), ("dfa", lexer)):
+        best = None
+        with contextlib.redirect_stdout(io.StringIO()):  # silence warnings while timing
+            for _ in range(repeat):
+                started = time.perf_counter()
+                tokens = engine(input_text)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+        results[name] = (tokens, best)
+
+    same = results["reference"][0] == results["dfa"][0]
+    count = len(results["dfa"][0])
+    for name, (_, elapsed) in results.items():
+        rate = count / elapsed if elapsed else float("inf")
+        print(f"{name:>9}: {elapsed * 1000:9.2f} ms  {rate:12,.0f} tokens/s")
+    print(f"Tokens: {count}  identical: {same}")
+    return same
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python dfa_lexer.py <file.cat>")
+        sys.exit(2)
+    with open(sys.argv[1], "r") as file:
+        sys.exit(0 if compare_engines(file.read()) else 1)
@@ -0,0 +1,144 @@
+"""
+Structured syntax and semantic errors.
+
+Parser, StackParser and ll1_parser report each error as a Diagnostic: a code
+naming the message (the %error names of grammar.ll1), the line, the span of
+the offending token and the message's arguments. The text is only built when something prints or
+writes it, and str() gives exactly the line Parser used to report:
+
+    ❌ Syntax Error on line 3: Expected '(' after 'for'.
+
+A Diagnostic compares equal to that string, so code that checks errors
+against text keeps working.
+to_dict() / from_dict() turn one into plain data for JSON outputs and the
+result cache. semantic.py and vm.py report their errors and warnings the
+same way, under their own headings.
+"""
+
+# Message templates; those with arguments use {0}, {1}, ... (the others are printed as they are)
+MESSAGES = {
+    "unexpected_statement": "Unexpected statement.",
+    "unrecognized_statement": "Unrecognized function or statement '{0}'.",
+    "decrement_operator": "Expected '--' after identifier.",
+    "decrement_semicolon": "Expected ';' after '--'.",
+    "declaration_type": "Expected a type keyword at the beginning of the declaration.",
+    "declaration_identifier": "Expected an identifier after the type.",
+    "declaration_value": "Expected a valid value after assignment.",
+    "declaration_semicolon": "Missing ';' at the end of the declaration.",
+    "main_keyword": "Expected 'main' after 'int'.",
+    "main_paren": "Expected '(' after 'main'.",
+    "main_close": "Expected ')' after 'main('.",
+    "main_body": "Expected '{' to start main function body.",
+    "for_keyword": "Expected 'for' keyword.",
+    "for_paren": "Expected '(' after 'for'.",
+    "for_init": "Invalid initialization in for loop.",
+    "for_init_identifier": "Expected an Identifier after the type.",
+    "for_init_value": "Expected a value after '=' in initialization.",
+    "for_init_semicolon": "Missing ';' after initialization.",
+    "for_condition": "Expected a condition expression after initialization.",
+    "for_operator": "Expected a relational operator.",
+    "for_value": "Expected a value after the relational operator.",
+    "for_condition_semicolon": "Missing ';' after condition.",
+    "for_update": "Expected an identifier at the beginning of the update expression.",
+    "for_update_value": "Expected a valid expression after assignment operator in update section.",
+    "for_close": "Missing ')' after the update statement.",
+    "for_body": "Expected '{' after 'for' loop header.",
+    "if_keyword": "Expected 'if' keyword.",
+    "if_paren": "Expected '(' after 'if'.",
+    "if_condition": "Expected a condition expression.",
+    "if_operator": "Expected a valid comparison or logical operator.",
+    "if_value": "Expected a value after the operator.",
+    "if_close": "Expected ')' after condition.",
+    "if_body": "Expected OPEN_BRACKET after 'if' or 'else if'.",
+    "else_body": "Expected OPEN BRACKET to start else-body.",
+    "printf_paren": "Expected '(' after 'printf'.",
+    "printf_string": "Expected a string inside printf.",
+    "printf_argument": "Expected an identifier or string after `,`.",
+    "printf_close": "Expected ')' after printf arguments.",
+    "printf_semicolon": "Missing ';' after printf statement.",
+    "gc_paren": "Expected '(' after 'gc'.",
+    "gc_close": "Expected ')' after '(' for gc function.",
+    "gc_body": "Expected '{' to start 'gc' function body.",
+    "gc_unclosed": "Missing closing Bracket for 'gc' function.",
+    "return_value": "Expected a return value.",
+    "return_semicolon": "Missing ';' after return statement.",
+    "undeclared_variable": "Undeclared variable '{0}'.",
+    "redeclared_variable": "Variable '{0}' is already declared in this scope on line {1}.",
+    "shadowed_variable": "Variable '{0}' shadows the one declared on line {1}.",
+    "type_mismatch": "Cannot store a value of type {0} in {1} variable '{2}'.",
+    "invalid_operands": "Operator '{0}' does not apply to {1}.",
+    "printf_arguments": "The printf format takes {0} argument(s) but {1} were given.",
+    "nesting_limit": "Blocks nest deeper than the Python backend allows ({0}); run the program with vm.py.",
+}
+
+# What str() puts before the line number; codes not listed are syntax errors
+HEADINGS = {
+    "undeclared_variable": "❌ Semantic Error",
+    "redeclared_variable": "❌ Semantic Error",
+    "shadowed_variable": "⚠️ Warning",
+    "type_mismatch": "❌ Compile Error",
+    "invalid_operands": "❌ Compile Error",
+    "printf_arguments": "❌ Compile Error",
+    "nesting_limit": "❌ Compile Error",
+}
+WARNING_CODES = {"shadowed_variable"}
+
+
+class Diagnostic:
+    """One error or warning: tokens[start:end] is the token it was reported at (empty at the end of the input)."""
+    __slots__ = ("code", "line", "start", "end", "args")
+
+    def __init__(self, code, line, start, end, args=()):
+        self.code = code
+        self.line = line
+        self.start = start
+        self.end = end
+        self.args = args
+
+    @property
+    def message(self):
+        template = MESSAGES[self.code]
+        return template.format(*self.args) if self.args else template
+
+    @property
+    def severity(self):
+        return "warning" if self.code in WARNING_CODES else "error"
+
+    def __str__(self):
+        return f"{HEADINGS.get(self.code, '❌ Syntax Error')} on line {self.line}: {self.message}"
+
+    def __repr__(self):
+        return f"Diagnostic({self.code!r}, {self.line}, {self.start}, {self.end}, {self.args!r})"
+
+    def __eq__(self, other):
+        if isinstance(other, Diagnostic):
+            return (self.code, self.line, self.start, self.end, self.args) == \
+                (other.code, other.line, other.start, other.end, other.args)
+        if isinstance(other, str):
+            return str(self) == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def shifted(self, lines, positions):
+        """A copy moved down `lines` lines and `positions` tokens (IncrementalParser replays errors this way)."""
+        return Diagnostic(self.code, self.line + lines, self.start + positions, self.end + positions, self.args)
+
+    def to_dict(self):
+        return {"code": self.code, "line": self.line, "start": self.start, "end": self.end,
+                "args": list(self.args), "message": str(self)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["code"], data["line"], data["start"], data["end"], tuple(data["args"]))
+
+
+def error_dict(error):
+    """to_dict() of a Diagnostic; other errors (plain strings) become {"message": text}."""
+    return error.to_dict() if isinstance(error, Diagnostic) else {"message": str(error)}
+
+
+def error_from_dict(data):
+    """The error error_dict() returned `data` for."""
+    return Diagnostic.from_dict(data) if "code" in data else data["message"]
@@ -0,0 +1,196 @@
+"""
+Incremental re-lexing for editors.
+
+IncrementalLexer keeps the document as a list of blocks, each a run of whole
+lines holding its own text and its tokens with block-relative offsets and line
+numbers. Blocks are cut only where no token spans the cut, so an edit re-lexes
+the block it touches and keeps absorbing following blocks until the scanner is
+back in sync: the re-lexed text ends outside any comment or quote, and the
+token before the cut has the same type as before (it decides unary "+"/"-").
+Block offsets, line counts and token counts live in Fenwick trees, so nothing
+after the edit is rewritten; their absolute positions simply shift.
+"""
+from dfa_lexer import RAW, scan, token_value
+
+# Blocks are cut at the first clean line break after this many tokens; an edited
+# block is only cut again once it holds twice as many
+BLOCK_TOKENS = 64
+
+
+class _Fenwick:
+    """Prefix sums over per-block sizes with O(log n) updates and searches."""
+    def __init__(self, values):
+        self.size = len(values)
+        tree = [0] + list(values)
+        for index in range(1, self.size + 1):
+            parent = index + (index & -index)
+            if parent <= self.size:
+                tree[parent] += tree[index]
+        self.tree = tree
+
+    def add(self, index, delta):
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index):
+        """Sum of the first `index` values."""
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def search(self, target):
+        """Returns (index, prefix) of the value that covers position `target`, clamped to the last one."""
+        index = 0
+        remaining = target
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = index + step
+            if nxt <= self.size and self.tree[nxt] <= remaining:
+                index = nxt
+                remaining -= self.tree[nxt]
+            step >>= 1
+        if index >= self.size:
+            index = self.size - 1
+            return index, self.prefix(index)
+        return index, target - remaining
+
+
+class _Block:
+    """A run of whole lines with its tokens (offsets and lines relative to the block)."""
+    __slots__ = ("text", "tokens", "lines", "prev_type")
+
+    def __init__(self, text, tokens, lines, prev_type):
+        self.text = text
+        self.tokens = tokens        # (type, value_kind, start, end, line) tuples
+        self.lines = lines          # newlines the lexer counts in the block
+        self.prev_type = prev_type  # type of the last token up to the end of the block
+
+
+def _split_blocks(text, raw_tokens, lines, start_prev_type, block_tokens):
+    """Cuts lexed text (lines counted from 0) into blocks at line breaks no token spans."""
+    blocks = []
+    block_start = 0
+    block_line = 0
+    first = 0
+    prev_type = start_prev_type
+    count = len(raw_tokens)
+    for index in range(block_tokens - 1, count - 1):
+        if index - first < block_tokens - 1:
+            continue
+        token_end = raw_tokens[index][3]
+        newline = text.find("\n", token_end, raw_tokens[index + 1][2])
+        if newline == -1:
+            continue
+        cut = newline + 1
+        cut_line = raw_tokens[index][4] + 1
+        tokens = [(token_type, kind, start - block_start, end - block_start, line - block_line)
+                  for token_type, kind, start, end, line in raw_tokens[first:index + 1]]
+        blocks.append(_Block(text[block_start:cut], tokens, cut_line - block_line, raw_tokens[index][0]))
+        block_start, block_line, first = cut, cut_line, index + 1
+    if first:
+        prev_type = blocks[-1].prev_type
+    tokens = [(token_type, kind, start - block_start, end - block_start, line - block_line)
+              for token_type, kind, start, end, line in raw_tokens[first:]]
+    if tokens:
+        prev_type = tokens[-1][0]
+    blocks.append(_Block(text[block_start:], tokens, lines - block_line, prev_type))
+    return blocks
+
+
+def _token_dicts(block, line_number):
+    text = block.text
+    return [{"type": token_type,
+             "value": text[start:end] if kind == RAW else token_value(text, kind, start, end),
+             "line_number": line_number + line}
+            for token_type, kind, start, end, line in block.tokens]
+
+
+class IncrementalLexer:
+    """Lexes a document once, then re-lexes only the region damaged by each edit."""
+    def __init__(self, text="", block_tokens=BLOCK_TOKENS):
+        self.block_tokens = block_tokens
+        raw_tokens, _, lines, _ = scan(text, line_number=0)
+        self.blocks = _split_blocks(text, raw_tokens, lines, None, block_tokens)
+        self._reindex()
+
+    def _reindex(self):
+        self._chars = _Fenwick([len(block.text) for block in self.blocks])
+        self._lines = _Fenwick([block.lines for block in self.blocks])
+        self._counts = _Fenwick([len(block.tokens) for block in self.blocks])
+
+    def __len__(self):
+        return self._counts.prefix(len(self.blocks))
+
+    @property
+    def length(self):
+        """Length of the document in characters."""
+        return self._chars.prefix(len(self.blocks))
+
+    @property
+    def text(self):
+        return "".join(block.text for block in self.blocks)
+
+    def tokens(self):
+        """All tokens as the dicts main.lexer() returns."""
+        tokens = []
+        line_number = 1
+        for block in self.blocks:
+            tokens.extend(_token_dicts(block, line_number))
+            line_number += block.lines
+        return tokens
+
+    def edit(self, start, end, new_text):
+        """
+        Replaces text[start:end] with `new_text` and re-lexes the damaged blocks.
+
+        Returns (index, removed, added): the tokens at index:index + removed in the
+        old token list were replaced by the `added` token dicts. Tokens after them
+        are unchanged apart from their line numbers, which shift by the lines added.
+        """
+        if not 0 <= start <= end <= self.length:
+            raise ValueError(f"Edit range {start}:{end} is outside the document (length {self.length}).")
+        blocks = self.blocks
+        first, first_offset = self._chars.search(start)
+        last, last_offset = self._chars.search(end - 1) if end > start else (first, first_offset)
+        parts = [blocks[first].text[:start - first_offset], new_text, blocks[last].text[end - last_offset:]]
+        prev_type = blocks[first - 1].prev_type if first else None
+
+        absorb = 1
+        while True:
+            segment = "".join(parts)
+            final = last == len(blocks) - 1
+            raw_tokens, pos, lines, end_prev_type = scan(segment, 0, None, 0, prev_type, final, first_offset)
+            if final or (pos == len(segment) and end_prev_type == blocks[last].prev_type):
+                break
+            # Still out of sync (an opened comment or quote, a joined line, a new +/- context):
+            # take in more of the following blocks, doubling each time
+            taken = blocks[last + 1:last + 1 + absorb]
+            parts = [segment] + [block.text for block in taken]
+            last += len(taken)
+            absorb *= 2
+
+        block_tokens = self.block_tokens if len(raw_tokens) > 2 * self.block_tokens else len(raw_tokens) + 1
+        new_blocks = _split_blocks(segment, raw_tokens, lines, prev_type, block_tokens)
+        index = self._counts.prefix(first)
+        removed = sum(len(block.tokens) for block in blocks[first:last + 1])
+        line_number = 1 + self._lines.prefix(first)
+        if len(new_blocks) == 1 and first == last:
+            old_block = blocks[first]
+            new_block = new_blocks[0]
+            blocks[first] = new_block
+            self._chars.add(first, len(new_block.text) - len(old_block.text))
+            self._lines.add(first, new_block.lines - old_block.lines)
+            self._counts.add(first, len(new_block.tokens) - len(old_block.tokens))
+        else:
+            blocks[first:last + 1] = new_blocks
+            self._reindex()
+
+        added = []
+        for block in new_blocks:
+            added.extend(_token_dicts(block, line_number))
+            line_number += block.lines
+        return index, removed, added
@@ -0,0 +1,152 @@
+"""
+Incremental reparsing with a per-statement cache.
+
+parse_statement() at a given token position only depends on the tokens it
+reads from there on, so IncrementalParser records, for every statement it
+parses (at any depth: main and gc bodies, if/else and for bodies), how many
+tokens it consumed and read, the errors with lines and token spans relative
+to its first token, the variables it declared and its syntax tree records. The cache is keyed by the start of
+that token range. On the next parse() a statement whose range holds the same
+tokens as before (same types and values, lines shifted by a constant), at the
+same position or at the position shifted by the change in token count, is
+replayed from the cache instead of being parsed, so after an edit only the
+statements that contain it are parsed again.
+
+Ranges are checked against the previous token list with list comparisons
+rather than by hashing the new tokens, which would cost about as much as
+parsing them.
+"""
+from operator import itemgetter
+
+from diagnostics import Diagnostic
+from parser import Parser
+from syntax_tree import SyntaxTree
+
+_TYPE_VALUE = itemgetter("type", "value")
+_LINE_NUMBER = itemgetter("line_number")
+
+
+class _Entry:
+    """Cached result of one parse_statement() call."""
+    __slots__ = ("consumed", "read", "errors", "variables", "records")
+
+    def __init__(self, consumed, read, errors, variables, records):
+        self.consumed = consumed    # tokens the statement moved past
+        self.read = read            # tokens it looked at (may include the end of tokens)
+        self.errors = errors        # Diagnostics moved to line 0 and token 0
+        self.variables = variables  # identifiers it declared, in order
+        self.records = records      # its SyntaxTree.records(), spans as first parsed
+
+
+class _RecordingSet(set):
+    """Set of declared variables that also logs every add, so statements can be replayed."""
+    def __init__(self):
+        super().__init__()
+        self.log = []
+
+    def add(self, item):
+        self.log.append(item)
+        super().add(item)
+
+    def replay(self, items):
+        self.log.extend(items)
+        self.update(items)
+
+
+def _shifted_errors(errors, lines, positions):
+    return [error.shifted(lines, positions) if isinstance(error, Diagnostic) else error for error in errors]
+
+
+class IncrementalParser(Parser):
+    """Parser that reuses the results of statements unchanged since the previous parse()."""
+    def __init__(self, tree=True):
+        super().__init__([], tree=tree)
+        self.cache = {}       # start index in the last parsed token list -> _Entry
+        self.max_read = -1
+        self.hits = 0
+        self.misses = 0
+        self._previous = {}
+        self._previous_tokens = []
+        self._shift = 0
+
+    def current_token(self):
+        if self.current_token_index > self.max_read:
+            self.max_read = self.current_token_index
+        return super().current_token()
+
+    def peek_next_token(self):
+        if self.current_token_index + 1 > self.max_read:
+            self.max_read = self.current_token_index + 1
+        return super().peek_next_token()
+
+    def parse(self, tokens):
+        """Parses `tokens` like main() does and returns the list of errors."""
+        self._previous = self.cache
+        self._previous_tokens = self.tokens
+        self._shift = len(tokens) - len(self.tokens)
+        self.cache = {}
+        self.tokens = tokens
+        self.current_token_index = 0
+        self.variables = _RecordingSet()
+        self.error_count = self.for_depth = 0
+        if self.tree is not None:
+            self.tree = SyntaxTree(tokens)
+        self.hits = self.misses = 0
+
+        errors = []
+        while self.current_token():
+            result = self.parse_statement()
+            if result:
+                errors.extend(result)
+        self._previous = {}
+        self._previous_tokens = []
+        return errors
+
+    def _same_tokens(self, old_start, start, read):
+        """True if old tokens[old_start:][:read] match the new tokens[start:][:read] (end of tokens included)."""
+        old = self._previous_tokens[old_start:old_start + read]
+        new = self.tokens[start:start + read]
+        if len(old) != len(new):
+            return False
+        shift = new[0]["line_number"] - old[0]["line_number"]
+        if shift == 0:
+            return old == new
+        return list(map(_TYPE_VALUE, old)) == list(map(_TYPE_VALUE, new)) and \
+            list(map(shift.__add__, map(_LINE_NUMBER, old))) == list(map(_LINE_NUMBER, new))
+
+    def _lookup(self, start):
+        for old_start in (start, start - self._shift):
+            entry = self._previous.get(old_start)
+            if entry is not None and self._same_tokens(old_start, start, entry.read):
+                return entry
+        return None
+
+    def parse_statement(self):
+        start = self.current_token_index
+        if start >= len(self.tokens):
+            return super().parse_statement()
+        first_line = self.tokens[start]["line_number"]
+
+        entry = self._lookup(start)
+        if entry is not None:
+            self.hits += 1
+            self.current_token_index = start + entry.consumed
+            self.max_read = max(self.max_read, start + entry.read - 1)
+            self.variables.replay(entry.variables)
+            if self.tree is not None and entry.records[0]:
+                self.tree.extend(entry.records, start - entry.records[1][0])
+            self.cache[start] = entry
+            return _shifted_errors(entry.errors, first_line, start)
+
+        self.misses += 1
+        outer_max_read = self.max_read
+        self.max_read = start
+        log_start = len(self.variables.log)
+        first_record = len(self.tree) if self.tree is not None else 0
+        errors = super().parse_statement()
+        read = min(self.max_read, len(self.tokens)) - start + 1
+        records = self.tree.records(first_record, len(self.tree)) if self.tree is not None else None
+        self.cache[start] = _Entry(self.current_token_index - start, read, _shifted_errors(errors, -first_line, -start),
+                                   self.variables.log[log_start:], records)
+        self.max_read = max(outer_max_read, self.max_read)
+        return errors
@@ -0,0 +1,595 @@
+"""
+LL(1) parser generator: reads grammar.ll1 and writes the table-driven ll1_parser.py.
+
+Computes FIRST and FOLLOW sets, checks that every rule can be predicted from
+the next token alone (no two alternatives start with the same token, one
+fallback alternative per rule, and no nullable rule whose FIRST and FOLLOW
+sets overlap), then emits prediction tables keyed on integer token kinds
+(main.TOKEN_TYPE_CODES) with token classes as bitmasks. The grammar format
+is described at the top of grammar.ll1.
+
+    python ll1_generate.py
+    python ll1_generate.py grammar.ll1 --output ll1_parser.py --report
+"""
+import argparse
+import os
+import re
+import shlex
+import sys
+
+from diagnostics import MESSAGES
+from main import TOKEN_TYPE_NAMES
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_GRAMMAR = os.path.join(ROOT, "grammar.ll1")
+DEFAULT_OUTPUT = os.path.join(ROOT, "ll1_parser.py")
+
+END = "$"
+EMPTY = "<empty>"
+
+# Items of an alternative
+TOKEN, RULE, AT_END, ERROR, DISCARD = "token", "rule", "end", "error", "discard"
+
+_NAME = re.compile(r"[A-Za-z_][\w-]*$")
+
+
+class GrammarError(ValueError):
+    pass
+
+
+class Grammar:
+    """A parsed grammar.ll1: token classes, rules, recoveries and errors, in file order."""
+
+    def __init__(self):
+        self.classes = {}     # name -> frozenset of token types
+        self.rules = {}       # name -> [alternative], alternative = [(kind, argument, error)]
+        self.sources = {}     # rule name -> [alternative text]
+        self.recoveries = {}  # name -> [None (advance) or (stop set, past set)]
+        self.errors = {}      # diagnostics code -> recovery name
+        self.construct = None
+        self.first = {}
+        self.nullable = {}
+        self.fallback = {}    # rule -> index of its fallback alternative
+        self.follow = {}
+        self.predict = {}     # rule -> {token type or END: alternative index}
+
+    # Reading
+
+    @classmethod
+    def read(cls, path):
+        with open(path, encoding="utf-8") as file:
+            return cls.parse(file.read(), path)
+
+    @classmethod
+    def parse(cls, text, name="<grammar>"):
+        grammar = cls()
+        definitions = []  # (line number, text); indented lines continue the previous definition
+        for number, line in enumerate(text.splitlines(), 1):
+            stripped = line.rstrip()
+            if not stripped.strip() or stripped.lstrip().startswith("#"):
+                continue
+            if stripped[0].isspace():
+                if not definitions:
+                    raise GrammarError(f"{name}:{number}: continuation line with nothing to continue")
+                definitions[-1] = (definitions[-1][0], definitions[-1][1] + " " + stripped.strip())
+            else:
+                definitions.append((number, stripped))
+
+        pending_rules = []
+        for number, definition in definitions:
+            try:
+                if definition.startswith("%"):
+                    grammar._directive(definition)
+                elif "->" in definition:
+                    rule, alternatives = (part.strip() for part in definition.split("->", 1))
+                    if not _NAME.match(rule) or rule in grammar.rules:
+                        raise GrammarError(f"bad or repeated rule name '{rule}'")
+                    grammar.rules[rule] = None
+                    pending_rules.append((number, rule, alternatives))
+                elif "=" in definition:
+                    class_name, types = (part.strip() for part in definition.split("=", 1))
+                    if not _NAME.match(class_name) or class_name in grammar.classes:
+                        raise GrammarError(f"bad or repeated class name '{class_name}'")
+                    grammar.classes[class_name] = grammar._token_set(types.split())
+                else:
+                    raise GrammarError(f"cannot read '{definition}'")
+            except GrammarError as e:
+                raise GrammarError(f"{name}:{number}: {e}") from None
+
+        for number, rule, alternatives in pending_rules:
+            try:
+                texts = [alternative.strip() for alternative in alternatives.split("|")]
+                grammar.sources[rule] = texts
+                grammar.rules[rule] = [grammar._alternative(text) for text in texts]
+            except GrammarError as e:
+                raise GrammarError(f"{name}:{number}: {e}") from None
+        grammar._validate(name)
+        grammar._analyze()
+        return grammar
+
+    def _directive(self, definition):
+        words = shlex.split(definition)
+        if words[0] == "%construct" and len(words) == 2:
+            self.construct = words[1]
+        elif words[0] == "%recover" and len(words) >= 2:
+            self.recoveries[words[1]] = self._recovery(words[2:])
+        elif words[0] == "%error" and len(words) == 3:
+            self.errors[words[1]] = words[2]
+        else:
+            raise GrammarError(f"cannot read directive '{definition}'")
+
+    def _token_set(self, names):
+        types = set()
+        for name in names:
+            if name in self.classes:
+                types |= self.classes[name]
+            elif name in TOKEN_TYPE_NAMES:
+                types.add(name)
+            else:
+                raise GrammarError(f"unknown token type or class '{name}'")
+        return frozenset(types)
+
+    def _recovery(self, words):
+        phases = []
+        for phase in " ".join(words).split(" then ") if words else []:
+            phase_words = phase.split()
+            if phase_words == ["advance"]:
+                phases.append(None)
+                continue
+            sets = {"stop": [], "past": []}
+            current = None
+            for word in phase_words:
+                if word in sets:
+                    current = sets[word]
+                elif current is None:
+                    raise GrammarError(f"expected 'advance', 'stop' or 'past' before '{word}'")
+                else:
+                    current.append(word)
+            phases.append((self._token_set(sets["stop"]), self._token_set(sets["past"])))
+        return phases
+
+    def _alternative(self, text):
+        items = []
+        for word in text.split():
+            if word == EMPTY:
+                continue
+            if word == END:
+                items.append((AT_END, None, None))
+            elif word == "@discard":
+                items.append((DISCARD, None, None))
+            elif word.startswith("!"):
+                items.append((ERROR, word[1:], None))
+            else:
+                symbol, _, error = word.partition(":")
+                if symbol in self.rules:
+                    if error:
+                        raise GrammarError(f"rule '{symbol}' cannot take an error (give its alternatives !errors)")
+                    items.append((RULE, symbol, None))
+                else:
+                    items.append((TOKEN, symbol, error or None))
+        return items
+
+    def _validate(self, name):
+        if self.construct not in self.rules:
+            raise GrammarError(f"{name}: %construct must name a rule")
+        for error, recovery in self.errors.items():
+            if error not in MESSAGES:
+                raise GrammarError(f"{name}: error '{error}' is not a code in diagnostics.MESSAGES")
+            if recovery not in self.recoveries:
+                raise GrammarError(f"{name}: unknown recovery '{recovery}'")
+        for rule, alternatives in self.rules.items():
+            for alternative in alternatives:
+                for position, (kind, argument, error) in enumerate(alternative):
+                    if kind == TOKEN:
+                        self._token_set([argument])
+                    if (kind == ERROR and argument not in self.errors) or (error and error not in self.errors):
+                        raise GrammarError(f"{name}: unknown error '{argument if kind == ERROR else error}' in {rule}")
+                    if kind == TOKEN and not error and position != 0:
+                        raise GrammarError(f"{name}: '{argument}' in {rule} needs an error (only the first "
+                                           "item of an alternative is guaranteed by prediction)")
+                    if kind == AT_END and position != 0:
+                        raise GrammarError(f"{name}: '$' can only start an alternative ({rule})")
+
+    # Analysis
+
+    def tokens_of(self, item):
+        kind, argument, _ = item
+        if kind == AT_END:
+            return frozenset([END])
+        return self.classes.get(argument) or frozenset([argument])
+
+    def sequence(self, items):
+        """
+        FIRST set of `items`, whether they can match nothing, and whether they take any token
+        (they can be empty, start with an !error, a token with an error or a rule with a fallback).
+        """
+        first = set()
+        for kind, argument, error in items:
+            if kind == DISCARD:
+                continue
+            if kind == ERROR:
+                return first, False, True
+            if kind == RULE:
+                first |= self.first[argument]
+                if self.nullable[argument]:
+                    continue
+                return first, False, argument in self.fallback
+            first |= self.tokens_of((kind, argument, None))
+            return first, False, error is not None  # a token with an error reports any other token
+        return first, True, True
+
+    def _analyze(self):
+        self.first = {rule: set() for rule in self.rules}
+        self.nullable = {rule: False for rule in self.rules}
+        changed = True
+        while changed:
+            changed = False
+            for rule, alternatives in self.rules.items():
+                for index, alternative in enumerate(alternatives):
+                    first, nullable, catches = self.sequence(alternative)
+                    if not first <= self.first[rule] or (nullable and not self.nullable[rule]) or \
+                            (catches and rule not in self.fallback):
+                        self.first[rule] |= first
+                        self.nullable[rule] = self.nullable[rule] or nullable
+                        if catches:
+                            self.fallback.setdefault(rule, index)
+                        changed = True
+
+        # FOLLOW: the construct is parsed repeatedly at the top level, so it can be followed by itself or the end
+        self.follow = {rule: set() for rule in self.rules}
+        self.follow[self.construct] |= self.first[self.construct] | {END}
+        changed = True
+        while changed:
+            changed = False
+            for rule, alternatives in self.rules.items():
+                for alternative in alternatives:
+                    for position, (kind, argument, _) in enumerate(alternative):
+                        if kind != RULE:
+                            continue
+                        first, nullable, _ = self.sequence(alternative[position + 1:])
+                        follow = first | (self.follow[rule] if nullable else set())
+                        if not follow <= self.follow[argument]:
+                            self.follow[argument] |= follow
+                            changed = True
+
+        conflicts = []
+        for rule, alternatives in self.rules.items():
+            table = {}
+            fallbacks = []
+            for index, alternative in enumerate(alternatives):
+                first, nullable, catches = self.sequence(alternative)
+                if catches:
+                    fallbacks.append(index)
+                for token_type in first:
+                    if table.setdefault(token_type, index) != index:
+                        conflicts.append(f"{rule}: {token_type} starts alternatives {table[token_type] + 1} "
+                                         f"and {index + 1}")
+            if len(fallbacks) != 1:
+                conflicts.append(f"{rule}: needs exactly one fallback alternative (<empty>, !error or a rule "
+                                 f"with one), has {len(fallbacks)}")
+            else:
+                self.fallback[rule] = fallbacks[0]
+            if self.nullable[rule]:
+                overlap = self.first[rule] & self.follow[rule]
+                if overlap:
+                    conflicts.append(f"{rule}: can be empty, but {', '.join(sorted(overlap))} both start and follow it")
+            self.predict[rule] = table
+        if conflicts:
+            raise GrammarError("grammar is not LL(1):\n  " + "\n  ".join(conflicts))
+
+    def discards(self, alternative, seen=()):
+        """Whether `alternative` can @discard its construct's errors (through rules that are not the construct)."""
+        for kind, argument, _ in alternative:
+            if kind == DISCARD:
+                return True
+            if kind == RULE and argument != self.construct and argument not in seen:
+                if any(self.discards(other, (*seen, argument)) for other in self.rules[argument]):
+                    return True
+        return False
+
+    def discarding(self):
+        """Token types that start a construct whose errors can be discarded."""
+        alternatives = self.rules[self.construct]
+        if self.discards(alternatives[self.fallback[self.construct]]):
+            raise GrammarError(f"the fallback alternative of {self.construct} cannot @discard")
+        return {token_type for token_type, index in self.predict[self.construct].items()
+                if self.discards(alternatives[index])}
+
+    def report(self):
+        lines = []
+        for rule in self.rules:
+            lines.append(f"{rule}{' (nullable)' if self.nullable[rule] else ''}")
+            lines.append(f"    FIRST  {' '.join(sorted(self.first[rule]))}")
+            lines.append(f"    FOLLOW {' '.join(sorted(self.follow[rule]))}")
+        return "\n".join(lines)
+
+
+# Code generation
+
+_HEADER = '''# Generated by ll1_generate.py from {grammar}; do not edit.
+# Regenerate with: python ll1_generate.py
+"""
+Table-driven LL(1) parser for .cat programs, generated from {grammar}.
+
+LL1Parser is a drop-in for parser.Parser: parse_statement() reports the same
+errors in the same order for every input Parser finishes (Parser hangs on some,
+e.g. a stray `else`, and crashes on some truncated headers), as the same
+diagnostics.Diagnostic records, and max_errors stops it where it stops Parser.
+It looks at integer token kinds and bitmasks only, and keeps its own stack
+instead of recursing.
+
+    from ll1_parser import LL1Parser, parse_tokens
+    errors = parse_tokens(tokens)
+"""
+from diagnostics import Diagnostic
+from main import TOKEN_TYPE_CODES, TOKEN_TYPE_NAMES
+
+END = len(TOKEN_TYPE_NAMES)  # kind of the end of the input
+OTHER = END + 1             # kind of token types the grammar has never heard of
+
+MATCH, MATCHES, RULE, OPEN, ERROR, DISCARD, CLOSE = range(7)  # OPEN: a rule that is a construct
+
+
+def _mask(*names):
+    return sum(1 << (END if name == "$" else TOKEN_TYPE_CODES[name]) for name in names)
+
+
+def _predict(default, entries):
+    """The production to use for every token kind."""
+    table = [PRODUCTIONS[default]] * (OTHER + 1)
+    for name, production in entries.items():
+        table[END if name == "$" else TOKEN_TYPE_CODES[name]] = PRODUCTIONS[production]
+    return table
+
+
+RULES = {rules!r}
+CONSTRUCT = {construct}  # {construct_name}
+DISCARDING = {discarding}  # first tokens of constructs that can @discard their errors (not counted to max_errors)
+
+# Rule items carry their rule's prediction table, filled in below once PRODUCTIONS exists
+_TABLES = [[] for _ in RULES]
+_DISCARD = (DISCARD, None, None)
+_CLOSE = (CLOSE, None, None)
+_START = (OPEN, _TABLES[CONSTRUCT], None)
+
+'''
+
+_DRIVER = '''
+
+def token_kinds(tokens):
+    """Integer kinds of the tokens, read from a TokenBuffer's column when given one."""
+    if hasattr(tokens, "kinds"):
+        remap = [TOKEN_TYPE_CODES.get(name, OTHER) for name in tokens.type_names]
+        return [remap[kind] for kind in tokens.kinds]
+    codes = TOKEN_TYPE_CODES
+    return [codes.get(token["type"], OTHER) for token in tokens]
+
+
+class LL1Parser:
+    """
+    Table-driven parser with parser.Parser's interface and errors. Rules are
+    expanded on an explicit stack, so nesting depth is not limited by recursion.
+    """
+
+    def __init__(self, tokens, max_errors=None):
+        self.tokens = tokens
+        self.current_token_index = 0
+        self.max_errors = max_errors  # stop at the end of the input once this many errors are reported
+        self.error_count = 0  # errors reported outside constructs that can @discard them
+        self.kinds = token_kinds(tokens)
+        self.kinds.append(END)
+
+    def current_token(self):
+        if self.current_token_index < len(self.tokens):
+            return self.tokens[self.current_token_index]
+        return None
+
+    def parse_statement(self):
+        """Parses one top-level statement, including every block nested in it, and returns its errors."""
+        return self._parse(once=True)
+
+    def parse(self):
+        """Parses the remaining tokens and returns all their errors."""
+        return self._parse(once=False)
+
+    def _parse(self, once):
+        kinds = self.kinds
+        size = len(kinds) - 1
+        index = self.current_token_index
+        errors = []
+        stack = []
+        constructs = []  # (stack height, first token index, errors reported before it, 1 if it can @discard)
+        tentative = 0  # open constructs that can @discard the errors reported in them
+        pop = stack.pop
+        push = stack.extend
+
+        while index < size:
+            stack.append(_START)
+            while stack:
+                operation, argument, error = pop()
+                if operation == RULE:
+                    shift, items = argument[kinds[index]]
+                    index += shift
+                    push(items)
+                    continue
+                elif operation == OPEN:
+                    stack.append(_CLOSE)
+                    discards = DISCARDING >> kinds[index] & 1
+                    tentative += discards
+                    constructs.append((len(stack), index, len(errors), discards))
+                    shift, items = argument[kinds[index]]
+                    index += shift
+                    push(items)
+                    continue
+                elif operation == MATCH:
+                    if argument >> kinds[index] & 1:
+                        index += 1
+                        continue
+                elif operation == MATCHES:
+                    for mask, error in argument:
+                        if not mask >> kinds[index] & 1:
+                            break
+                        index += 1
+                    else:
+                        continue
+                elif operation == CLOSE:
+                    tentative -= constructs.pop()[3]
+                    continue
+                elif operation == DISCARD:
+                    del errors[constructs[-1][2]:]
+                    continue
+
+                # A token is missing (MATCH, MATCHES) or the grammar reports an error (ERROR): abandon the construct
+                height, start, _, discards = constructs.pop()
+                tentative -= discards
+                del stack[height - 1:]
+                code, recovery, value = ERRORS[error]
+                token = self.tokens[start]
+                if value:  # about the construct's first token: reported there, with its value
+                    errors.append(Diagnostic(code, token["line_number"], start, start + 1, (token["value"],)))
+                else:
+                    errors.append(Diagnostic(code, token["line_number"], index, min(index + 1, size)))
+                index = self._recover(index, RECOVERIES[recovery])
+                if index == start:
+                    index += 1  # nothing consumed: skip a token so parsing moves on
+                if not tentative:
+                    self.error_count += 1
+                    if self.max_errors is not None and self.error_count >= self.max_errors:
+                        index = size  # every construct still open finishes as it would at the end
+            if once:
+                break
+
+        self.current_token_index = index
+        return errors
+
+    def _recover(self, index, phases):
+        kinds = self.kinds
+        size = len(kinds) - 1
+        for phase in phases:
+            if phase is None:
+                if index < size:
+                    index += 1
+                continue
+            stop, past = phase
+            either = stop | past
+            for index in range(index, size):
+                if either >> kinds[index] & 1:
+                    if past >> kinds[index] & 1:
+                        index += 1
+                    break
+            else:
+                index = size
+        return index
+
+def parse_tokens(tokens, max_errors=None):
+    """Like main.parse_tokens(), with LL1Parser."""
+    errors = LL1Parser(tokens, max_errors).parse()
+    return errors if max_errors is None else errors[:max_errors]
+'''
+
+
+def _mask_expression(types):
+    names = ", ".join(f'"{name}"' for name in sorted(types))
+    return f"_mask({names})"
+
+
+def generate(grammar, grammar_name="grammar.ll1"):
+    """The source of ll1_parser.py for `grammar`."""
+    rules = list(grammar.rules)
+    errors = list(grammar.errors)
+    recoveries = list(grammar.recoveries)
+    masks = {}  # token set -> index in MASKS
+
+    def mask(types):
+        return f"MASKS[{masks.setdefault(frozenset(types), len(masks))}]"
+
+    error_lines = []
+    for name in errors:
+        value = "{0}" in MESSAGES[name]
+        error_lines.append(f"    ({name!r}, {recoveries.index(grammar.errors[name])}, {value}),")
+
+    recovery_lines = []
+    for name in recoveries:
+        phases = ["None" if phase is None else f"({mask(phase[0])}, {mask(phase[1])})"
+                  for phase in grammar.recoveries[name]]
+        recovery_lines.append(f"    [{', '.join(phases)}],  # {name}")
+
+    production_lines = []
+    production_ids = {}
+    for rule, alternatives in grammar.rules.items():
+        for index, (alternative, text) in enumerate(zip(alternatives, grammar.sources[rule])):
+            items = []
+            run = []  # consecutive tokens become one MATCHES item
+            # A first token without an error is one prediction has checked: the parser just moves past it
+            shift = int(bool(alternative) and alternative[0][0] == TOKEN and alternative[0][2] is None)
+            for position, item in enumerate(alternative[shift:] + [(None, None, None)]):
+                kind, argument, error = item
+                if kind == TOKEN:
+                    run.append(f"({mask(grammar.tokens_of(item))}, {errors.index(error)})")
+                    continue
+                if len(run) == 1:
+                    items.append(f"(MATCH, {run[0][1:-1]})")
+                elif run:
+                    items.append(f"(MATCHES, ({', '.join(run)}), None)")
+                run = []
+                if kind == RULE:
+                    operation = "OPEN" if argument == grammar.construct else "RULE"
+                    items.append(f"({operation}, _TABLES[{rules.index(argument)}], None)")
+                elif kind == ERROR:
+                    items.append(f"(ERROR, None, {errors.index(argument)})")
+                elif kind == DISCARD:
+                    items.append("_DISCARD")
+                # AT_END needs no item: prediction has seen the end of the input
+            production_ids[rule, index] = len(production_ids)
+            items.reverse()
+            production_lines.append(f"    # {production_ids[rule, index]}: {rule} -> {text or EMPTY}")
+            production_lines.append(f"    ({shift}, ({', '.join(items)}{',' if len(items) == 1 else ''})),")
+
+    predict_lines = []
+    for rule in rules:
+        entries = {token_type: production_ids[rule, alternative]
+                   for token_type, alternative in sorted(grammar.predict[rule].items())}
+        predict_lines.append(f"    ({production_ids[rule, grammar.fallback[rule]]}, {entries!r}),  # {rule}")
+
+    mask_lines = [f"    _mask({', '.join(repr(name) for name in sorted(types))}),"
+                  for types in masks]
+    header = _HEADER.format(grammar=grammar_name, rules=rules, construct=rules.index(grammar.construct),
+                            construct_name=grammar.construct, discarding=_mask_expression(grammar.discarding()))
+    sections = [
+        header,
+        "MASKS = [", *mask_lines, "]", "",
+        "# (diagnostics code, recovery, whether it is about the construct's first token)",
+        "ERRORS = [", *error_lines, "]", "",
+        "# Phases: None skips one token; (stop, past) scans to a stop token or past a past token",
+        "RECOVERIES = [", *recovery_lines, "]", "",
+        "# (tokens to move past, items of the rest last first), for every alternative",
+        "PRODUCTIONS = [", *production_lines, "]", "",
+        "# For each rule: the production for tokens no alternative starts with, and for the others",
+        "PREDICT = [", *predict_lines, "]", "",
+        "for _table, (_default, _entries) in zip(_TABLES, PREDICT):",
+        "    _table.extend(_predict(_default, _entries))",
+    ]
+    return "\n".join(sections) + _DRIVER
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Generate ll1_parser.py from grammar.ll1.")
+    arg_parser.add_argument("grammar", nargs="?", default=DEFAULT_GRAMMAR, help="grammar file")
+    arg_parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Python module to write")
+    arg_parser.add_argument("--report", action="store_true", help="print the FIRST and FOLLOW sets")
+    args = arg_parser.parse_args()
+
+    try:
+        grammar = Grammar.read(args.grammar)
+    except (OSError, GrammarError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if args.report:
+        print(grammar.report())
+    with open(args.output, "w", encoding="utf-8") as file:
+        file.write(generate(grammar, os.path.basename(args.grammar)))
+    print(f"Wrote {args.output} ({len(grammar.rules)} rules, {len(grammar.errors)} errors)")
+
+
+if __name__ == "__main__":
+    main()
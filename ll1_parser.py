@@ -0,0 +1,377 @@
+# Generated by ll1_generate.py from grammar.ll1; do not edit.
+# Regenerate with: python ll1_generate.py
+"""
+Table-driven LL(1) parser for .cat programs, generated from grammar.ll1.
+
+LL1Parser is a drop-in for parser.Parser: parse_statement() reports the same
+errors in the same order for every input Parser finishes (Parser hangs on some,
+e.g. a stray `else`, and crashes on some truncated headers), as the same
+diagnostics.Diagnostic records, and max_errors stops it where it stops Parser.
+It looks at integer token kinds and bitmasks only, and keeps its own stack
+instead of recursing.
+
+    from ll1_parser import LL1Parser, parse_tokens
+    errors = parse_tokens(tokens)
+"""
+from diagnostics import Diagnostic
+from main import TOKEN_TYPE_CODES, TOKEN_TYPE_NAMES
+
+END = len(TOKEN_TYPE_NAMES)  # kind of the end of the input
+OTHER = END + 1             # kind of token types the grammar has never heard of
+
+MATCH, MATCHES, RULE, OPEN, ERROR, DISCARD, CLOSE = range(7)  # OPEN: a rule that is a construct
+
+
+def _mask(*names):
+    return sum(1 << (END if name == "$" else TOKEN_TYPE_CODES[name]) for name in names)
+
+
+def _predict(default, entries):
+    """The production to use for every token kind."""
+    table = [PRODUCTIONS[default]] * (OTHER + 1)
+    for name, production in entries.items():
+        table[END if name == "$" else TOKEN_TYPE_CODES[name]] = PRODUCTIONS[production]
+    return table
+
+
+RULES = ['Statement', 'IdentifierStatement', 'IntStatement', 'Body', 'Declaration', 'Assignment', 'DeclarationEnd', 'ForLoop', 'ForInit', 'ForInitValue', 'Update', 'ForBody', 'IfElse', 'Else', 'Printf', 'PrintfArguments', 'Gc', 'GcBody']
+CONSTRUCT = 0  # Statement
+DISCARDING = _mask("FOR_KEY")  # first tokens of constructs that can @discard their errors (not counted to max_errors)
+
+# Rule items carry their rule's prediction table, filled in below once PRODUCTIONS exists
+_TABLES = [[] for _ in RULES]
+_DISCARD = (DISCARD, None, None)
+_CLOSE = (CLOSE, None, None)
+_START = (OPEN, _TABLES[CONSTRUCT], None)
+
+
+MASKS = [
+    _mask('CHAR_KEY', 'DOUBLE_KEY', 'ELSE_KEY', 'FALSE_BOOL', 'FLOAT_KEY', 'FOR_KEY', 'IF_KEY', 'INT_KEY', 'PRINTF_KEY', 'RETURN_KEY', 'SINGLE_LINE_COMMENT', 'STRING_KEY', 'TRUE_BOOL'),
+    _mask('CLOSE-CURL-BRAC_DELI', 'SEMI-COLON_DELI'),
+    _mask('CHAR_KEY', 'CLOSE-CURL-BRAC_DELI', 'DOUBLE_KEY', 'ELSE_KEY', 'FALSE_BOOL', 'FLOAT_KEY', 'FOR_KEY', 'IF_KEY', 'INT_KEY', 'PRINTF_KEY', 'RETURN_KEY', 'SINGLE_LINE_COMMENT', 'STRING_KEY', 'TRUE_BOOL'),
+    _mask('SEMI-COLON_DELI'),
+    _mask(),
+    _mask('CLOSE-PAREN_DELI'),
+    _mask('CLOSE-CURL-BRAC_DELI'),
+    _mask('FLOAT', 'IDENTIFIER', 'INTEGER'),
+    _mask('OPEN-PAREN_DELI'),
+    _mask('OPEN-CURL-BRAC_DELI'),
+    _mask('CHAR_KEY', 'DOUBLE', 'FALSE_BOOL', 'FLOAT', 'IDENTIFIER', 'INTEGER', 'STRING_KEY', 'TRUE_BOOL'),
+    _mask('EQUAL-REL_OP', 'GREAT-EQL-REL_OP', 'GREAT-REL_OP', 'LESS-EQL-REL_OP', 'LESS-REL_OP', 'NOT-REL_OP'),
+    _mask('IDENTIFIER'),
+    _mask('CHAR_KEY', 'DOUBLE', 'FLOAT', 'IDENTIFIER', 'INTEGER', 'STRING_KEY'),
+    _mask('DOUBLE', 'FLOAT', 'IDENTIFIER', 'INTEGER'),
+    _mask('CHAR_KEY', 'FALSE_BOOL', 'FLOAT', 'IDENTIFIER', 'INTEGER', 'STRING_KEY', 'TRUE_BOOL'),
+    _mask('AND-LOGIC_OP', 'EQUAL-REL_OP', 'GREAT-EQL-REL_OP', 'GREAT-REL_OP', 'LESS-EQL-REL_OP', 'LESS-REL_OP', 'NOT-REL_OP', 'OR-LOGIC_OP'),
+    _mask('STRING_KEY'),
+    _mask('CHAR_KEY', 'IDENTIFIER', 'STRING_KEY'),
+]
+
+# (diagnostics code, recovery, whether it is about the construct's first token)
+ERRORS = [
+    ('unexpected_statement', 1, False),
+    ('unrecognized_statement', 4, True),
+    ('decrement_semicolon', 1, False),
+    ('declaration_type', 3, False),
+    ('declaration_identifier', 3, False),
+    ('declaration_value', 3, False),
+    ('declaration_semicolon', 3, False),
+    ('main_paren', 1, False),
+    ('main_close', 1, False),
+    ('main_body', 1, False),
+    ('for_paren', 4, False),
+    ('for_init', 4, False),
+    ('for_init_identifier', 4, False),
+    ('for_init_value', 4, False),
+    ('for_init_semicolon', 4, False),
+    ('for_condition', 4, False),
+    ('for_operator', 4, False),
+    ('for_value', 4, False),
+    ('for_condition_semicolon', 4, False),
+    ('for_update', 4, False),
+    ('for_update_value', 4, False),
+    ('for_close', 4, False),
+    ('for_body', 4, False),
+    ('if_paren', 1, False),
+    ('if_condition', 1, False),
+    ('if_operator', 1, False),
+    ('if_value', 1, False),
+    ('if_close', 1, False),
+    ('if_body', 1, False),
+    ('else_body', 1, False),
+    ('printf_paren', 1, False),
+    ('printf_string', 1, False),
+    ('printf_argument', 2, False),
+    ('printf_close', 1, False),
+    ('printf_semicolon', 1, False),
+    ('gc_paren', 1, False),
+    ('gc_close', 1, False),
+    ('gc_body', 1, False),
+    ('gc_unclosed', 0, False),
+    ('return_value', 2, False),
+    ('return_semicolon', 2, False),
+]
+
+# Phases: None skips one token; (stop, past) scans to a stop token or past a past token
+RECOVERIES = [
+    [],  # none
+    [(MASKS[0], MASKS[1])],  # statement
+    [None, (MASKS[0], MASKS[1])],  # next_statement
+    [(MASKS[2], MASKS[3])],  # declaration
+    [(MASKS[4], MASKS[5]), (MASKS[4], MASKS[6])],  # for_loop
+]
+
+# (tokens to move past, items of the rest last first), for every alternative
+PRODUCTIONS = [
+    # 0: Statement -> SINGLE_LINE_COMMENT
+    (1, ()),
+    # 1: Statement -> IDENTIFIER IdentifierStatement
+    (1, ((RULE, _TABLES[1], None),)),
+    # 2: Statement -> INT_KEY IntStatement
+    (1, ((RULE, _TABLES[2], None),)),
+    # 3: Statement -> DeclarationType Declaration
+    (1, ((RULE, _TABLES[4], None),)),
+    # 4: Statement -> BoolValue !declaration_type
+    (1, ((ERROR, None, 3),)),
+    # 5: Statement -> FOR_KEY ForLoop
+    (1, ((RULE, _TABLES[7], None),)),
+    # 6: Statement -> IF_KEY IfElse
+    (1, ((RULE, _TABLES[12], None),)),
+    # 7: Statement -> PRINTF_KEY Printf
+    (1, ((RULE, _TABLES[14], None),)),
+    # 8: Statement -> GC_KEY Gc
+    (1, ((RULE, _TABLES[16], None),)),
+    # 9: Statement -> RETURN_KEY ReturnValue:return_value SEMI-COLON_DELI:return_semicolon
+    (1, ((MATCHES, ((MASKS[7], 39), (MASKS[3], 40)), None),)),
+    # 10: Statement -> !unexpected_statement
+    (0, ((ERROR, None, 0),)),
+    # 11: IdentifierStatement -> DECRE_OP SEMI-COLON_DELI:decrement_semicolon
+    (1, ((MATCH, MASKS[3], 2),)),
+    # 12: IdentifierStatement -> $
+    (0, ()),
+    # 13: IdentifierStatement -> !unrecognized_statement
+    (0, ((ERROR, None, 1),)),
+    # 14: IntStatement -> MAIN_KEY OPEN-PAREN_DELI:main_paren CLOSE-PAREN_DELI:main_close OPEN-CURL-BRAC_DELI:main_body Body
+    (1, ((RULE, _TABLES[3], None), (MATCHES, ((MASKS[8], 7), (MASKS[5], 8), (MASKS[9], 9)), None))),
+    # 15: IntStatement -> Declaration
+    (0, ((RULE, _TABLES[4], None),)),
+    # 16: Body -> CLOSE-CURL-BRAC_DELI
+    (1, ()),
+    # 17: Body -> $
+    (0, ()),
+    # 18: Body -> Statement Body
+    (0, ((RULE, _TABLES[3], None), (OPEN, _TABLES[0], None))),
+    # 19: Declaration -> IDENTIFIER Assignment DeclarationEnd
+    (1, ((RULE, _TABLES[6], None), (RULE, _TABLES[5], None))),
+    # 20: Declaration -> !declaration_identifier
+    (0, ((ERROR, None, 4),)),
+    # 21: Assignment -> AssignOperator DeclarationValue:declaration_value
+    (1, ((MATCH, MASKS[10], 5),)),
+    # 22: Assignment -> <empty>
+    (0, ()),
+    # 23: DeclarationEnd -> COMMA_DELI Declaration
+    (1, ((RULE, _TABLES[4], None),)),
+    # 24: DeclarationEnd -> SEMI-COLON_DELI
+    (1, ()),
+    # 25: DeclarationEnd -> !declaration_semicolon
+    (0, ((ERROR, None, 6),)),
+    # 26: ForLoop -> OPEN-PAREN_DELI:for_paren ForInit SEMI-COLON_DELI:for_init_semicolon LoopOperand:for_condition RelOperator:for_operator LoopOperand:for_value SEMI-COLON_DELI:for_condition_semicolon IDENTIFIER:for_update Update CLOSE-PAREN_DELI:for_close OPEN-CURL-BRAC_DELI:for_body ForBody
+    (0, ((RULE, _TABLES[11], None), (MATCHES, ((MASKS[5], 21), (MASKS[9], 22)), None), (RULE, _TABLES[10], None), (MATCHES, ((MASKS[3], 14), (MASKS[7], 15), (MASKS[11], 16), (MASKS[7], 17), (MASKS[3], 18), (MASKS[12], 19)), None), (RULE, _TABLES[8], None), (MATCH, MASKS[8], 10))),
+    # 27: ForInit -> Type IDENTIFIER:for_init_identifier ForInitValue
+    (1, ((RULE, _TABLES[9], None), (MATCH, MASKS[12], 12))),
+    # 28: ForInit -> IDENTIFIER
+    (1, ()),
+    # 29: ForInit -> !for_init
+    (0, ((ERROR, None, 11),)),
+    # 30: ForInitValue -> ASSIGN_OP InitValue:for_init_value
+    (1, ((MATCH, MASKS[13], 13),)),
+    # 31: ForInitValue -> <empty>
+    (0, ()),
+    # 32: Update -> StepOperator
+    (1, ()),
+    # 33: Update -> AssignOperator UpdateValue:for_update_value
+    (1, ((MATCH, MASKS[14], 20),)),
+    # 34: Update -> <empty>
+    (0, ()),
+    # 35: ForBody -> CLOSE-CURL-BRAC_DELI @discard
+    (1, (_DISCARD,)),
+    # 36: ForBody -> $
+    (0, ()),
+    # 37: ForBody -> Statement ForBody
+    (0, ((RULE, _TABLES[11], None), (OPEN, _TABLES[0], None))),
+    # 38: IfElse -> OPEN-PAREN_DELI:if_paren IfOperand:if_condition IfOperator:if_operator IfOperand:if_value CLOSE-PAREN_DELI:if_close OPEN-CURL-BRAC_DELI:if_body Body Else
+    (0, ((RULE, _TABLES[13], None), (RULE, _TABLES[3], None), (MATCHES, ((MASKS[8], 23), (MASKS[15], 24), (MASKS[16], 25), (MASKS[15], 26), (MASKS[5], 27), (MASKS[9], 28)), None))),
+    # 39: Else -> ELSE_KEY OPEN-CURL-BRAC_DELI:else_body Body
+    (1, ((RULE, _TABLES[3], None), (MATCH, MASKS[9], 29))),
+    # 40: Else -> <empty>
+    (0, ()),
+    # 41: Printf -> OPEN-PAREN_DELI:printf_paren STRING_KEY:printf_string PrintfArguments CLOSE-PAREN_DELI:printf_close SEMI-COLON_DELI:printf_semicolon
+    (0, ((MATCHES, ((MASKS[5], 33), (MASKS[3], 34)), None), (RULE, _TABLES[15], None), (MATCHES, ((MASKS[8], 30), (MASKS[17], 31)), None))),
+    # 42: PrintfArguments -> COMMA_DELI PrintfArgument:printf_argument PrintfArguments
+    (1, ((RULE, _TABLES[15], None), (MATCH, MASKS[18], 32))),
+    # 43: PrintfArguments -> <empty>
+    (0, ()),
+    # 44: Gc -> OPEN-PAREN_DELI:gc_paren CLOSE-PAREN_DELI:gc_close OPEN-CURL-BRAC_DELI:gc_body GcBody
+    (0, ((RULE, _TABLES[17], None), (MATCHES, ((MASKS[8], 35), (MASKS[5], 36), (MASKS[9], 37)), None))),
+    # 45: GcBody -> CLOSE-CURL-BRAC_DELI
+    (1, ()),
+    # 46: GcBody -> $ !gc_unclosed
+    (0, ((ERROR, None, 38),)),
+    # 47: GcBody -> Statement GcBody
+    (0, ((RULE, _TABLES[17], None), (OPEN, _TABLES[0], None))),
+]
+
+# For each rule: the production for tokens no alternative starts with, and for the others
+PREDICT = [
+    (10, {'CHAR_KEY': 3, 'DOUBLE_KEY': 3, 'FALSE_BOOL': 4, 'FLOAT_KEY': 3, 'FOR_KEY': 5, 'GC_KEY': 8, 'IDENTIFIER': 1, 'IF_KEY': 6, 'INT_KEY': 2, 'PRINTF_KEY': 7, 'RETURN_KEY': 9, 'SINGLE_LINE_COMMENT': 0, 'STRING_KEY': 3, 'TRUE_BOOL': 4}),  # Statement
+    (13, {'$': 12, 'DECRE_OP': 11}),  # IdentifierStatement
+    (15, {'IDENTIFIER': 15, 'MAIN_KEY': 14}),  # IntStatement
+    (18, {'$': 17, 'CHAR_KEY': 18, 'CLOSE-CURL-BRAC_DELI': 16, 'DOUBLE_KEY': 18, 'FALSE_BOOL': 18, 'FLOAT_KEY': 18, 'FOR_KEY': 18, 'GC_KEY': 18, 'IDENTIFIER': 18, 'IF_KEY': 18, 'INT_KEY': 18, 'PRINTF_KEY': 18, 'RETURN_KEY': 18, 'SINGLE_LINE_COMMENT': 18, 'STRING_KEY': 18, 'TRUE_BOOL': 18}),  # Body
+    (20, {'IDENTIFIER': 19}),  # Declaration
+    (22, {'ASSIGN_OP': 21, 'DIVIDE-ASSIGN_OP': 21, 'MINUS-ASSIGN_OP': 21, 'MOD-ASSIGN_OP': 21, 'MULTI-ASSIGN_OP': 21, 'PLUS-ASSIGN_OP': 21}),  # Assignment
+    (25, {'COMMA_DELI': 23, 'SEMI-COLON_DELI': 24}),  # DeclarationEnd
+    (26, {'OPEN-PAREN_DELI': 26}),  # ForLoop
+    (29, {'BOOL_KEY': 27, 'CHAR_KEY': 27, 'DOUBLE_KEY': 27, 'FLOAT_KEY': 27, 'IDENTIFIER': 28, 'INT_KEY': 27, 'STRING_KEY': 27}),  # ForInit
+    (31, {'ASSIGN_OP': 30}),  # ForInitValue
+    (34, {'ASSIGN_OP': 33, 'DECRE_OP': 32, 'DIVIDE-ASSIGN_OP': 33, 'INCRE_OP': 32, 'MINUS-ASSIGN_OP': 33, 'MOD-ASSIGN_OP': 33, 'MULTI-ASSIGN_OP': 33, 'PLUS-ASSIGN_OP': 33}),  # Update
+    (37, {'$': 36, 'CHAR_KEY': 37, 'CLOSE-CURL-BRAC_DELI': 35, 'DOUBLE_KEY': 37, 'FALSE_BOOL': 37, 'FLOAT_KEY': 37, 'FOR_KEY': 37, 'GC_KEY': 37, 'IDENTIFIER': 37, 'IF_KEY': 37, 'INT_KEY': 37, 'PRINTF_KEY': 37, 'RETURN_KEY': 37, 'SINGLE_LINE_COMMENT': 37, 'STRING_KEY': 37, 'TRUE_BOOL': 37}),  # ForBody
+    (38, {'OPEN-PAREN_DELI': 38}),  # IfElse
+    (40, {'ELSE_KEY': 39}),  # Else
+    (41, {'OPEN-PAREN_DELI': 41}),  # Printf
+    (43, {'COMMA_DELI': 42}),  # PrintfArguments
+    (44, {'OPEN-PAREN_DELI': 44}),  # Gc
+    (47, {'$': 46, 'CHAR_KEY': 47, 'CLOSE-CURL-BRAC_DELI': 45, 'DOUBLE_KEY': 47, 'FALSE_BOOL': 47, 'FLOAT_KEY': 47, 'FOR_KEY': 47, 'GC_KEY': 47, 'IDENTIFIER': 47, 'IF_KEY': 47, 'INT_KEY': 47, 'PRINTF_KEY': 47, 'RETURN_KEY': 47, 'SINGLE_LINE_COMMENT': 47, 'STRING_KEY': 47, 'TRUE_BOOL': 47}),  # GcBody
+]
+
+for _table, (_default, _entries) in zip(_TABLES, PREDICT):
+    _table.extend(_predict(_default, _entries))
+
+def token_kinds(tokens):
+    """Integer kinds of the tokens, read from a TokenBuffer's column when given one."""
+    if hasattr(tokens, "kinds"):
+        remap = [TOKEN_TYPE_CODES.get(name, OTHER) for name in tokens.type_names]
+        return [remap[kind] for kind in tokens.kinds]
+    codes = TOKEN_TYPE_CODES
+    return [codes.get(token["type"], OTHER) for token in tokens]
+
+
+class LL1Parser:
+    """
+    Table-driven parser with parser.Parser's interface and errors. Rules are
+    expanded on an explicit stack, so nesting depth is not limited by recursion.
+    """
+
+    def __init__(self, tokens, max_errors=None):
+        self.tokens = tokens
+        self.current_token_index = 0
+        self.max_errors = max_errors  # stop at the end of the input once this many errors are reported
+        self.error_count = 0  # errors reported outside constructs that can @discard them
+        self.kinds = token_kinds(tokens)
+        self.kinds.append(END)
+
+    def current_token(self):
+        if self.current_token_index < len(self.tokens):
+            return self.tokens[self.current_token_index]
+        return None
+
+    def parse_statement(self):
+        """Parses one top-level statement, including every block nested in it, and returns its errors."""
+        return self._parse(once=True)
+
+    def parse(self):
+        """Parses the remaining tokens and returns all their errors."""
+        return self._parse(once=False)
+
+    def _parse(self, once):
+        kinds = self.kinds
+        size = len(kinds) - 1
+        index = self.current_token_index
+        errors = []
+        stack = []
+        constructs = []  # (stack height, first token index, errors reported before it, 1 if it can @discard)
+        tentative = 0  # open constructs that can @discard the errors reported in them
+        pop = stack.pop
+        push = stack.extend
+
+        while index < size:
+            stack.append(_START)
+            while stack:
+                operation, argument, error = pop()
+                if operation == RULE:
+                    shift, items = argument[kinds[index]]
+                    index += shift
+                    push(items)
+                    continue
+                elif operation == OPEN:
+                    stack.append(_CLOSE)
+                    discards = DISCARDING >> kinds[index] & 1
+                    tentative += discards
+                    constructs.append((len(stack), index, len(errors), discards))
+                    shift, items = argument[kinds[index]]
+                    index += shift
+                    push(items)
+                    continue
+                elif operation == MATCH:
+                    if argument >> kinds[index] & 1:
+                        index += 1
+                        continue
+                elif operation == MATCHES:
+                    for mask, error in argument:
+                        if not mask >> kinds[index] & 1:
+                            break
+                        index += 1
+                    else:
+                        continue
+                elif operation == CLOSE:
+                    tentative -= constructs.pop()[3]
+                    continue
+                elif operation == DISCARD:
+                    del errors[constructs[-1][2]:]
+                    continue
+
+                # A token is missing (MATCH, MATCHES) or the grammar reports an error (ERROR): abandon the construct
+                height, start, _, discards = constructs.pop()
+                tentative -= discards
+                del stack[height - 1:]
+                code, recovery, value = ERRORS[error]
+                token = self.tokens[start]
+                if value:  # about the construct's first token: reported there, with its value
+                    errors.append(Diagnostic(code, token["line_number"], start, start + 1, (token["value"],)))
+                else:
+                    errors.append(Diagnostic(code, token["line_number"], index, min(index + 1, size)))
+                index = self._recover(index, RECOVERIES[recovery])
+                if index == start:
+                    index += 1  # nothing consumed: skip a token so parsing moves on
+                if not tentative:
+                    self.error_count += 1
+                    if self.max_errors is not None and self.error_count >= self.max_errors:
+                        index = size  # every construct still open finishes as it would at the end
+            if once:
+                break
+
+        self.current_token_index = index
+        return errors
+
+    def _recover(self, index, phases):
+        kinds = self.kinds
+        size = len(kinds) - 1
+        for phase in phases:
+            if phase is None:
+                if index < size:
+                    index += 1
+                continue
+            stop, past = phase
+            either = stop | past
+            for index in range(index, size):
+                if either >> kinds[index] & 1:
+                    if past >> kinds[index] & 1:
+                        index += 1
+                    break
+            else:
+                index = size
+        return index
+
+def parse_tokens(tokens, max_errors=None):
+    """Like main.parse_tokens(), with LL1Parser."""
+    errors = LL1Parser(tokens, max_errors).parse()
+    return errors if max_errors is None else errors[:max_errors]
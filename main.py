@@ -1,8 +1,11 @@
 from enum import Enum
-from parser import Parser, SyntaxError
+from parser import SyntaxError
+from stack_parser import StackParser
 import string
 import os
 import csv
+import sys
+import threading
     
 KEYWORDS = ["int", "float", "double", "char", "bool", "string", "if", "else", "for", "while", "break", "continue", "printf", "scanf", "return"]
 RES_WORDS = ["gc", "main", "malloc"]
@@ -11,6 +14,88 @@ ARITH_OPS = ["*", "/", "%", "^", "#"]
 DELI = [";", "(", ")", "[", "]", "{", "}", ","]
 BOOL = ["True", "False", "TRUE", "FALSE", "true", "false"]
 SPECIAL_CHAR = {"~", "?", "@","$", "|", "."}
+OPERATOR_CHARS = "#+-*/%=!&|<>^"
+VALID_OPERATORS = ["*", "/", "%", "^", "#", "=", "!", "&&", "||", "+", "-", "++", "--", "&",
+                   "//", "/*", "*/", "+=", "-=", "/=", "*=", "%=", "==", "!=", ">=", "<=", ">", "<"]
+# previous token types after which "+" and "-" are read as unary operators
+UNARY_CONTEXT_TYPES = ["DELIMITER", "ASSIGNMENT_OP", "LOGICAL_OP", "RELATIONAL_OP", "COMMENT_SYMBOL", "KEYWORD",
+                       "NOISE_WORD", "ASSIGN_OP"]
+
+# Every token type the lexer produces; the definition order gives the integer codes
+class TokenType(Enum):
+    INT_KEY = "INT_KEY"
+    FLOAT_KEY = "FLOAT_KEY"
+    DOUBLE_KEY = "DOUBLE_KEY"
+    CHAR_KEY = "CHAR_KEY"
+    BOOL_KEY = "BOOL_KEY"
+    STRING_KEY = "STRING_KEY"
+    IF_KEY = "IF_KEY"
+    ELSE_KEY = "ELSE_KEY"
+    FOR_KEY = "FOR_KEY"
+    WHILE_KEY = "WHILE_KEY"
+    BREAK_KEY = "BREAK_KEY"
+    CONTINUE_KEY = "CONTINUE_KEY"
+    PRINTF_KEY = "PRINTF_KEY"
+    SCANF_KEY = "SCANF_KEY"
+    RETURN_KEY = "RETURN_KEY"
+    GC_KEY = "GC_KEY"
+    MAIN_KEY = "MAIN_KEY"
+    MALLOC_KEY = "MALLOC_KEY"
+    TRUE_BOOL = "TRUE_BOOL"
+    FALSE_BOOL = "FALSE_BOOL"
+    BOOL_NOISE = "BOOL_NOISE"
+    INT_NOISE = "INT_NOISE"
+    CHAR_NOISE = "CHAR_NOISE"
+    IDENTIFIER = "IDENTIFIER"
+    DIGIT_INVAL_IDEN = "DIGIT_INVAL_IDEN"
+    UNDER_INVAL_IDEN = "UNDER_INVAL_IDEN"
+    SPECIAL_INVAL_IDEN = "SPECIAL_INVAL_IDEN"
+    INTEGER = "INTEGER"
+    FLOAT = "FLOAT"
+    DOUBLE = "DOUBLE"
+    EMPTY_STRING = "EMPTY-STRING"
+    INVALID_CHAR_STRING = "INVALID_CHAR/STRING"
+    SEMI_COLON_DELI = "SEMI-COLON_DELI"
+    OPEN_PAREN_DELI = "OPEN-PAREN_DELI"
+    CLOSE_PAREN_DELI = "CLOSE-PAREN_DELI"
+    OPEN_BRAC_DELI = "OPEN-BRAC_DELI"
+    CLOSE_BRAC_DELI = "CLOSE-BRAC_DELI"
+    OPEN_CURL_BRAC_DELI = "OPEN-CURL-BRAC_DELI"
+    CLOSE_CURL_BRAC_DELI = "CLOSE-CURL-BRAC_DELI"
+    COMMA_DELI = "COMMA_DELI"
+    SINGLE_LINE_COMMENT = "SINGLE_LINE_COMMENT"
+    MULIT_LINE_COMMENT = "MULIT_LINE_COMMENT"
+    INCRE_OP = "INCRE_OP"
+    DECRE_OP = "DECRE_OP"
+    ADDRESS_OP = "ADDRESS_OP"
+    ASSIGN_OP = "ASSIGN_OP"
+    PLUS_ASSIGN_OP = "PLUS-ASSIGN_OP"
+    MINUS_ASSIGN_OP = "MINUS-ASSIGN_OP"
+    MULTI_ASSIGN_OP = "MULTI-ASSIGN_OP"
+    DIVIDE_ASSIGN_OP = "DIVIDE-ASSIGN_OP"
+    MOD_ASSIGN_OP = "MOD-ASSIGN_OP"
+    OR_LOGIC_OP = "OR-LOGIC_OP"
+    AND_LOGIC_OP = "AND-LOGIC_OP"
+    NOT_LOGIC_OP = "NOT-LOGIC_OP"
+    EQUAL_REL_OP = "EQUAL-REL_OP"
+    NOT_REL_OP = "NOT-REL_OP"
+    GREAT_EQL_REL_OP = "GREAT-EQL-REL_OP"
+    LESS_EQL_REL_OP = "LESS-EQL-REL_OP"
+    LESS_REL_OP = "LESS-REL_OP"
+    GREAT_REL_OP = "GREAT-REL_OP"
+    UNARY_PLUS_OP = "UNARY-PLUS_OP"
+    UNARY_MINUS_OP = "UNARY-MINUS_OP"
+    PLUS_ARITH_OP = "PLUS-ARITH_OP"
+    MINUS_ARITH_OP = "MINUS-ARITH_OP"
+    MULTI_ARITH_OP = "MULTI-ARITH_OP"
+    DIV_ARITH_OP = "DIV-ARITH_OP"
+    MOD_ARITH_OP = "MOD-ARITH_OP"
+    POWER_ARITH_OP = "POWER-ARITH_OP"
+    ROOT_ARITH_OP = "ROOT-ARITH_OP"
+    UNRECOGNIZED_OPERATOR = "UNRECOGNIZED_OPERATOR"
+
+TOKEN_TYPE_NAMES = [token_type.value for token_type in TokenType]
+TOKEN_TYPE_CODES = {name: code for code, name in enumerate(TOKEN_TYPE_NAMES)}
 
 # check if a word is a keyword
 def is_keyword(word):
@@ -171,13 +256,10 @@ def process_word(input_text, index, line_number):
 
 # Process unary and arithmetic operators
 def process_operator(input_text, index, previous_token, line_number):
-    VALID_OPERATORS = ["*", "/", "%", "^", "#", "=", "!", "&&", "||", "+", "-", "++", "--", "&",
-                       "//", "/*", "*/", "+=", "-=", "/=", "*=", "%=", "==", "!=", ">=", "<=", ">", "<"]
-    
     start_index = index
     
     # Check for sequences of consecutive operators like "++", "--", etc.
-    while index < len(input_text) and input_text[index] in "#+-*/%=!&|<>^":
+    while index < len(input_text) and input_text[index] in OPERATOR_CHARS:
         index += 1
 
     # Get the operator sequence
@@ -193,23 +275,24 @@ def process_operator(input_text, index, previous_token, line_number):
 
         # Handle single-line comments ("//")
         if operator_sequence == "//":
-            # Collect the comment value until the end of the line
-            while index < len(input_text) and input_text[index] != "\n":
-                index += 1
+            # The comment runs until the end of the line
+            index = input_text.find("\n", index)
+            if index == -1:
+                index = len(input_text)
             comment_value = input_text[start_index:index]
             return {"type": "SINGLE_LINE_COMMENT", "value": comment_value, "line_number": line_number}, index 
         
         # Handle multi-line comments ("/* */")
         elif operator_sequence == "/*":
-            comment_value = ""
-            # Collect the comment value until "*/" is found
-            while index < len(input_text) and not input_text.startswith("*/", index):
-                if input_text[index] != "\n":  # Ignore newline characters
-                    comment_value += input_text[index]
-                index += 1
-            if index < len(input_text):  # If "*/" is found
-                index += 2
-            comment_value = "/*" + comment_value + "*/"  # Add the delimiters back
+            # Find the closing "*/" in one search instead of collecting character by character
+            comment_end = input_text.find("*/", index)
+            if comment_end == -1:
+                comment_value = input_text[index:]
+                index = len(input_text)
+            else:
+                comment_value = input_text[index:comment_end]
+                index = comment_end + 2
+            comment_value = "/*" + comment_value.replace("\n", "") + "*/"  # Drop newlines, add the delimiters back
             return {"type": "MULIT_LINE_COMMENT", "value": comment_value, "line_number": line_number}, index
         
         # Check for address operator
@@ -255,9 +338,7 @@ def process_operator(input_text, index, previous_token, line_number):
         # Check for unary "+" or "-"
         elif operator_sequence == "+" or operator_sequence == "-":
             # Determine if it should be treated as a unary operator
-            if previous_token == None or previous_token and previous_token["type"] in ["DELIMITER", "ASSIGNMENT_OP", "LOGICAL_OP", 
-                                                                                       "RELATIONAL_OP", "COMMENT_SYMBOL", "KEYWORD", 
-                                                                                       "NOISE_WORD", "ASSIGN_OP"]:
+            if previous_token == None or previous_token and previous_token["type"] in UNARY_CONTEXT_TYPES:
                 if operator_sequence == "+":
                     return {"type": "UNARY-PLUS_OP", "value": operator_sequence, "line_number": line_number}, index
                 if operator_sequence == "-":
@@ -293,31 +374,26 @@ def process_quotes(input_text, index, line_number):
     quote_type = input_text[index]  # Either single or double quote
     start_index = index
     index += 1  # Move past the opening quote
-    content = ""
 
-    while index < len(input_text):
-        char = input_text[index]
-        
-        # If we encounter the matching closing quote
-        if char == quote_type:
-            index += 1  # Move past the closing quote
-            if len(content) == 0:
-                return {"type": "EMPTY-STRING", "value": content, "line_number": line_number}, index
-            if len(content) == 1:
-                return {"type": "CHAR_KEY", "value": content, "line_number": line_number}, index
-            else:
-                return {"type": "STRING_KEY", "value": content, "line_number": line_number}, index
-        
-        if char == "\n":
-            break
-        
-        # Otherwise, add character to the content
-        content += char
-        index += 1
+    # Strings cannot span lines, so only search up to the end of the current line
+    line_end = input_text.find("\n", index)
+    if line_end == -1:
+        line_end = len(input_text)
+    closing = input_text.find(quote_type, index, line_end)
+
+    # If we encounter the matching closing quote
+    if closing != -1:
+        content = input_text[index:closing]
+        index = closing + 1  # Move past the closing quote
+        if len(content) == 0:
+            return {"type": "EMPTY-STRING", "value": content, "line_number": line_number}, index
+        if len(content) == 1:
+            return {"type": "CHAR_KEY", "value": content, "line_number": line_number}, index
+        else:
+            return {"type": "STRING_KEY", "value": content, "line_number": line_number}, index
 
-    # If no closing quote is found, it's an invalid string or char
-    if(char == "\n"):
-        return {"type": "INVALID_CHAR/STRING", "value": input_text[start_index:index], "line_number": line_number}, index
+    # If no closing quote is found before the end of the line (or file), it's an invalid string or char
+    return {"type": "INVALID_CHAR/STRING", "value": input_text[start_index:line_end], "line_number": line_number}, line_end
 
 # main lexer function    
 def lexer(input_text):
@@ -398,6 +474,22 @@ def lexer(input_text):
 
     return tokens
 
+# Lexer engines that can be selected by name ("reference" is lexer() above)
+LEXER_ENGINES = ["reference", "dfa"]
+# Bump when any engine changes the tokens or warnings it produces; result_cache keys on it
+LEXER_VERSION = 1
+
+def get_lexer(engine="reference"):
+    """
+    Returns the lexer function for the given engine name.
+    """
+    if engine == "reference":
+        return lexer
+    if engine == "dfa":
+        from dfa_lexer import lexer as dfa_lexer
+        return dfa_lexer
+    raise ValueError(f"Unknown lexer engine: {engine}. Choose one of {', '.join(LEXER_ENGINES)}.")
+
 # Check if the file has a .cat extension
 def validate_file_extension(filename):
     if not filename.endswith('.cat'):
@@ -406,6 +498,28 @@ def validate_file_extension(filename):
         raise FileNotFoundError(f"File not found: {filename}")
     return True
 
+# Files at least this many bytes are lexed from a memory map (CATHARSIS_MMAP_THRESHOLD overrides it)
+MMAP_THRESHOLD = int(os.environ.get("CATHARSIS_MMAP_THRESHOLD", 64 * 1024 * 1024))
+
+def uses_mmap(filename, mmap_threshold=None):
+    """
+    Returns True if lex_file() will lex this file from a memory map instead of a decoded string.
+    """
+    threshold = MMAP_THRESHOLD if mmap_threshold is None else mmap_threshold
+    return os.path.getsize(filename) >= threshold
+
+def lex_file(filename, engine="reference", mmap_threshold=None):
+    """
+    Validates and lexes a .cat file. Large files go through the byte-level mmap lexer;
+    smaller ones are read as text and passed to the selected engine.
+    """
+    validate_file_extension(filename)
+    if uses_mmap(filename, mmap_threshold):
+        from mmap_lexer import lex_mmap
+        return lex_mmap(filename)
+    with open(filename, 'r') as file:
+        return get_lexer(engine)(file.read())
+
 # Function to write tokens to a CSV file
 def write_tokens_to_csv(tokens, filename="LexOutput.csv"):
     """
@@ -428,6 +542,76 @@ def write_tokens_to_csv(tokens, filename="LexOutput.csv"):
     print(f"Tokens successfully written to {filename}")
     return True
 
+# Run the parser over a whole token list
+def parse_tokens(tokens, index=None, max_errors=None):
+    """
+    Parses the tokens statement by statement and returns the list of syntax errors
+    (diagnostics.Diagnostic records; str() gives the message line).
+    `index` is an optional bracket_index.BracketIndex of the tokens for faster error recovery.
+    With `max_errors`, parsing stops once that many errors are found and only those are returned.
+    StackParser parses it, so deeply nested blocks do not hit the recursion limit.
+    """
+    parser = StackParser(tokens, index, max_errors=max_errors)
+    errors = []  # Store errors
+
+    while parser.current_token():
+        result = parser.parse_statement()
+        if result:
+            errors.extend(result)
+    return errors if max_errors is None else errors[:max_errors]
+
+# Function to write tokens to a binary token file (layout in token_binary.py)
+def write_tokens_to_binary(tokens, filename="LexOutput.cattok"):
+    """
+    Writes the list of tokens to a compact binary token file; token_binary.load_tokens() maps it back.
+    """
+    from token_binary import dump_tokens
+    dump_tokens(tokens, filename)
+    print(f"Tokens successfully written to {filename}")
+    return True
+
+# Lexer-to-parser pipeline without the CSV round-trip
+def analyze(tokens, tokens_csv=None, errors_csv=None, max_errors=None):
+    """
+    Parses a token list (or any iterable of tokens, e.g. stream_lexer.iter_tokens) in memory.
+    The token CSV is an optional side output written on a background thread while the parser
+    runs; the errors CSV is written after parsing. Returns (tokens, errors); `max_errors`
+    goes to parse_tokens().
+    """
+    if not hasattr(tokens, "__len__"):
+        tokens = list(tokens)
+
+    writer = None
+    if tokens_csv:
+        writer = threading.Thread(target=write_tokens_to_csv, args=(tokens, tokens_csv), daemon=True)
+        writer.start()
+
+    errors = parse_tokens(tokens, max_errors=max_errors)
+
+    if errors_csv:
+        write_errors_to_csv(errors, errors_csv)
+    if writer:
+        writer.join()
+    return tokens, errors
+
+# Function to write parsing errors to a CSV file
+def write_errors_to_csv(errors, filename="error.csv"):
+    """
+    Writes the list of parsing errors to a CSV file, followed by the error count.
+    """
+    with open(filename, mode="w", newline="", encoding="utf-8") as error_file:
+        writer = csv.writer(error_file)
+        writer.writerow(["Error Message"])  # Header
+
+        if errors:
+            for error in errors:
+                writer.writerow([error])
+            writer.writerow([f"Total Errors: {len(errors)}"])  # Error count
+        else:
+            writer.writerow(["No errors found."])
+    print(f"Errors successfully written to {filename}")
+    return True
+
 def main():
     while True:
         try:
@@ -441,103 +625,59 @@ def main():
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
     
+    # CATHARSIS_PROFILE=trace.json times the run (see profiling.py) and writes a Chrome trace
+    from profiling import Profiler, phase
+    profile_path = os.environ.get("CATHARSIS_PROFILE")
+    profile_memory = os.environ.get("CATHARSIS_PROFILE_MEMORY", "1") != "0"
+    profiler = Profiler(memory=profile_memory, modules={"main": sys.modules[__name__]}).start() if profile_path else None
+
     try:
-        # Open and process the .cat file
-        with open(input_filename, 'r') as file:
-            input_text = file.read()
-        
-        # Call your lexer function to generate tokens
-        tokens = lexer(input_text)
+        # Open and process the .cat file (CATHARSIS_LEXER=dfa selects the DFA engine;
+        # files above MMAP_THRESHOLD are lexed from a memory map)
+        with phase("lex"):
+            tokens = lex_file(input_filename, os.environ.get("CATHARSIS_LEXER", "reference"))
+
+        if not tokens:
+            print("Error: No valid tokens found in the input file.")
+            return
 
-        # Save tokens to a user-specified CSV file
+        # Ask for the CSV file to save the tokens to
         while True:
             output_filename = input("Enter the name of the CSV file to save the tokens (e.g., tokens.csv): ").strip()
             if not output_filename.endswith('.csv'):
                 print("Invalid file extension. Please provide a filename ending with '.csv'.")
                 continue
-            
-            # Write tokens to the specified CSV file
-            write_tokens_to_csv(tokens, output_filename)
             break
 
-        # Loop to ask for a valid CSV file to load tokens for parsing
+        # Ask user for the CSV file to save errors
         while True:
-            try:
-                parse_filename = output_filename
-                
-                print(f"{parse_filename} successfuly loaded to parser!")
-
-                # Ensure the file exists
-                if not os.path.isfile(parse_filename):
-                    print(f"File not found: {parse_filename}. Please try again.")
-                    continue
-
-                tokens_from_csv = []
-
-                # Read the tokens from the CSV file
-                with open(parse_filename, mode="r", encoding="utf-8") as csvfile:
-                    reader = csv.reader(csvfile)
-                    next(reader, None)  # Skip header row if present
-
-                    for row in reader:
-                        if len(row) < 3:
-                            print(f"Warning: Skipping malformed CSV row: {row}")
-                            continue  # Skip malformed rows
-
-                        try:
-                            line_number = int(row[0])  # Convert to integer safely
-                        except ValueError:
-                            print(f"Warning: Invalid line number '{row[0]}' in CSV. Skipping row.")
-                            continue
-
-                        tokens_from_csv.append({
-                            "line_number": line_number,
-                            "value": row[1],
-                            "type": row[2]
-                        })
-
-                if not tokens_from_csv:
-                    print("Error: No valid tokens found in the CSV file.")
-                    continue
-                
-                # Ask user for the CSV file to save errors
-                error_filename = input("Enter the name of the CSV file to save parsing errors: ").strip()
-                if not error_filename.endswith(".csv"):
-                    print("Invalid file extension. Please provide a filename ending with '.csv'.")
-                    continue
-
-                # Initialize the parser and parse the tokens
-                parser = Parser(tokens_from_csv)
-                errors = []  # Store errors
-        
-                while parser.current_token():
-                    result = parser.parse_statement()
-                    if result:
-                        errors.extend(result)
-
-                for error in errors:
-                    print(error)
-
-                # Write errors to CSV file
-                with open(error_filename, mode="w", newline="", encoding="utf-8") as error_file:
-                    writer = csv.writer(error_file)
-                    writer.writerow(["Error Message"])  # Header
-
-                    if errors:
-                        for error in errors:
-                            writer.writerow([error])
-                        writer.writerow([f"Total Errors: {len(errors)}"])  # Error count
-                    else:
-                        writer.writerow(["No errors found."])
-                print(f"Errors successfully written to {error_filename}")
-                
-                break  # Exit loop after successful parsing
-            except Exception as e:
-                print(f"An unexpected error occurred: {e}")
-                
+            error_filename = input("Enter the name of the CSV file to save parsing errors: ").strip()
+            if not error_filename.endswith(".csv"):
+                print("Invalid file extension. Please provide a filename ending with '.csv'.")
+                continue
+            break
+
+        # The tokens go straight to the parser; the token CSV is written alongside
+        with phase("parse"):
+            tokens, errors = analyze(tokens, output_filename)
+
+        for error in errors:
+            print(error)
+
+        # Write errors to CSV file
+        with phase("write errors"):
+            write_errors_to_csv(errors, error_filename)
+
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
 
+    finally:
+        if profiler:
+            profiler.stop()
+            print(profiler.summary())
+            profiler.write_chrome_trace(profile_path)
+            print(f"Profile trace written to {profile_path}")
+
 # Run the main function
 if __name__ == "__main__":
     main()
\ No newline at end of file
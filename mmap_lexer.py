@@ -0,0 +1,68 @@
+"""
+Byte-level lexing of memory-mapped .cat files.
+
+lex_mmap() maps the file read-only and runs the DFA engine over its bytes
+instead of decoding the whole file into a str first. ASCII bytes are classified
+with one bytes.translate per window; only runs of non-ASCII bytes are decoded
+(the lead byte of each character gets that character's class, the rest the
+continuation class), and only the slices that become token values are decoded.
+Tokens are the same as main.lexer() gives; indexes in warnings are byte offsets.
+"""
+import mmap
+import os
+import re
+
+from dfa_lexer import RAW, get_tables, lexer, scan, token_value
+
+# Bytes translated to class codes per step
+WINDOW = 1 << 22
+
+_NON_ASCII = re.compile(rb"[\x80-\xff]+")
+
+
+def class_codes(data):
+    """Maps every byte of UTF-8 `data` (bytes or mmap) to its class id."""
+    tables = get_tables()
+    classes = tables.classes
+    codes = bytearray(len(data))
+    for start in range(0, len(data), WINDOW):
+        codes[start:start + WINDOW] = data[start:start + WINDOW].translate(tables.ascii_codes)
+
+    continuation = bytes([tables.continuation]) * 3
+    for run in _NON_ASCII.finditer(data):
+        offset = run.start()
+        for char in run.group().decode("utf-8", "surrogateescape"):
+            codes[offset] = classes[char] if char in classes else tables.classify(char)
+            size = len(char.encode("utf-8", "surrogateescape"))
+            codes[offset + 1:offset + size] = continuation[:size - 1]
+            offset += size
+    return codes
+
+
+def byte_token_value(data, kind, start, end):
+    """Decodes the value of a token found in `data`."""
+    text = data[start:end].decode("utf-8", "replace")
+    if kind == RAW:
+        return text
+    return token_value(text, kind, 0, len(text))
+
+
+def lex_bytes(data):
+    """Lexes UTF-8 `data` (bytes or mmap) into the token dicts main.lexer() returns."""
+    raw_tokens = scan(data, codes=class_codes(data))[0]
+    return [{"type": token_type, "value": byte_token_value(data, kind, start, end), "line_number": line_number}
+            for token_type, kind, start, end, line_number in raw_tokens]
+
+
+def lex_mmap(filename):
+    """Lexes a .cat file from a read-only memory map of its bytes."""
+    with open(filename, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data.find(b"\r") == -1:
+                return lex_bytes(data)
+
+    # Text mode turns "\r\n" and "\r" into "\n", which the byte tables do not model
+    with open(filename, "r") as file:
+        return lexer(file.read())
@@ -0,0 +1,371 @@
+"""
+Optimization pass over parsed programs: constant conditions, dead branches, unused declarations.
+
+optimize() takes a Parser's SyntaxTree and returns an equivalent, smaller
+one over a new token list, with a Report of what it removed. The backends
+(vm.compile_program(), semantic.check(), statements()) take it like any
+parsed tree.
+
+    constant conditions   an if or for condition between two literals (1 == 1, 2.5 > 3, 1 && 0),
+                          or between a variable and itself (x > x, x == x), is decided here
+    dead branches         an if whose condition is false is removed and its else body takes its
+                          place; one whose condition is true loses its else and its own body
+                          takes its place; a for loop whose condition is false is removed when
+                          its initialization only sets the loop's own variable
+    folded values         a compound assignment in a declaration applies to the zero value, so
+                          `int a += 5;` becomes `int a = 5;` when the result is a literal the
+                          language can write (not negative)
+    unused declarations   a declared variable that no statement reads or decrements is dropped
+                          from its declaration (the declaration too, once empty), repeatedly,
+                          since dropping `int b = a;` may leave `a` unused; one initialized
+                          with `/=` or `%=` by a variable or zero stays, for its runtime error
+
+A body only takes its block's place when the block's scope holds no names
+(semantic.check()'s SymbolTable), so every name resolves as before; a block
+that must stay keeps its scope, with a dead body emptied. Names with
+redeclaration errors are left alone, so the findings do not change either.
+Folding follows the VM's arithmetic (vm.evaluate(), with `^` and `#`) and
+leaves what the compiler or the VM rejects (`char c += 'x'`, `int a /= 0`)
+for them to report. Types are not checked here, so a compile error in code
+this removes goes with it: compile the program as written for its errors.
+A block that a syntax error left without its braces keeps them and its
+body; only whole statements are removed from it.
+
+    python optimizer.py program.cat ...        # prints each file's report
+    python optimizer.py program.cat --tree     # prints the optimized tree as JSON
+"""
+import argparse
+import math
+import operator
+import sys
+from itertools import accumulate
+
+from semantic import check
+from syntax_tree import DECLARATION, ELSE, FOR, IF, SyntaxTree
+from vm import ZERO_VALUES, evaluate, literal
+
+_TYPE_KEYS = {"INT_KEY", "FLOAT_KEY", "DOUBLE_KEY", "CHAR_KEY", "BOOL_KEY", "STRING_KEY"}
+_VALUE_OPERATORS = {"ASSIGN_OP", "PLUS-ASSIGN_OP", "MINUS-ASSIGN_OP", "MULTI-ASSIGN_OP", "DIVIDE-ASSIGN_OP",
+                    "MOD-ASSIGN_OP"}
+_COMPARISONS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge, "==": operator.eq,
+                "!=": operator.ne}
+_CONVERSIONS = {"int": int, "float": float, "double": float, "bool": bool}  # as the VM stores each type
+# x op x for the same variable
+_REFLEXIVE = {"==": True, "<=": True, ">=": True, "!=": False, "<": False, ">": False}
+
+
+class Report:
+    """What one optimize() call removed."""
+    __slots__ = ("records", "tokens", "records_left", "tokens_left", "conditions", "branches", "values",
+                 "variables", "declarations")
+
+    def __init__(self, records, tokens):
+        self.records = records          # statement records before and after
+        self.tokens = tokens            # tokens before and after
+        self.records_left = records
+        self.tokens_left = tokens
+        self.conditions = 0             # conditions decided
+        self.branches = 0               # if, else and for bodies removed
+        self.values = 0                 # compound assignments folded
+        self.variables = 0              # unused variables removed
+        self.declarations = 0           # declarations removed with them
+
+    @property
+    def eliminated(self):
+        """Fraction of the tokens removed."""
+        return 1 - self.tokens_left / self.tokens if self.tokens else 0.0
+
+    def __str__(self):
+        return (f"{self.records:,} -> {self.records_left:,} statements, {self.tokens:,} -> {self.tokens_left:,} "
+                f"tokens ({self.eliminated:.1%} eliminated): {self.conditions} constant conditions, "
+                f"{self.branches} dead branches, {self.values} folded values, {self.variables} unused "
+                f"variables ({self.declarations} declarations)")
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _body(tokens, start, end):
+    """Index of the '{' that opens the body of the block spanning tokens `start` to `end`, or None."""
+    while start < end and tokens[start]["type"] != "OPEN-CURL-BRAC_DELI":
+        start += 1
+    return start if start < end else None
+
+
+def _literal_token(value, line_number):
+    """A token for a folded numeric value, or None if the language has no literal for it."""
+    if value is True or value is False:
+        return {"type": "TRUE_BOOL" if value else "FALSE_BOOL", "value": "true" if value else "false",
+                "line_number": line_number}
+    if value < 0:
+        return None
+    if type(value) is int:
+        return {"type": "INTEGER", "value": str(value), "line_number": line_number}
+    text = repr(value)
+    if not math.isfinite(value) or "e" in text:
+        return None
+    return {"type": "FLOAT", "value": text, "line_number": line_number}
+
+
+class _Optimizer:
+    def __init__(self, tree):
+        self.tree = tree
+        self.tokens = tree.tokens
+        self.table, diagnostics = check(tree)
+        self.report = Report(len(tree), len(tree.tokens))
+        self.deleted = bytearray(len(tree.tokens))  # 1 for each token removed
+        self.dropped = bytearray(len(tree))         # 1 for each record removed
+        self.replaced = {}                          # token index -> new token
+        self.scopes = {record: scope for scope, record in enumerate(self.table.scope_records) if record >= 0}
+        self.protected = {diagnostic.args[0] for diagnostic in diagnostics if diagnostic.code == "redeclared_variable"}
+
+    def delete(self, first, stop):
+        self.deleted[first:stop] = b"\1" * (stop - first)
+
+    def drop(self, record):
+        """Removes a statement and its body."""
+        tree = self.tree
+        stop = record + tree.sizes[record] + 1
+        self.dropped[record:stop] = b"\1" * (stop - record)
+        self.delete(tree.starts[record], tree.ends[record])
+        self.report.branches += 1
+
+    def closed(self, record):
+        """Whether a block has both its braces; one left open by a syntax error is not unwrapped or emptied."""
+        tree = self.tree
+        start, end = tree.starts[record], tree.ends[record]
+        body = _body(self.tokens, start, end)
+        return body is not None and body < end - 1 and self.tokens[end - 1]["type"] == "CLOSE-CURL-BRAC_DELI"
+
+    def unwrap(self, record):
+        """Removes a closed block but not its body, which takes its place."""
+        tree = self.tree
+        start, end = tree.starts[record], tree.ends[record]
+        self.dropped[record] = 1
+        self.delete(start, _body(self.tokens, start, end) + 1)
+        self.delete(end - 1, end)
+
+    def empty(self, record):
+        """Removes the body of a closed block."""
+        tree = self.tree
+        start, end = tree.starts[record], tree.ends[record]
+        stop = record + tree.sizes[record] + 1
+        self.dropped[record + 1:stop] = b"\1" * (stop - record - 1)
+        self.delete(_body(self.tokens, start, end) + 1, end - 1)
+        self.report.branches += 1
+
+    def scoped(self, record):
+        """Whether the scope of a block's body holds any name."""
+        return bool(self.table.scope_symbols[self.scopes[record]])
+
+    def condition(self, position):
+        """The value of the condition at token `position`, or None if it depends on the program."""
+        tokens = self.tokens
+        left, right = tokens[position], tokens[position + 2]
+        operator = tokens[position + 1]["value"]
+        if left["type"] == "IDENTIFIER" or right["type"] == "IDENTIFIER":
+            references = self.table.references
+            if left["type"] == right["type"] and operator in _REFLEXIVE and \
+                    references.get(position) == references.get(position + 2):
+                return _REFLEXIVE[operator]
+            return None
+        left, right = literal(left)[0], literal(right)[0]
+        if operator == "&&":
+            return bool(left and right)
+        if operator == "||":
+            return bool(left or right)
+        if isinstance(left, str) != isinstance(right, str):
+            return None  # the compiler reports it
+        return _COMPARISONS[operator](left, right)
+
+    def branches(self):
+        tree, tokens = self.tree, self.tokens
+        kinds, starts, sizes = tree.kinds, tree.starts, tree.sizes
+        enclosing = []  # records the enclosing blocks end before, innermost last
+        for record in range(len(kinds)):
+            while enclosing and record >= enclosing[-1]:
+                enclosing.pop()
+            after = record + sizes[record] + 1
+            shared = bool(enclosing) and enclosing[-1] == after  # an enclosing block ends with this one
+            if sizes[record]:
+                enclosing.append(after)
+            if self.dropped[record]:
+                continue
+            kind, start = kinds[record], starts[record]
+            if kind == IF:
+                value = self.condition(start + 2)
+                if value is None:
+                    continue
+                self.report.conditions += 1
+                # an ELSE right after the body is an enclosing if's when that one ends there too
+                orelse = after if after < len(kinds) and kinds[after] == ELSE and not shared else None
+                if value:
+                    if orelse is not None:
+                        self.drop(orelse)
+                    if not self.scoped(record) and self.closed(record):
+                        self.unwrap(record)
+                elif orelse is None:
+                    self.drop(record)
+                elif not self.scoped(orelse) and self.closed(orelse):
+                    self.drop(record)
+                    self.unwrap(orelse)
+                elif sizes[record] and self.closed(record):
+                    self.empty(record)
+            elif kind == FOR:
+                # for ( [type] name [op value] ; left op right ; ...
+                position = start + 2
+                typed = tokens[position]["type"] in _TYPE_KEYS
+                position += 1 if typed else 0
+                assigns = tokens[position + 1]["type"] in _VALUE_OPERATORS
+                value = self.condition(position + (4 if assigns else 2))
+                if value is None:
+                    continue
+                self.report.conditions += 1
+                if not value and (typed or not assigns):
+                    self.drop(record)
+
+    def declarations(self):
+        """Folds compound assignments and removes unused variables from the declarations still live."""
+        tree, tokens, table = self.tree, self.tokens, self.table
+        references, deleted = table.references, self.deleted
+        declared = {position: symbol for symbol, position in enumerate(table.symbol_positions)}
+        uses = [0] * len(table)
+        for position, symbol in references.items():
+            if not deleted[position]:
+                uses[symbol] += 1
+
+        records = []      # (record, its variables), each variable [name, end, symbol, removed]
+        variables = {}    # symbol -> its variable
+        for record in range(len(tree)):
+            if tree.kinds[record] != DECLARATION or self.dropped[record]:
+                continue
+            entries = []
+            position, end = tree.starts[record] + 1, tree.ends[record]
+            while position < end:
+                stop = position + (3 if tokens[position + 1]["type"] in _VALUE_OPERATORS else 1)
+                symbol = declared.get(position)  # None for a redeclared name
+                entry = [position, stop, symbol, False]
+                entries.append(entry)
+                if symbol is not None and tokens[position]["value"] not in self.protected and \
+                        not self.may_fail(position):
+                    variables[symbol] = entry
+                position = stop + 1
+            records.append((record, entries))
+
+        pending = [entry for symbol, entry in variables.items() if not uses[symbol]]
+        while pending:
+            entry = pending.pop()
+            entry[3] = True
+            self.report.variables += 1
+            value = entry[1] - 1
+            if entry[1] - entry[0] == 3 and tokens[value]["type"] == "IDENTIFIER":
+                symbol = references[value]
+                uses[symbol] -= 1
+                if not uses[symbol] and symbol in variables:
+                    pending.append(variables[symbol])
+
+        for record, entries in records:
+            if all(entry[3] for entry in entries):
+                self.dropped[record] = 1
+                self.delete(tree.starts[record], tree.ends[record])
+                self.report.declarations += 1
+                continue
+            kept = False
+            for name, stop, symbol, removed in entries:
+                if not removed:
+                    kept = True
+                    if stop - name == 3:
+                        self.fold(tokens[tree.starts[record]]["value"], name)
+                elif kept:
+                    self.delete(name - 1, stop)  # , name [op value]
+                else:
+                    self.delete(name, stop + 1)  # name [op value] ,
+
+    def may_fail(self, name):
+        """Whether the initialization of the declared variable at `name` can be a division by zero."""
+        tokens = self.tokens
+        if tokens[name + 1]["value"] not in ("/=", "%="):
+            return False
+        value = tokens[name + 2]
+        return value["type"] == "IDENTIFIER" or not literal(value)[0]
+
+    def fold(self, type, name):
+        """Rewrites `name op= literal` in a declaration of `type` to `name = result`."""
+        tokens = self.tokens
+        operator, value = tokens[name + 1], tokens[name + 2]
+        if operator["type"] == "ASSIGN_OP" or operator["type"] not in _VALUE_OPERATORS or \
+                value["type"] == "IDENTIFIER" or type not in ZERO_VALUES:
+            return
+        zero, right = ZERO_VALUES[type], literal(value)[0]
+        if isinstance(zero, str):
+            if type != "string" or operator["value"] != "+=" or not isinstance(right, str):
+                return
+            token = dict(value, type="STRING_KEY")
+        else:
+            try:
+                result = evaluate(operator["value"][0], zero, right)
+            except (ArithmeticError, ValueError, TypeError):
+                return
+            token = _literal_token(_CONVERSIONS[type](result), value["line_number"])
+            if token is None:
+                return
+        self.replaced[name + 1] = dict(operator, type="ASSIGN_OP", value="=")
+        self.replaced[name + 2] = token
+        self.report.values += 1
+
+    def result(self):
+        """The optimized tree, over a new token list."""
+        tree, deleted, dropped, replaced = self.tree, self.deleted, self.dropped, self.replaced
+        tokens = [replaced.get(index, token) for index, token in enumerate(self.tokens) if not deleted[index]]
+        moved = list(accumulate((1 - flag for flag in deleted), initial=0))   # old token index -> new
+        kept = list(accumulate((1 - flag for flag in dropped), initial=0))    # records kept before each
+        result = SyntaxTree(tokens)
+        kinds, starts, ends, sizes = tree.kinds, tree.starts, tree.ends, tree.sizes
+        for record in range(len(kinds)):
+            if dropped[record]:
+                continue
+            result.kinds.append(kinds[record])
+            result.starts.append(moved[starts[record]])
+            result.ends.append(moved[ends[record]])
+            result.sizes.append(kept[record + sizes[record] + 1] - kept[record + 1])
+        self.report.records_left = len(result)
+        self.report.tokens_left = len(tokens)
+        return result
+
+
+def optimize(tree):
+    """Optimizes a parsed program (a Parser's SyntaxTree); returns (the optimized SyntaxTree, its Report)."""
+    optimizer = _Optimizer(tree)
+    optimizer.branches()
+    optimizer.declarations()
+    return optimizer.result(), optimizer.report
+
+
+def main(argv=None):
+    from main import lex_file
+    from stack_parser import StackParser
+    from syntax_tree import dumps
+    arg_parser = argparse.ArgumentParser(description="Optimize .cat programs and report what was eliminated.")
+    arg_parser.add_argument("files", nargs="+", help=".cat files to optimize")
+    arg_parser.add_argument("--tree", action="store_true", help="print each optimized tree as JSON")
+    args = arg_parser.parse_args(argv)
+
+    status = 0
+    for path in args.files:
+        parser = StackParser(lex_file(path))
+        errors = []
+        while parser.current_token():
+            errors.extend(parser.parse_statement())
+        if errors:
+            print(f"{path}: ❌ {len(errors)} syntax error(s), not optimized")
+            status = 1
+            continue
+        tree, report = optimize(parser.tree)
+        print(f"{path}: {report}")
+        if args.tree:
+            print(dumps(tree.statements()))
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
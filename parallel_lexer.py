@@ -0,0 +1,138 @@
+"""
+Parallel lexing of one large .cat source.
+
+A pre-scan picks split points: newlines near equal offsets that are not inside
+a /* */ comment (quoted strings end at a newline, so a newline is never inside
+one). Segments are lexed in worker processes as if each started a fresh file,
+then merged in order. The merge checks every assumption the workers made, so
+the result is always token-for-token identical to lexer():
+
+- a segment is only used if the previous one ended with no token running into
+  the split; otherwise (the pre-scan missed a comment) the text from where
+  that token starts is re-lexed here instead,
+- line numbers (and the lines in warnings) are shifted by the lines before
+  the segment,
+- a leading "+" or "-" is retyped when the token before the split makes it
+  arithmetic rather than unary.
+
+    python parallel_lexer.py big.cat --workers 8
+"""
+import argparse
+import contextlib
+import io
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dfa_lexer import CONTEXT, RAW, get_tables, lexer, scan, token_value
+
+# Inputs smaller than this are lexed in-process; the pool would cost more than it saves
+PARALLEL_MIN_SIZE = 1 << 20
+
+_WARNING_LINE = re.compile(r"(, line )(\d+)$", re.MULTILINE)
+
+
+def find_split_points(text, parts):
+    """Returns up to parts - 1 increasing offsets just after newlines that look safe to split at."""
+    points = []
+    for part in range(1, parts):
+        newline = text.find("\n", len(text) * part // parts)
+        while newline != -1:
+            # A "*/" ahead with no "/*" before it means this newline is probably inside a comment
+            close = text.find("*/", newline)
+            if close == -1:
+                break
+            opening = text.find("/*", newline, close)
+            if opening != -1:
+                break
+            newline = text.find("\n", close)
+        if newline == -1:
+            break
+        if not points or newline + 1 > points[-1]:
+            points.append(newline + 1)
+    return points
+
+
+def _token_dicts(text, raw_tokens, base=0, line_offset=0):
+    return [{"type": token_type,
+             "value": text[start - base:end - base] if kind == RAW else token_value(text, kind, start - base, end - base),
+             "line_number": line_number + line_offset}
+            for token_type, kind, start, end, line_number in raw_tokens]
+
+
+def lex_segment(segment, origin, final):
+    """
+    Lexes one segment as if it started a file (runs in a worker process).
+    Returns (token dicts, end offset, lines counted, captured warnings).
+    """
+    captured = io.StringIO()
+    with contextlib.redirect_stdout(captured):
+        raw_tokens, pos, line_number, _ = scan(segment, final=final, origin=origin)
+    return _token_dicts(segment, raw_tokens), origin + pos, line_number - 1, captured.getvalue()
+
+
+def _shift_warning_lines(warnings, line_offset):
+    return _WARNING_LINE.sub(lambda match: f"{match.group(1)}{int(match.group(2)) + line_offset}", warnings)
+
+
+def parallel_lex(input_text, workers=None, parts=None):
+    """Lexes `input_text` in `parts` segments on `workers` processes; returns the tokens lexer() would."""
+    workers = workers or os.cpu_count() or 1
+    parts = parts or workers
+    if len(input_text) < PARALLEL_MIN_SIZE or parts < 2:
+        return lexer(input_text)
+
+    starts = [0] + find_split_points(input_text, parts)
+    ends = starts[1:] + [len(input_text)]
+    count = len(starts)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(lex_segment, input_text[start:end], start, index == count - 1)
+                   for index, (start, end) in enumerate(zip(starts, ends))]
+
+        tables = get_tables()
+        arithmetic = {token_type: alt_type for kind, token_type, alt_type in tables.actions[1:] if kind == CONTEXT}
+        tokens = []
+        resume = 0       # where the sequential lexer would be
+        line_number = 1  # and on which line
+        for index, future in enumerate(futures):
+            start, end = starts[index], ends[index]
+            final = index == count - 1
+            prev_type = tokens[-1]["type"] if tokens else None
+            if resume == start:
+                segment_tokens, pos, lines, warnings = future.result()
+                if segment_tokens and prev_type is not None and prev_type not in tables.unary_context:
+                    first = segment_tokens[0]
+                    first["type"] = arithmetic.get(first["type"], first["type"])
+                if line_number != 1:
+                    for token in segment_tokens:
+                        token["line_number"] += line_number - 1
+                    warnings = _shift_warning_lines(warnings, line_number - 1)
+                print(warnings, end="")
+                tokens.extend(segment_tokens)
+                resume = pos
+                line_number += lines
+            else:
+                # A token from an earlier segment runs into this one: lex from its start here
+                future.cancel()
+                raw_tokens, pos, line_number, _ = scan(input_text, resume, end, line_number, prev_type, final)
+                tokens.extend(_token_dicts(input_text, raw_tokens))
+                resume = pos
+    return tokens
+
+
+def lex_file_parallel(filename, workers=None):
+    """Reads a .cat file and lexes it with parallel_lex()."""
+    with open(filename, "r") as file:
+        return parallel_lex(file.read(), workers)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Lex one .cat file on several processes.")
+    arg_parser.add_argument("file", help=".cat file to lex")
+    arg_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = arg_parser.parse_args()
+    started = time.perf_counter()
+    result = lex_file_parallel(args.file, args.workers)
+    print(f"{len(result):,} tokens in {time.perf_counter() - started:.2f}s", file=sys.stderr)
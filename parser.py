@@ -1,3 +1,16 @@
+from diagnostics import Diagnostic
+from syntax_tree import DECLARATION, DECREMENT, ELSE, FOR, GC, IF, MAIN, PRINTF, RETURN, SyntaxTree
+
+# Bump when parse_statement changes the errors it reports; result_cache keys on it
+PARSER_VERSION = 2
+
+# Token types error recovery stops at (bracket_index.py computes the same sync points)
+DECLARATION_SYNC_TYPES = ["INT_KEY", "FLOAT_KEY", "DOUBLE_KEY", "CHAR_KEY", "TRUE_BOOL", "FALSE_BOOL", "STRING_KEY",
+                          "FOR_KEY", "IF_KEY", "ELSE_KEY", "RETURN_KEY", "PRINTF_KEY", "CLOSE-CURL-BRAC_DELI",
+                          "SINGLE_LINE_COMMENT"]
+STATEMENT_SYNC_TYPES = ["INT_KEY", "FLOAT_KEY", "DOUBLE_KEY", "CHAR_KEY", "TRUE_BOOL", "FALSE_BOOL", "STRING_KEY",
+                        "FOR_KEY", "IF_KEY", "ELSE_KEY", "RETURN_KEY", "PRINTF_KEY", "SINGLE_LINE_COMMENT"]
+
 class SyntaxError(Exception):
     """Custom exception for syntax errors, now includes line number."""
     def __init__(self, message, line_number):
@@ -5,11 +18,42 @@ class SyntaxError(Exception):
         self.line_number = line_number
 
 class Parser:
-    def __init__(self, tokens):
+    def __init__(self, tokens, index=None, tree=True, max_errors=None, on_error=None):
         self.tokens = tokens
+        self.index = index  # optional BracketIndex of `tokens`: error recovery jumps instead of scanning
         self.current_token_index = 0
         self.line_number = 1  # Track current line number
         self.variables = set()  # ✅ Tracks declared variables
+        self.tree = SyntaxTree(tokens) if tree else None  # records of the statements parsed so far
+        self.max_errors = max_errors  # stop at the end of the input once this many errors are reported
+        self.error_count = 0  # errors reported outside for-loop bodies
+        self.for_depth = 0  # for-loop bodies being parsed: their errors are dropped if the body closes
+        self.on_error = on_error  # optional callback taking each error once it is final, instead of the return values
+
+    def error(self, code, line_number, *args):
+        """
+        A Diagnostic for the current token. Errors outside for-loop bodies count
+        towards max_errors; the one that reaches it moves the parser to the end of
+        the input, so every statement being parsed finishes as it would at EOF.
+        """
+        start = self.current_token_index
+        if not self.for_depth:
+            self.error_count += 1
+            if self.max_errors is not None and self.error_count >= self.max_errors:
+                self.current_token_index = len(self.tokens)
+        return Diagnostic(code, line_number, start, min(start + 1, len(self.tokens)), args)
+
+    def report(self, errors, found=()):
+        """
+        Adds errors `found` in a block's body to `errors`, the block's own. With on_error
+        and outside for-loop bodies the errors are final: `errors` goes to on_error instead,
+        in the order they were raised, and is emptied.
+        """
+        errors.extend(found)
+        if self.on_error is not None and not self.for_depth:
+            for error in errors:
+                self.on_error(error)
+            errors.clear()
 
     def current_token(self):
         if self.current_token_index < len(self.tokens):
@@ -28,6 +72,9 @@ class Parser:
         Skips tokens until a semicolon (`;`), a new declaration keyword, or a closing `}` is found.
         Also ensures proper skipping inside `for` loops or block structures.
         """
+        if self.index is not None:
+            self.current_token_index = self.index.declaration_sync[self.current_token_index]
+            return
         while self.current_token():
             token = self.current_token()
 
@@ -37,8 +84,7 @@ class Parser:
                 return  
 
             # Stop if a new valid declaration keyword is found (int, float, etc.)
-            if token["type"] in ["INT_KEY", "FLOAT_KEY", "DOUBLE_KEY", "CHAR_KEY", "TRUE_BOOL", "FALSE_BOOL", "STRING_KEY", 
-                                "FOR_KEY", "IF_KEY", "ELSE_KEY", "RETURN_KEY", "PRINTF_KEY", "CLOSE-CURL-BRAC_DELI", "RETURN_KEY", "SINGLE_LINE_COMMENT"]: 
+            if token["type"] in DECLARATION_SYNC_TYPES:
                 return
 
             self.next_token()  # Skip any other unrecognized tokens
@@ -49,6 +95,9 @@ class Parser:
         - First, skips until `)` (closing parenthesis of loop header).
         - Then, skips until `}` (closing brace of loop body).
         """
+        if self.index is not None:
+            self.current_token_index = self.index.for_loop_sync(self.current_token_index)
+            return
         while self.current_token():
             token = self.current_token()
             
@@ -74,6 +123,9 @@ class Parser:
         Skips tokens until a semicolon (`;`), closing brace (`}`), or a valid new statement is found.
         This prevents infinite loops when encountering syntax errors.
         """
+        if self.index is not None:
+            self.current_token_index = self.index.statement_sync[self.current_token_index]
+            return
         while self.current_token():
             token = self.current_token()
 
@@ -88,8 +140,7 @@ class Parser:
                 return  
 
             # Stop if a new valid declaration keyword or block end is found
-            if token["type"] in ["INT_KEY", "FLOAT_KEY", "DOUBLE_KEY", "CHAR_KEY", "TRUE_BOOL", "FALSE_BOOL", "STRING_KEY", 
-                                "FOR_KEY", "IF_KEY", "ELSE_KEY", "RETURN_KEY", "PRINTF_KEY", "SINGLE_LINE_COMMENT"]: 
+            if token["type"] in STATEMENT_SYNC_TYPES:
                 return
 
             self.next_token()  # Skip unrecognized tokens
@@ -103,11 +154,12 @@ class Parser:
             return []  # Return empty error list if no token
 
         line_number = token["line_number"]
+        start = self.current_token_index
         errors = []  # Store errors locally
 
         # Step 1: Check for a valid type keyword (int, float, etc.)
         if token["type"] not in ["INT_KEY", "FLOAT_KEY", "DOUBLE_KEY", "CHAR_KEY", "BOOL_KEY", "STRING_KEY"]:
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected a type keyword at the beginning of the declaration.")
+            errors.append(self.error("declaration_type", line_number))
             self.skip_to_next_declaration()  # Move past faulty declaration
             return errors
         
@@ -119,7 +171,7 @@ class Parser:
             # Step 2: Check for a valid identifier
             token = self.current_token()
             if token and token["type"] != "IDENTIFIER":
-                errors.append(f"❌ Syntax Error on line {line_number}: Expected an identifier after the type.")
+                errors.append(self.error("declaration_identifier", line_number))
                 self.skip_to_next_declaration()
                 return errors 
             
@@ -135,7 +187,7 @@ class Parser:
 
                 # Ensure a valid value follows the assignment
                 if not token or token["type"] not in ["INTEGER", "FLOAT", "DOUBLE", "CHAR_KEY", "STRING_KEY", "TRUE_BOOL", "FALSE_BOOL", "IDENTIFIER"]:
-                    errors.append(f"❌ Syntax Error on line {line_number}: Expected a valid value after assignment.")
+                    errors.append(self.error("declaration_value", line_number))
                     self.skip_to_next_declaration()
                     return errors
                 
@@ -153,11 +205,12 @@ class Parser:
             elif token and token["type"] == "SEMI-COLON_DELI":  
                 break  # End of declaration
             else:
-                errors.append(f"❌ Syntax Error on line {line_number}: Missing ';' at the end of the declaration.")
+                errors.append(self.error("declaration_semicolon", line_number))
                 self.skip_to_next_declaration()
                 return errors
         
         self.next_token()  # Move to the next token after semicolon
+        self.add_node(DECLARATION, start)
 
         return errors  # Return collected errors
 
@@ -167,25 +220,60 @@ class Parser:
         <For_Loop> ::= "for" "("<Init> ";" <Condition> ";" <Update> ")" <Body>
         """
         errors = []  # Store errors locally
+        start = self.current_token_index
+        if not self.parse_for_header(errors):
+            return errors
+        node = self.open_node(FOR, start)
+        self.for_depth += 1
+
+        # **Parse statements inside loop body**
+        while self.current_token():
+            token = self.current_token()
+            
+            # Stop when we reach '}'
+            if token["type"] == "CLOSE-CURL-BRAC_DELI":
+                self.next_token()  # Move past '}'
+                self.for_depth -= 1
+                self.close_node(node)
+                return
+            
+             # **Parse statements inside loop body**
+            try:
+                errors.extend(self.parse_statement())  # ✅ Process statements inside `{}` correctly
+            except SyntaxError as e:
+                errors.append(str(e))
+                self.skip_to_next_for_loop()
+            
+        self.for_depth -= 1
+        if not self.for_depth:
+            self.error_count += len(errors)  # unclosed at the end of the input: the body's errors stand
+        self.close_node(node)
+        return errors  # Return collected errors        
+    
+    def parse_for_header(self, errors):
+        """
+        Parses a 'for' loop header up to and including the '{' of its body.
+        Appends any error to `errors`; returns True only when the body is open.
+        """
         token = self.current_token()
         
         if not token:
-            return []  # ✅ Return an empty list if no token
+            return False  # ✅ Nothing to parse if no token
 
         line_number = token["line_number"]
 
         if not token or token["type"] != "FOR_KEY":
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected 'for' keyword.")
-            return errors 
+            errors.append(self.error("for_keyword", line_number))
+            return False 
 
         self.next_token()  # Move past 'for'
         
         # Expect '('
         token = self.current_token()
         if not token or token["type"] != "OPEN-PAREN_DELI":
+            errors.append(self.error("for_paren", line_number))
             self.skip_to_next_for_loop()
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected '(' after 'for'.")
-            return errors 
+            return False 
         
         self.next_token()  # Move past '('
 
@@ -207,29 +295,29 @@ class Parser:
                     token = self.current_token()
 
                     if not token or token["type"] not in ["INTEGER", "FLOAT", "DOUBLE", "CHAR_KEY", "STRING_KEY", "IDENTIFIER"]:
+                        errors.append(self.error("for_init_value", line_number))
                         self.skip_to_next_for_loop()
-                        errors.append(f"❌ Syntax Error on line {line_number}: Expected a value after '=' in initialization.")
-                        return errors  
+                        return False  
                     self.next_token()
             else:
+                errors.append(self.error("for_init_identifier", line_number))
                 self.skip_to_next_for_loop()
-                errors.append(f"❌ Syntax Error on line {line_number}: Expected an Identifier after the type.")
-                return errors  
+                return False  
         elif token["type"] == "IDENTIFIER":
             # Handle without type (e.g., "i = 0;")
             self.next_token()
             token = self.current_token()
         else:
+            errors.append(self.error("for_init", line_number))
             self.skip_to_next_for_loop()
-            errors.append(f"❌ Syntax Error on line {line_number}: Invalid initialization in for loop.")
-            return errors  
+            return False  
 
         # Expect semicolon
         token = self.current_token()
         if not token or token["type"] != "SEMI-COLON_DELI":
+            errors.append(self.error("for_init_semicolon", line_number))
             self.skip_to_next_for_loop()
-            errors.append(f"❌ Syntax Error on line {line_number}: Missing ';' after initialization.")
-            return errors  
+            return False  
         self.next_token()
 
         # === <Condition> ::= <Identifier> <Rel_Op> <Expression> | <Expression> <Logic_Op> <Expression> ===
@@ -237,35 +325,35 @@ class Parser:
         token = self.current_token()
 
         if token["type"] not in ["IDENTIFIER", "INTEGER", "FLOAT"]:
+            errors.append(self.error("for_condition", line_number))
             self.skip_to_next_for_loop()
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected a condition expression after initialization.")
-            return errors  
+            return False  
 
         condition_expr.append(token["value"])
         self.next_token()
         token = self.current_token()
 
         if token["type"] not in ["EQUAL-REL_OP", "NOT-REL_OP", "GREAT-EQL-REL_OP", "LESS-EQL-REL_OP", "LESS-REL_OP", "GREAT-REL_OP"]:
+            errors.append(self.error("for_operator", line_number))
             self.skip_to_next_for_loop()
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected a relational operator.")
-            return errors 
+            return False 
         condition_expr.append(token["value"])
         self.next_token()
         token = self.current_token()
 
         # Expect another identifier or number after the relational operator
         if token["type"] not in ["IDENTIFIER", "INTEGER", "FLOAT"]:
+            errors.append(self.error("for_value", line_number))
             self.skip_to_next_for_loop()
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected a value after the relational operator.")
-            return errors 
+            return False 
         condition_expr.append(token["value"])
         self.next_token()
         token = self.current_token()
 
         if not token or token["type"] != "SEMI-COLON_DELI":
+            errors.append(self.error("for_condition_semicolon", line_number))
             self.skip_to_next_for_loop()
-            errors.append(f"❌ Syntax Error on line {line_number}: Missing ';' after condition.")
-            return errors  
+            return False  
         self.next_token()  # Move past ';'
 
         # === <Update> ::= <Identifier> <Increment> | <Identifier> <Assign_Op> <Expression> | OPTIONAL: <Update> "," <Update> ===
@@ -273,9 +361,9 @@ class Parser:
         token = self.current_token()
         # Expect an identifier
         if token["type"] != "IDENTIFIER":
+            errors.append(self.error("for_update", line_number))
             self.skip_to_next_for_loop()
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected an identifier at the beginning of the update expression.")
-            return errors 
+            return False 
         
         self.next_token()
         token = self.current_token()
@@ -292,46 +380,29 @@ class Parser:
 
             # Ensure a valid expression follows (Identifier or Number)
             if not token or token["type"] not in ["IDENTIFIER", "INTEGER", "FLOAT", "DOUBLE"]:
+                errors.append(self.error("for_update_value", line_number))
                 self.skip_to_next_for_loop()
-                errors.append(f"❌ Syntax Error on line {line_number}: Expected a valid expression after assignment operator in update section.")
-                return errors            
+                return False            
 
             self.next_token()
             token = self.current_token()
             
         if not token or token["type"] != "CLOSE-PAREN_DELI":
+            errors.append(self.error("for_close", line_number))
             self.skip_to_next_for_loop()
-            errors.append(f"❌ Syntax Error on line {line_number}: Missing ')' after the update statement.")
-            return errors
+            return False
         self.next_token()
 
         # === <Body> ::= "{" <Statements> "}" ===
         token = self.current_token()
         if not token or token["type"] != "OPEN-CURL-BRAC_DELI":
+            errors.append(self.error("for_body", line_number))
             self.skip_to_next_for_loop()
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected '{{' after 'for' loop header.")
-            return errors
+            return False
 
         self.next_token()  # Move past '{'
+        return True
 
-        # **Parse statements inside loop body**
-        while self.current_token():
-            token = self.current_token()
-            
-            # Stop when we reach '}'
-            if token["type"] == "CLOSE-CURL-BRAC_DELI":
-                self.next_token()  # Move past '}'
-                return
-            
-             # **Parse statements inside loop body**
-            try:
-                errors.extend(self.parse_statement())  # ✅ Process statements inside `{}` correctly
-            except SyntaxError as e:
-                errors.append(str(e))
-                self.skip_to_next_for_loop()
-            
-        return errors  # Return collected errors        
-    
     def parse_statement(self):
         """
         General statement parser that delegates to specific parsing functions.
@@ -357,7 +428,7 @@ class Parser:
                 return errors  # ✅ No unexpected statement error
 
             elif next_token and next_token["type"] != "DECRE_OP":
-                errors.append(f"❌ Syntax Error on line {line_number}: Unrecognized function or statement '{token['value']}'.")
+                errors.append(self.error("unrecognized_statement", line_number, token['value']))
                 self.skip_to_next_for_loop() # ✅ Skip to avoid redundant errors
                 return errors
 
@@ -399,7 +470,7 @@ class Parser:
                 errors.extend(result)
 
         else:
-            errors.append(f"❌ Syntax Error on line {line_number}: Unexpected statement.")
+            errors.append(self.error("unexpected_statement", line_number))
             self.skip_to_next_statement()
 
         return errors
@@ -415,6 +486,7 @@ class Parser:
             return []
 
         line_number = token["line_number"]
+        start = self.current_token_index
 
         if token["type"] in ["PRINTF_KEY", "GC_KEY"]:
             function_name = token["value"]  # Store function name
@@ -423,7 +495,7 @@ class Parser:
 
             if function_name == "printf":
                 if not token or token["type"] != "OPEN-PAREN_DELI":
-                    errors.append(f"❌ Syntax Error on line {line_number}: Expected '(' after 'printf'.")
+                    errors.append(self.error("printf_paren", line_number))
                     #self.next_token()
                     self.skip_to_next_statement()
                     return errors
@@ -432,7 +504,7 @@ class Parser:
                 # Expect string inside printf
                 token = self.current_token()
                 if not token or token["type"] != "STRING_KEY":
-                    errors.append(f"❌ Syntax Error on line {line_number}: Expected a string inside printf.")
+                    errors.append(self.error("printf_string", line_number))
                     #self.next_token()
                     self.skip_to_next_statement()
                     return errors
@@ -445,7 +517,7 @@ class Parser:
                     token = self.current_token()
             
                     if not token or token["type"] not in ["IDENTIFIER", "STRING_KEY", "CHAR_KEY"]:
-                        errors.append(f"❌ Syntax Error on line {line_number}: Expected an identifier or string after `,`.")
+                        errors.append(self.error("printf_argument", line_number))
                         self.next_token()
                         self.skip_to_next_statement()
                         return errors
@@ -455,7 +527,7 @@ class Parser:
             
                 # ✅ Expect `)` closing parenthesis
                 if not token or token["type"] != "CLOSE-PAREN_DELI":
-                    errors.append(f"❌ Syntax Error on line {line_number}: Expected ')' after printf arguments.")
+                    errors.append(self.error("printf_close", line_number))
                     #self.next_token()
                     self.skip_to_next_statement()
                     return errors
@@ -464,38 +536,20 @@ class Parser:
                 # ✅ Expect `;` after printf
                 token = self.current_token()
                 if not token or token["type"] != "SEMI-COLON_DELI":
-                    errors.append(f"❌ Syntax Error on line {line_number}: Missing ';' after printf statement.")
+                    errors.append(self.error("printf_semicolon", line_number))
                     #self.next_token()
                     self.skip_to_next_statement()
                     return errors
                 self.next_token()
+                self.add_node(PRINTF, start)
 
                 return errors
 
             elif function_name == "gc":
-                if not token or token["type"] != "OPEN-PAREN_DELI":
-                    errors.append(f"❌ Syntax Error on line {line_number}: Expected '(' after 'gc'.")
-                    #self.next_token()
-                    self.skip_to_next_statement()
-                    return errors
-                self.next_token() # Move past '('
-
-                # ✅ Expect `)` closing parenthesis
-                token = self.current_token()
-                if not token or token["type"] != "CLOSE-PAREN_DELI":
-                    errors.append(f"❌ Syntax Error on line {line_number}: Expected ')' after '(' for gc function.")
-                    #self.next_token()
-                    self.skip_to_next_statement()
-                    return errors
-                self.next_token() # Move past ')'
-
-                # ✅ Expect `{` after `gc()`
-                token = self.current_token()
-                if not token or token["type"] != "OPEN-CURL-BRAC_DELI":
-                    errors.append(f"❌ Syntax Error on line {line_number}: Expected '{{' to start 'gc' function body.")
-                    self.skip_to_next_statement()
+                if not self.parse_gc_header(errors, line_number):
                     return errors
-                self.next_token()
+                node = self.open_node(GC, start)
+                self.report(errors)  # the header's, before the body's
 
                 # ✅ Parse statements inside `gc` function body
                 while self.current_token():
@@ -504,17 +558,19 @@ class Parser:
                     # ✅ Stop when reaching `}`
                     if token["type"] == "CLOSE-CURL-BRAC_DELI":
                         self.next_token()
+                        self.close_node(node)
                         return errors
 
                     try:
                         # Parse declarations, loops, or other valid statements inside `gc`
-                        errors.extend(self.parse_statement())
+                        self.report(errors, self.parse_statement())
                     except SyntaxError as e:
                         errors.append(str(e))
                         self.skip_to_next_statement()
                 
                  # ✅ Ensure function properly closes
-                errors.append(f"❌ Syntax Error on line {line_number}: Missing closing Bracket for 'gc' function.")
+                self.close_node(node)
+                errors.append(self.error("gc_unclosed", line_number))
                 return errors
 
         elif token["type"] == "RETURN_KEY":
@@ -522,7 +578,7 @@ class Parser:
             token = self.current_token()
 
             if not token or token["type"] not in ["INTEGER", "FLOAT", "IDENTIFIER"]:
-                errors.append(f"❌ Syntax Error on line {line_number}: Expected a return value.")
+                errors.append(self.error("return_value", line_number))
                 self.next_token()
                 self.skip_to_next_statement()
                 return errors
@@ -531,20 +587,51 @@ class Parser:
             token = self.current_token()
 
             if not token or token["type"] != "SEMI-COLON_DELI":
-                errors.append(f"❌ Syntax Error on line {line_number}: Missing ';' after return statement.")
+                errors.append(self.error("return_semicolon", line_number))
                 self.next_token()
                 self.skip_to_next_statement()
                 return errors
 
             self.next_token()
+            self.add_node(RETURN, start)
             return errors
 
         else:
             # If function name is not recognized
-            errors.append(f"❌ Syntax Error on line {line_number}: Unrecognized function or statement '{token['value']}'.")
+            errors.append(self.error("unrecognized_statement", line_number, token['value']))
             self.skip_to_next_statement()
             return errors
     
+    def parse_gc_header(self, errors, line_number):
+        """
+        Parses '() {' after 'gc'. Appends any error to `errors`; returns True only when the body is open.
+        """
+        token = self.current_token()
+        if not token or token["type"] != "OPEN-PAREN_DELI":
+            errors.append(self.error("gc_paren", line_number))
+            #self.next_token()
+            self.skip_to_next_statement()
+            return False
+        self.next_token() # Move past '('
+
+        # ✅ Expect `)` closing parenthesis
+        token = self.current_token()
+        if not token or token["type"] != "CLOSE-PAREN_DELI":
+            errors.append(self.error("gc_close", line_number))
+            #self.next_token()
+            self.skip_to_next_statement()
+            return False
+        self.next_token() # Move past ')'
+
+        # ✅ Expect `{` after `gc()`
+        token = self.current_token()
+        if not token or token["type"] != "OPEN-CURL-BRAC_DELI":
+            errors.append(self.error("gc_body", line_number))
+            self.skip_to_next_statement()
+            return False
+        self.next_token()
+        return True
+
     def parse_if_else(self):
         """
         Parses if-else statements.
@@ -555,29 +642,82 @@ class Parser:
         errors = []
         token = self.current_token()
         line_number = token["line_number"]
+        start = self.current_token_index
+
+        if not self.parse_if_header(errors, line_number):
+            return errors
+        node = self.open_node(IF, start)
+        self.report(errors)  # the header's, before the body's
+
+        # Parse statements inside `if` body
+        while self.current_token():
+            token = self.current_token()
+
+            if token["type"] == "CLOSE-CURL-BRAC_DELI":  # End of if-block
+                self.next_token()
+                break
+
+            try:
+                self.report(errors, self.parse_statement())
+            except SyntaxError as e:
+                errors.append(str(e))
+                self.skip_to_next_statement()
+        self.close_node(node)
+
+        # ✅ **Check for `else` statement**
+        token = self.current_token()
+        if token and token["type"] == "ELSE_KEY":
+            start = self.current_token_index
+            if not self.parse_else_header(errors, line_number):
+                return errors
+            node = self.open_node(ELSE, start)
+            self.report(errors)
 
+            # Parse statements inside `else` body
+            while self.current_token():
+                token = self.current_token()
+
+                if token["type"] == "CLOSE-CURL-BRAC_DELI":  # End of else-block
+                    self.next_token()
+                    self.close_node(node)
+                    return errors
+                
+                try:
+                    self.report(errors, self.parse_statement())
+                except SyntaxError as e:
+                    errors.append(str(e))
+                    self.skip_to_next_statement()
+            self.close_node(node)
+
+        return errors  # Return all collected errors
+    
+    def parse_if_header(self, errors, line_number):
+        """
+        Parses 'if (<condition>) {'. Appends any error to `errors`; returns True only when the body is open.
+        """
+        token = self.current_token()
         if token["type"] != "IF_KEY":
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected 'if' keyword.")
+            errors.append(self.error("if_keyword", line_number))
             self.skip_to_next_statement()
-            return errors
+            return False
 
         self.next_token()  # Move past 'if'
 
         # Expect '('
         token = self.current_token()
         if not token or token["type"] != "OPEN-PAREN_DELI":
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected '(' after 'if'.")
+            errors.append(self.error("if_paren", line_number))
             self.skip_to_next_statement()
-            return errors
+            return False
 
         self.next_token()  # Move past '('
 
         # Expect a condition (Identifier or value)
         token = self.current_token()
         if not token or token["type"] not in ["IDENTIFIER", "INTEGER", "FLOAT", "TRUE_BOOL", "FALSE_BOOL", "CHAR_KEY", "STRING_KEY"]:
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected a condition expression.")
+            errors.append(self.error("if_condition", line_number))
             self.skip_to_next_statement()
-            return errors       
+            return False       
 
         self.next_token()  # Move past condition
 
@@ -586,147 +726,149 @@ class Parser:
         if not token or token["type"] not in ["EQUAL-REL_OP", "NOT-REL_OP", "GREAT-EQL-REL_OP", 
                                             "LESS-EQL-REL_OP", "LESS-REL_OP", "GREAT-REL_OP", 
                                             "AND-LOGIC_OP", "OR-LOGIC_OP"]:
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected a valid comparison or logical operator.")
+            errors.append(self.error("if_operator", line_number))
             self.skip_to_next_statement()
-            return errors  
+            return False  
 
         self.next_token()  # Move past operator
         token = self.current_token()
         # Expect another identifier, number, or boolean after operator
         if not token or token["type"] not in ["IDENTIFIER", "INTEGER", "FLOAT", "TRUE_BOOL", "FALSE_BOOL", "STRING_KEY", "CHAR_KEY"]:
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected a value after the operator.")
+            errors.append(self.error("if_value", line_number))
             self.skip_to_next_statement()
-            return errors
+            return False
 
         self.next_token()  # Move past value
         token = self.current_token()
         # Expect ')'
         if not token or token["type"] != "CLOSE-PAREN_DELI":
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected ')' after condition.")
+            errors.append(self.error("if_close", line_number))
             self.skip_to_next_statement()
-            return errors
+            return False
 
         self.next_token()  # Move past ')'
 
         # Expect '{' for body
         token = self.current_token()
         if not token or token["type"] != "OPEN-CURL-BRAC_DELI":
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected OPEN_BRACKET after 'if' or 'else if'.")
+            errors.append(self.error("if_body", line_number))
             self.skip_to_next_statement()
-            return errors
+            return False
 
         self.next_token()  # Move past '{'
+        return True
 
-        # Parse statements inside `if` body
+    def parse_else_header(self, errors, line_number):
+        """
+        Parses 'else {' after an if-body. Appends any error to `errors`; returns True only when the body is open.
+        """
+        self.next_token()  # Move past 'else'
+
+        # Expect '{'
+        token = self.current_token()
+        if not token or token["type"] != "OPEN-CURL-BRAC_DELI":
+            errors.append(self.error("else_body", line_number))
+            self.skip_to_next_statement()
+            return False
+        
+        self.next_token()  # Move past '{'
+        return True
+
+    def parse_main_function(self):
+        """
+        Parses the 'int main()' function structure.
+        """
+        errors = []
+        start = self.current_token_index
+        if not self.parse_main_header(errors):
+            return errors
+        node = self.open_node(MAIN, start)
+        self.report(errors)  # the header's, before the body's
+
+        # **Parse statements inside main function**
         while self.current_token():
             token = self.current_token()
-
-            if token["type"] == "CLOSE-CURL-BRAC_DELI":  # End of if-block
-                self.next_token()
-                break
+            
+            if token["type"] == "CLOSE-CURL-BRAC_DELI":
+                self.next_token()  # Move past '}'
+                self.close_node(node)
+                return errors  # Exit after closing '}'
 
             try:
-                errors.extend(self.parse_statement())
+                self.report(errors, self.parse_statement())
             except SyntaxError as e:
                 errors.append(str(e))
                 self.skip_to_next_statement()
-
-        # ✅ **Check for `else` statement**
-        token = self.current_token()
-        if token and token["type"] == "ELSE_KEY":
-            self.next_token()  # Move past 'else'
-
-            # Expect '{'
-            token = self.current_token()
-            if not token or token["type"] != "OPEN-CURL-BRAC_DELI":
-                errors.append(f"❌ Syntax Error on line {line_number}: Expected OPEN BRACKET to start else-body.")
-                self.skip_to_next_statement()
-                return errors
-            
-            self.next_token()  # Move past '{'
-
-            # Parse statements inside `else` body
-            while self.current_token():
-                token = self.current_token()
-
-                if token["type"] == "CLOSE-CURL-BRAC_DELI":  # End of else-block
-                    self.next_token()
-                    return errors
-                
-                try:
-                    errors.extend(self.parse_statement())
-                except SyntaxError as e:
-                    errors.append(str(e))
-                    self.skip_to_next_statement()
-
-        return errors  # Return all collected errors
+        
+        self.close_node(node)
+        return errors
     
-    def parse_main_function(self):
+    def parse_main_header(self, errors):
         """
-        Parses the 'int main()' function structure.
+        Parses 'int main() {'. Appends any error to `errors`; returns True only when the body is open.
         """
-        errors = []
         token = self.current_token()
         line_number = token["line_number"]
 
         # Expect 'int'
         if not token or token["type"] != "INT_KEY":
-            return []
+            return False
 
         self.next_token()
         token = self.current_token()
 
         # Expect 'main'
         if not token or token["type"] != "MAIN_KEY":
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected 'main' after 'int'.")
+            errors.append(self.error("main_keyword", line_number))
             self.skip_to_next_statement()
-            return errors
+            return False
 
         self.next_token()
         token = self.current_token()
 
         # Expect '('
         if not token or token["type"] != "OPEN-PAREN_DELI":
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected '(' after 'main'.")
+            errors.append(self.error("main_paren", line_number))
             self.skip_to_next_statement()
-            return errors
+            return False
 
         self.next_token()
         token = self.current_token()
 
         # Expect ')'
         if not token or token["type"] != "CLOSE-PAREN_DELI":
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected ')' after 'main('.")
+            errors.append(self.error("main_close", line_number))
             self.skip_to_next_statement()
-            return errors
+            return False
 
         self.next_token()
         token = self.current_token()
 
         # Expect '{'
         if not token or token["type"] != "OPEN-CURL-BRAC_DELI":
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected '{{' to start main function body.")
+            errors.append(self.error("main_body", line_number))
             self.skip_to_next_statement()
-            return errors
+            return False
 
         self.next_token()
+        return True
 
-        # **Parse statements inside main function**
-        while self.current_token():
-            token = self.current_token()
-            
-            if token["type"] == "CLOSE-CURL-BRAC_DELI":
-                self.next_token()  # Move past '}'
-                return errors  # Exit after closing '}'
+    def add_node(self, kind, start):
+        """ Records a statement without a body, from token `start` to here, in self.tree. """
+        if self.tree is not None:
+            self.tree.add(kind, start, self.current_token_index)
+
+    def open_node(self, kind, start):
+        """ Records a block from token `start`; the statements of its body are recorded inside it until close_node(). """
+        if self.tree is not None:
+            return self.tree.open(kind, start)
+        return None
+
+    def close_node(self, node):
+        """ Ends the record open_node() returned here. """
+        if node is not None:
+            self.tree.close(node, self.current_token_index)
 
-            try:
-                errors.extend(self.parse_statement())
-            except SyntaxError as e:
-                errors.append(str(e))
-                self.skip_to_next_statement()
-        
-        return errors
-    
     def peek_next_token(self):
         """ Returns the next token without advancing the current index. """
         if self.current_token_index + 1 < len(self.tokens):
@@ -740,6 +882,7 @@ class Parser:
         errors = []
         token = self.current_token()
         line_number = token["line_number"]
+        start = self.current_token_index
 
         if not token or token["type"] != "IDENTIFIER":
             return []  # ✅ No decrement operation
@@ -749,7 +892,7 @@ class Parser:
 
         # Expect `--`
         if not token or token["type"] != "DECRE_OP":
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected '--' after identifier.")
+            errors.append(self.error("decrement_operator", line_number))
             self.skip_to_next_statement()
             return errors
         
@@ -758,9 +901,10 @@ class Parser:
 
         # Expect `;`
         if not token or token["type"] != "SEMI-COLON_DELI":
-            errors.append(f"❌ Syntax Error on line {line_number}: Expected ';' after '--'.")
+            errors.append(self.error("decrement_semicolon", line_number))
             self.skip_to_next_statement()
             return errors
 
         self.next_token()  # ✅ Move past `;`
+        self.add_node(DECREMENT, start)
         return errors
@@ -0,0 +1,223 @@
+"""
+Opt-in profiling: per-phase wall time and peak memory, per-function call
+counts and times, a summary table and a Chrome trace-event file.
+
+    profiler = Profiler()
+    with profiler:                     # wraps the target functions
+        with profiler.phase("lex"):
+            tokens = main.lexer(text)
+        with profiler.phase("parse"):
+            errors = main.parse_tokens(tokens)
+    print(profiler.summary())
+    profiler.write_chrome_trace("trace.json")   # open in chrome://tracing or Perfetto
+
+Targets are "module.function" or "module.Class.method" names and may use
+shell wildcards ("main.process_*"). They are wrapped by replacing the module
+or class attribute while the profiler runs, and restored afterwards, so with
+profiling off nothing is wrapped and the module-level phase() returns a
+shared no-op context. Callers that bound a function with `from x import f`
+before the profiler started keep calling the unwrapped one; name the
+importing module's attribute as a target to cover those calls (e.g.
+"stream_lexer.scan").
+
+main() profiles itself when CATHARSIS_PROFILE names the trace file to write
+(CATHARSIS_PROFILE_MEMORY=0 turns memory tracing off); cli.py takes --profile
+and --no-profile-memory. Memory tracing makes everything it measures several
+times slower, so compare function timings with it off.
+"""
+import contextlib
+import fnmatch
+import functools
+import importlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+DEFAULT_TARGETS = [
+    "main.process_*", "main.lexer", "main.parse_tokens", "main.write_tokens_to_csv", "main.write_errors_to_csv",
+    "dfa_lexer.lexer", "dfa_lexer.scan", "stream_lexer.scan",
+    "parser.Parser.parse_*", "parser.Parser.skip_*",
+]
+# Function events kept for the trace; calls past this are still counted
+DEFAULT_MAX_EVENTS = 1_000_000
+
+_NULL_CONTEXT = contextlib.nullcontext()
+_active = None
+
+
+def phase(name):
+    """Context manager timing a phase on the running profiler; a no-op when none is running."""
+    return _NULL_CONTEXT if _active is None else _active.phase(name)
+
+
+class Profiler:
+    """Collects phase and function timings while started; see the module docstring."""
+
+    def __init__(self, targets=None, memory=True, max_events=DEFAULT_MAX_EVENTS, modules=None):
+        self.targets = DEFAULT_TARGETS if targets is None else targets
+        self.memory = memory
+        self.max_events = max_events
+        self.modules = modules or {}  # module name -> module object, e.g. {"main": __main__}
+        self.phases = []           # (name, start ns, duration ns, peak bytes, thread id)
+        self.functions = {}        # name -> [calls, inclusive ns, self ns]
+        self.events = []           # (name, start ns, duration ns, thread id)
+        self.dropped_events = 0
+        self.origin = time.perf_counter_ns()
+        self._patched = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._phase_stack = []
+        self._started_tracemalloc = False
+
+    # Wrapping
+
+    def _resolve(self, target):
+        """Yields (owner, attribute name, qualified name) for every attribute a target names."""
+        parts = target.split(".")
+        for split in range(len(parts) - 1, 0, -1):
+            module_name = ".".join(parts[:split])
+            try:
+                owner = self.modules.get(module_name) or importlib.import_module(module_name)
+            except ImportError:
+                continue
+            for part in parts[split:-1]:
+                owner = getattr(owner, part)
+            prefix = ".".join(parts[:-1])
+            for name in sorted(vars(owner)):
+                if fnmatch.fnmatchcase(name, parts[-1]) and callable(vars(owner)[name]):
+                    yield owner, name, f"{prefix}.{name}"
+            return
+        raise ImportError(f"No module found for profiling target: {target}")
+
+    def _wrap(self, function, name):
+        record = self.functions.setdefault(name, [0, 0, 0])
+        local = self._local
+        clock = time.perf_counter_ns
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            stack = getattr(local, "stack", None)
+            if stack is None:
+                stack = local.stack = []
+            stack.append(0)
+            started = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = clock() - started
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                with self._lock:
+                    record[0] += 1
+                    record[1] += elapsed
+                    record[2] += elapsed - children
+                    if len(self.events) < self.max_events:
+                        self.events.append((name, started, elapsed, threading.get_ident()))
+                    else:
+                        self.dropped_events += 1
+
+        return wrapper
+
+    def start(self):
+        global _active
+        if _active is not None:
+            raise RuntimeError("A profiler is already running.")
+        seen = set()
+        for target in self.targets:
+            for owner, attribute, name in self._resolve(target):
+                if (id(owner), attribute) in seen:
+                    continue
+                seen.add((id(owner), attribute))
+                original = vars(owner)[attribute]
+                setattr(owner, attribute, self._wrap(original, name))
+                self._patched.append((owner, attribute, original))
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        _active = self
+        return self
+
+    def stop(self):
+        global _active
+        for owner, attribute, original in reversed(self._patched):
+            setattr(owner, attribute, original)
+        self._patched.clear()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        _active = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # Phases
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Times a phase and, with memory tracing on, its peak traced memory (nested phases count)."""
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            if self._phase_stack:
+                parent = self._phase_stack[-1]
+                parent[1] = max(parent[1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        entry = [name, 0]
+        self._phase_stack.append(entry)
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter_ns() - started
+            self._phase_stack.pop()
+            peak = max(entry[1], tracemalloc.get_traced_memory()[1]) if tracing else None
+            if peak is not None and self._phase_stack:
+                parent = self._phase_stack[-1]
+                parent[1] = max(parent[1], peak)
+            self.phases.append((name, started, elapsed, peak, threading.get_ident()))
+
+    # Reports
+
+    def summary(self):
+        """Phase and function tables as text, functions sorted by self time."""
+        lines = [f"{'phase':<28} {'ms':>10} {'peak MB':>9}"]
+        for name, _, elapsed, peak, _ in sorted(self.phases, key=lambda phase: phase[1]):
+            peak_text = f"{peak / (1 << 20):9.2f}" if peak is not None else f"{'-':>9}"
+            lines.append(f"{name:<28} {elapsed / 1e6:10.2f} {peak_text}")
+        lines.append("")
+        lines.append(f"{'function':<40} {'calls':>10} {'total ms':>10} {'self ms':>10} {'us/call':>8}")
+        for name, (calls, total, own) in sorted(self.functions.items(), key=lambda item: -item[1][2]):
+            if calls:
+                lines.append(f"{name:<40} {calls:>10,} {total / 1e6:10.2f} {own / 1e6:10.2f} "
+                             f"{total / calls / 1e3:8.2f}")
+        if self.memory:
+            lines.append("(memory tracing was on; tracemalloc slows allocation-heavy code several times over)")
+        if self.dropped_events:
+            lines.append(f"({self.dropped_events:,} calls were counted but left out of the trace)")
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """The recorded phases and calls as a Chrome trace-event document."""
+        pid = os.getpid()
+        events = []
+        for name, started, elapsed, peak, thread_id in self.phases:
+            event = {"name": name, "cat": "phase", "ph": "X", "ts": (started - self.origin) / 1e3,
+                     "dur": elapsed / 1e3, "pid": pid, "tid": thread_id}
+            if peak is not None:
+                event["args"] = {"peak_bytes": peak}
+            events.append(event)
+        for name, started, elapsed, thread_id in self.events:
+            events.append({"name": name, "cat": "function", "ph": "X", "ts": (started - self.origin) / 1e3,
+                           "dur": elapsed / 1e3, "pid": pid, "tid": thread_id})
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"dropped_events": self.dropped_events}}
+
+    def write_chrome_trace(self, filename):
+        with open(filename, "w", encoding="utf-8") as file:
+            json.dump(self.chrome_trace(), file)
+        return True
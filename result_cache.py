@@ -0,0 +1,153 @@
+"""
+On-disk cache of lex and parse results, keyed by file content.
+
+The key is a SHA-256 of the source bytes plus main.LEXER_VERSION and
+parser.PARSER_VERSION, so bumping either version invalidates every entry.
+Each entry holds the token stream (in the token_binary format), the lexer
+warnings and the errors Parser.parse_statement reported (as
+diagnostics.error_dict() data), plus how long the
+lex and parse took originally, which is what a hit saves.
+
+The cache is one SQLite database in WAL mode: any number of processes can
+read and write it at once, with writers waiting on each other for up to
+`timeout` seconds. Entries are evicted least recently used first once their
+total size passes `max_bytes`.
+
+    python result_cache.py stats [path]
+    python result_cache.py clear [path]
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from diagnostics import error_dict, error_from_dict
+from main import LEXER_VERSION
+from parser import PARSER_VERSION
+from token_binary import decode_tokens, encode_tokens
+
+DEFAULT_CACHE_PATH = os.environ.get("CATHARSIS_CACHE", os.path.join(".catharsis_cache", "results.sqlite"))
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    tokens BLOB NOT NULL,
+    warnings TEXT NOT NULL,
+    errors TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+
+def content_key(data):
+    """Cache key for source bytes under the current lexer and parser versions."""
+    digest = hashlib.sha256(f"lexer {LEXER_VERSION} parser {PARSER_VERSION}\n".encode("ascii"))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def file_key(filename):
+    """Cache key for the contents of `filename`."""
+    with open(filename, "rb") as file:
+        return content_key(file.read())
+
+
+class ResultCache:
+    """
+    Size-bounded LRU store of (tokens, warnings, errors) per content key.
+    hits, misses and saved_seconds count this instance's lookups only.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, timeout=30.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def get(self, key):
+        """Returns (TokenBuffer, warnings, errors) for `key`, or None on a miss."""
+        row = self.connection.execute(
+            "SELECT tokens, warnings, errors, seconds FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        tokens, warnings, errors, seconds = row
+        self.connection.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        self.saved_seconds += seconds
+        return decode_tokens(tokens, key), json.loads(warnings), [error_from_dict(data) for data in json.loads(errors)]
+
+    def put(self, key, tokens, warnings, errors, seconds):
+        """Stores one result (`seconds` is what producing it cost) and evicts down to max_bytes."""
+        blob = encode_tokens(tokens)
+        warnings = json.dumps(list(warnings))
+        errors = json.dumps([error_dict(error) for error in errors], ensure_ascii=False)
+        size = len(blob) + len(warnings) + len(errors)
+        if size > self.max_bytes:
+            return False
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (key, blob, warnings, errors, size, seconds, time.time()))
+            self._evict()
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return True
+
+    def _evict(self):
+        excess = self.size() - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for key, size in self.connection.execute("SELECT key, size FROM results ORDER BY last_used"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self.connection.executemany("DELETE FROM results WHERE key = ?", victims)
+
+    def size(self):
+        """Total bytes of the stored entries."""
+        return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def clear(self):
+        self.connection.execute("DELETE FROM results")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3) or sys.argv[1] not in ("stats", "clear"):
+        print("Usage: python result_cache.py (stats | clear) [path]")
+        sys.exit(2)
+    with ResultCache(sys.argv[2] if len(sys.argv) == 3 else DEFAULT_CACHE_PATH) as cache:
+        if sys.argv[1] == "clear":
+            cache.clear()
+        print(f"{cache.path}: {len(cache):,} entries, {cache.size() / (1 << 20):.1f} MB")
@@ -0,0 +1,270 @@
+"""
+Semantic analysis: scoped symbol table and variable checks.
+
+check() walks a parsed program's SyntaxTree records once, in source order,
+and reads the identifiers of each statement straight from the tokens:
+
+    undeclared_variable   a use of a name no enclosing scope declares (reported
+                          once per scope: the name is then entered as undeclared)
+    redeclared_variable   a second declaration of a name in the same scope
+    shadowed_variable     a declaration hiding one of an enclosing scope (a warning)
+
+The file is the global scope; main, gc, if, else and for bodies each open a
+scope inside the one they appear in, and a for-loop's `int i` belongs to its
+body's scope. A name is in scope from its own declaration on, so in
+`int a = a;` the value is the new `a`. Only statements in the tree are
+checked: a declaration with a syntax error declares nothing.
+
+Identifiers are interned to small integer ids. Like SyntaxTree, SymbolTable
+keeps its symbols and scopes in parallel arrays, so a large program costs
+no object per symbol. Symbols are numbered in declaration order, scopes in
+the order they open (scope 0 is the file):
+
+    symbol_names[s]      interned id         scope_kinds[c]     record kind, -1 for the file
+    symbol_types[s]      None if undeclared  scope_records[c]   the block's record, -1 for the file
+    symbol_positions[s]  token of the name   scope_parents[c]   enclosing scope, -1 for the file
+    symbol_lines[s]                          scope_symbols[c]   dict: interned id -> symbol
+    symbol_scopes[s]
+    symbol_outers[s]     the symbol it hides, or -1
+
+and references maps the token index of every use checked to its symbol.
+Lookups do not walk the parent links: `visible` holds the innermost visible
+symbol of every id, and exit() puts back the ones the scope's symbols hid,
+so declaring, resolving, entering and leaving are all O(1) and the pass is
+linear in the number of tokens.
+
+    python semantic.py program.cat              # syntax errors, then semantic findings
+    python semantic.py program.cat --symbols    # also prints every scope's symbols
+"""
+import argparse
+import sys
+from array import array
+
+from diagnostics import Diagnostic
+from syntax_tree import DECLARATION, ELSE, FOR, GC, IF, KIND_NAMES, MAIN
+
+# Bump when check() changes the symbols or findings it reports; transpile's code cache keys on it
+SEMANTIC_VERSION = 1
+
+_TYPE_KEYS = {"INT_KEY", "FLOAT_KEY", "DOUBLE_KEY", "CHAR_KEY", "BOOL_KEY", "STRING_KEY"}
+_BLOCKS = {MAIN, GC, FOR, IF, ELSE}
+
+
+class Symbol:
+    """One symbol of a SymbolTable as an object, from SymbolTable.symbol()."""
+    __slots__ = ("index", "name", "type", "position", "line", "scope", "outer")
+
+    def __init__(self, index, name, type, position, line, scope, outer):
+        self.index = index
+        self.name = name
+        self.type = type          # None for an undeclared name entered after its error
+        self.position = position  # token index of the name in its declaration (or first use)
+        self.line = line
+        self.scope = scope
+        self.outer = outer        # the symbol of the same name it hides, or None
+
+    def __repr__(self):
+        return f"Symbol({self.index}, {self.name!r}, {self.type!r}, line {self.line})"
+
+
+class SymbolTable:
+    """Scopes and symbols of one program; see the module docstring."""
+
+    def __init__(self):
+        self.ids = {}      # name -> interned id
+        self.names = []    # interned id -> name
+        self.visible = []  # interned id -> innermost visible symbol, or -1
+        self.symbol_names = array("q")
+        self.symbol_types = []
+        self.symbol_positions = array("q")
+        self.symbol_lines = array("q")
+        self.symbol_scopes = array("q")
+        self.symbol_outers = array("q")
+        self.scope_kinds = array("b", [-1])
+        self.scope_records = array("q", [-1])
+        self.scope_parents = array("q", [-1])
+        self.scope_symbols = [{}]
+        self.scope = 0     # the scope declarations and lookups are in
+        self.references = {}
+
+    def __len__(self):
+        return len(self.symbol_names)
+
+    def intern(self, name):
+        id = self.ids.get(name)
+        if id is None:
+            id = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.visible.append(-1)
+        return id
+
+    def enter(self, kind, record):
+        """Opens the scope of a block's body inside the current scope and returns its number."""
+        self.scope_kinds.append(kind)
+        self.scope_records.append(record)
+        self.scope_parents.append(self.scope)
+        self.scope_symbols.append({})
+        self.scope = len(self.scope_kinds) - 1
+        return self.scope
+
+    def exit(self):
+        """Leaves the current scope: the names it declared show what they hid again."""
+        visible, outers = self.visible, self.symbol_outers
+        for id, symbol in self.scope_symbols[self.scope].items():
+            visible[id] = outers[symbol]
+        self.scope = self.scope_parents[self.scope]
+
+    def lookup(self, name):
+        """The symbol `name` refers to in the current scope, or None."""
+        id = self.ids.get(name)
+        if id is None or self.visible[id] < 0:
+            return None
+        return self.visible[id]
+
+    def declare(self, name, type, position, line):
+        """
+        Declares `name` in the current scope and returns (symbol, clash): clash is the
+        symbol the name already has there (the declaration is then ignored) or in an
+        enclosing scope (now hidden), else None. An undeclared entry is simply replaced.
+        """
+        id = self.intern(name)
+        scope = self.scope
+        outer = self.visible[id]
+        if outer >= 0 and self.symbol_scopes[outer] == scope:
+            if self.symbol_types[outer] is not None:
+                return outer, outer
+            outer = self.symbol_outers[outer]
+        symbol = len(self.symbol_names)
+        self.symbol_names.append(id)
+        self.symbol_types.append(type)
+        self.symbol_positions.append(position)
+        self.symbol_lines.append(line)
+        self.symbol_scopes.append(scope)
+        self.symbol_outers.append(outer)
+        self.scope_symbols[scope][id] = symbol
+        self.visible[id] = symbol
+        if outer < 0 or self.symbol_types[outer] is None:
+            return symbol, None
+        return symbol, outer
+
+    def symbol(self, index):
+        outer = self.symbol_outers[index]
+        return Symbol(index, self.names[self.symbol_names[index]], self.symbol_types[index],
+                      self.symbol_positions[index], self.symbol_lines[index], self.symbol_scopes[index],
+                      None if outer < 0 else outer)
+
+    def depth(self, scope):
+        """Number of scopes enclosing `scope`."""
+        depth = 0
+        while scope > 0:
+            scope = self.scope_parents[scope]
+            depth += 1
+        return depth
+
+
+def check(tree):
+    """
+    Checks the variables of a parsed program (a Parser's SyntaxTree). Returns the
+    SymbolTable, with every scope and resolved use, and the list of Diagnostics.
+    """
+    tokens = tree.tokens
+    kinds, starts, ends, sizes = tree.kinds, tree.starts, tree.ends, tree.sizes
+    table = SymbolTable()
+    references, lines = table.references, table.symbol_lines
+    diagnostics = []
+    stops = []  # record index each entered scope ends before, innermost last
+
+    def declare(position, type):
+        token = tokens[position]
+        symbol, clash = table.declare(token["value"], type, position, token["line_number"])
+        if clash is not None:
+            code = "redeclared_variable" if clash == symbol else "shadowed_variable"
+            diagnostics.append(Diagnostic(code, token["line_number"], position, position + 1,
+                                          (token["value"], lines[clash])))
+
+    def uses(position, end):
+        while position < end:
+            token = tokens[position]
+            if token["type"] == "IDENTIFIER":
+                symbol = table.lookup(token["value"])
+                if symbol is None:
+                    diagnostics.append(Diagnostic("undeclared_variable", token["line_number"], position,
+                                                  position + 1, (token["value"],)))
+                    symbol = table.declare(token["value"], None, position, token["line_number"])[0]
+                references[position] = symbol
+            position += 1
+
+    for record in range(len(kinds)):
+        while stops and record >= stops[-1]:
+            stops.pop()
+            table.exit()
+        kind, start = kinds[record], starts[record]
+        if kind == DECLARATION:
+            # type name [= value] , name [= value] ... ;
+            type = tokens[start]["value"]
+            declare(start + 1, type)
+            position, end = start + 2, ends[record]
+            while position < end:
+                token_type = tokens[position]["type"]
+                if token_type == "COMMA_DELI":
+                    declare(position + 1, type)
+                    position += 2
+                    continue
+                if token_type == "IDENTIFIER":
+                    uses(position, position + 1)
+                position += 1
+        elif kind in _BLOCKS:
+            end = start
+            if kind == FOR or kind == IF:
+                while tokens[end]["type"] != "OPEN-CURL-BRAC_DELI":
+                    end += 1
+            if kind == IF:
+                uses(start, end)  # the condition is outside the body's scope
+            table.enter(kind, record)
+            stops.append(record + sizes[record] + 1)
+            if kind == FOR:
+                position = start
+                if tokens[start + 2]["type"] in _TYPE_KEYS:
+                    # for ( type name ...: the loop variable belongs to the body's scope
+                    declare(start + 3, tokens[start + 2]["value"])
+                    position = start + 4
+                uses(position, end)
+        else:
+            uses(start, ends[record])
+
+    while stops:
+        stops.pop()
+        table.exit()
+    return table, diagnostics
+
+
+def print_scopes(table, file=sys.stdout):
+    for scope, symbols in enumerate(table.scope_symbols):
+        kind = table.scope_kinds[scope]
+        name = "file" if kind < 0 else f"{KIND_NAMES[kind]} (record {table.scope_records[scope]})"
+        listed = ", ".join(f"{table.symbol_types[symbol] or '?'} {table.names[id]}" for id, symbol in symbols.items())
+        print(f"{'  ' * table.depth(scope)}{name}: {listed}", file=file)
+
+
+def main(argv=None):
+    from main import lex_file
+    from stack_parser import StackParser
+    arg_parser = argparse.ArgumentParser(description="Check the variables of a .cat program.")
+    arg_parser.add_argument("file", help=".cat file to check")
+    arg_parser.add_argument("--symbols", action="store_true", help="print every scope and its symbols")
+    args = arg_parser.parse_args(argv)
+
+    parser = StackParser(lex_file(args.file))
+    errors = []
+    while parser.current_token():
+        errors.extend(parser.parse_statement())
+    table, diagnostics = check(parser.tree)
+    for error in errors + diagnostics:
+        print(error)
+    if args.symbols:
+        print_scopes(table)
+    return 1 if errors or any(diagnostic.severity == "error" for diagnostic in diagnostics) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
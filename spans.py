@@ -0,0 +1,131 @@
+"""
+Span-based tokens.
+
+Tokens record (start, end) offsets into the source buffer instead of their
+text; a value is cut out only when token["value"] is read. Line and column
+numbers come from a LineIndex of line start offsets via bisect, not from
+counters, so unlike lexer() they also count newlines inside /* */ comments.
+"""
+import operator
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, repeat
+
+from dfa_lexer import RAW, scan, token_value
+from main import TOKEN_TYPE_CODES, TOKEN_TYPE_NAMES
+
+
+class LineIndex:
+    """Start offsets of every line of a source text."""
+    def __init__(self, text):
+        self.line_starts = array("q", [0])
+        line_lengths = map(len, text.split("\n")[:-1])
+        self.line_starts.extend(accumulate(map(operator.add, line_lengths, repeat(1))))
+
+    def line_of(self, offset):
+        """1-based line number of a source offset."""
+        return bisect_right(self.line_starts, offset)
+
+    def position(self, offset):
+        """(line, column) of a source offset, both 1-based."""
+        line = bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1] + 1
+
+    def __len__(self):
+        return len(self.line_starts)
+
+
+class SpanToken:
+    """Dict-like view of one token in a SpanTokens list."""
+    __slots__ = ("tokens", "index")
+
+    def __init__(self, tokens, index):
+        self.tokens = tokens
+        self.index = index
+
+    def __getitem__(self, key):
+        if key == "type":
+            return self.tokens.type_names[self.tokens.kinds[self.index]]
+        if key == "value":
+            return self.tokens.value_at(self.index)
+        if key == "line_number":
+            return self.tokens.line_at(self.index)
+        if key == "column":
+            return self.tokens.position_at(self.index)[1]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    @property
+    def start(self):
+        return self.tokens.starts[self.index]
+
+    @property
+    def end(self):
+        return self.tokens.ends[self.index]
+
+    def to_dict(self):
+        return {"type": self["type"], "value": self["value"], "line_number": self["line_number"]}
+
+    def __repr__(self):
+        return f"SpanToken({self['type']!r}, {self.start}, {self.end})"
+
+
+class SpanTokens:
+    """Token kinds plus (start, end) offsets into `source`; text and positions are computed on demand."""
+    def __init__(self, source):
+        self.source = source
+        self.kinds = array("H")
+        self.value_kinds = array("B")  # how the value is cut out of the span (dfa_lexer.RAW, QUOTED, ...)
+        self.starts = array("q")
+        self.ends = array("q")
+        self.type_names = TOKEN_TYPE_NAMES
+        self._line_index = None
+
+    @property
+    def line_index(self):
+        if self._line_index is None:
+            self._line_index = LineIndex(self.source)
+        return self._line_index
+
+    def value_at(self, index):
+        kind = self.value_kinds[index]
+        if kind == RAW:
+            return self.source[self.starts[index]:self.ends[index]]
+        return token_value(self.source, kind, self.starts[index], self.ends[index])
+
+    def line_at(self, index):
+        return self.line_index.line_of(self.starts[index])
+
+    def position_at(self, index):
+        return self.line_index.position(self.starts[index])
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.kinds)
+        if not 0 <= index < len(self.kinds):
+            raise IndexError("token index out of range")
+        return SpanToken(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.kinds)):
+            yield SpanToken(self, index)
+
+
+def lex_spans(input_text):
+    """Lexes `input_text` with the DFA engine into SpanTokens; no token text is copied."""
+    tokens = SpanTokens(input_text)
+    kinds, value_kinds, starts, ends = tokens.kinds, tokens.value_kinds, tokens.starts, tokens.ends
+    for token_type, kind, start, end, _ in scan(input_text)[0]:
+        kinds.append(TOKEN_TYPE_CODES[token_type])
+        value_kinds.append(kind)
+        starts.append(start)
+        ends.append(end)
+    return tokens
@@ -0,0 +1,172 @@
+"""
+Parser that handles arbitrarily deep nesting without recursion.
+
+Parser.parse_main_function, parse_if_else, parse_for_loop and the gc branch of
+parse_function_call parse their bodies by calling parse_statement again, so
+every nested block costs Python frames and deep programs hit the recursion
+limit. StackParser parses the same block headers (the Parser.parse_*_header
+methods), but opening a block only pushes a _Block onto an explicit stack.
+parse_statement then runs one loop over the stack until the top-level
+statement is complete.
+
+Errors, recovery, the tokens consumed, the syntax tree and the errors passed
+to on_error (and when) are the same as Parser's, including its quirks:
+
+- a for-loop whose body closes with '}' reports none of the body's errors
+  (parse_for_loop returns None),
+- an unclosed gc body adds "Missing closing Bracket", other unclosed blocks
+  end quietly at the end of the input,
+- an `else` at statement level is reported as unexpected and never consumed,
+  so the parse does not end, exactly as with Parser.
+
+main.parse_tokens() (and so batch.py and daemon.py), cli.py and the vm.py,
+transpile.py, semantic.py and optimizer.py commands parse with it; it
+takes about a fifth longer than Parser on flat programs.
+
+    python stack_parser.py program.cat
+"""
+import sys
+
+from parser import Parser
+from syntax_tree import ELSE, FOR, GC, IF, MAIN
+
+
+class _Block:
+    """
+    An open block: its kind (a syntax_tree record kind), the errors collected for its statement,
+    the line it started on and its open syntax tree record (None when not building a tree).
+    """
+    __slots__ = ("kind", "errors", "line_number", "node")
+
+    def __init__(self, kind, errors, line_number, node):
+        self.kind = kind
+        self.errors = errors
+        self.line_number = line_number
+        self.node = node
+
+
+class StackParser(Parser):
+
+    def __init__(self, tokens, index=None, tree=True, max_errors=None, on_error=None):
+        super().__init__(tokens, index, tree, max_errors, on_error)
+        self.blocks = []  # open blocks, innermost last
+        self.max_depth = 0
+
+    # Block openers: parse the header like Parser does, then push instead of recursing.
+    # Each returns the header's errors; once the body is open they are empty, and
+    # parse_statement() collects the block's errors when it closes.
+
+    def _open(self, kind, errors, line_number, start):
+        self.blocks.append(_Block(kind, errors, line_number, self.open_node(kind, start)))
+        if kind == FOR:
+            self.for_depth += 1
+        self.report(errors)  # the header's, before the body's
+        self.max_depth = max(self.max_depth, len(self.blocks))
+        return []
+
+    def parse_main_function(self):
+        errors = []
+        start = self.current_token_index
+        if not self.parse_main_header(errors):
+            return errors
+        return self._open(MAIN, errors, None, start)
+
+    def parse_for_loop(self):
+        errors = []
+        start = self.current_token_index
+        if not self.parse_for_header(errors):
+            return errors
+        return self._open(FOR, errors, None, start)
+
+    def parse_if_else(self):
+        errors = []
+        line_number = self.current_token()["line_number"]
+        start = self.current_token_index
+        if not self.parse_if_header(errors, line_number):
+            return errors
+        return self._open(IF, errors, line_number, start)
+
+    def parse_function_call(self):
+        token = self.current_token()
+        if not token or token["type"] not in ["PRINTF_KEY", "GC_KEY"] or token["value"] != "gc":
+            return super().parse_function_call()
+        errors = []
+        line_number = token["line_number"]
+        start = self.current_token_index
+        self.next_token()
+        if not self.parse_gc_header(errors, line_number):
+            return errors
+        return self._open(GC, errors, line_number, start)
+
+    def _close(self, block, closed):
+        """
+        Finishes `block` after its '}' (closed) or at the end of the input. Returns what the
+        recursive Parser method would have returned, or None when an else-body was opened instead.
+        """
+        self.close_node(block.node)
+        if block.kind == IF:
+            token = self.current_token()
+            if token and token["type"] == "ELSE_KEY":
+                start = self.current_token_index
+                if not self.parse_else_header(block.errors, block.line_number):
+                    return block.errors
+                self._open(ELSE, block.errors, block.line_number, start)
+                return None
+            return block.errors
+        if block.kind == FOR:
+            self.for_depth -= 1
+            if closed:
+                return None
+            if not self.for_depth:
+                self.error_count += len(block.errors)
+            return block.errors
+        if block.kind == GC and not closed:
+            block.errors.append(self.error("gc_unclosed", block.line_number))
+        return block.errors
+
+    def parse_statement(self):
+        """Parses one statement, including every block nested in it, and returns its errors."""
+        if self.blocks:
+            # Called from inside the loop below: dispatch a single statement
+            return super().parse_statement()
+
+        blocks = self.blocks
+        errors = super().parse_statement()
+        while blocks:
+            token = self.current_token()
+            if token and token["type"] != "CLOSE-CURL-BRAC_DELI":
+                block = blocks[-1]
+                result = super().parse_statement()
+                if blocks[-1] is block:
+                    self.report(block.errors, result)
+                continue
+
+            if token:
+                self.next_token()  # Move past '}'
+            block = blocks.pop()
+            result = self._close(block, closed=token is not None)
+            if blocks and blocks[-1].errors is block.errors:
+                continue  # the if-block continued into its else-body
+            statement_errors = []
+            if result:
+                statement_errors.extend(result)
+            if blocks:
+                self.report(blocks[-1].errors, statement_errors)
+            else:
+                errors = statement_errors
+        return errors
+
+
+if __name__ == "__main__":
+    from main import lex_file
+    if len(sys.argv) != 2:
+        print("Usage: python stack_parser.py <file.cat>")
+        sys.exit(2)
+    tokens = lex_file(sys.argv[1])
+    parser = StackParser(tokens)
+    errors = []
+    while parser.current_token():
+        errors.extend(parser.parse_statement())
+    for error in errors:
+        print(error)
+    print(f"{len(errors)} errors, nesting depth {parser.max_depth}")
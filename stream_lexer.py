@@ -0,0 +1,54 @@
+"""
+Streaming lexer: yields tokens from a file handle while reading it in chunks.
+
+Tokens are the same dicts main.lexer() builds. Only the unfinished tail of the
+previous chunk is kept between reads, so memory stays bounded by the chunk size
+(or by the longest single token, e.g. a huge /* */ comment).
+"""
+from dfa_lexer import RAW, scan, token_value
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # characters per read
+
+
+def iter_tokens(fileobj, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields token dicts from a text-mode file object as soon as they are complete.
+
+    A token that reaches the end of the current buffer (an identifier, number,
+    operator, comment or string cut by the chunk boundary) is carried over and
+    scanned again once the next chunk has been read.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive number of characters")
+
+    carry = ""
+    origin = 0  # offset of carry[0] in the whole input
+    line_number = 1
+    prev_type = None
+    read_size = chunk_size
+
+    while True:
+        chunk = fileobj.read(read_size)
+        final = not chunk
+        text = carry + chunk if carry else chunk
+        raw_tokens, pos, line_number, prev_type = scan(text, 0, len(text), line_number, prev_type, final, origin)
+
+        for token_type, kind, start, end, token_line in raw_tokens:
+            yield {"type": token_type,
+                   "value": text[start:end] if kind == RAW else token_value(text, kind, start, end),
+                   "line_number": token_line}
+
+        if final:
+            return
+
+        carry = text[pos:]
+        origin += pos
+        # A token longer than a chunk (e.g. a long comment) is read in growing steps
+        # so it is not rescanned from its start after every chunk.
+        read_size = max(chunk_size, len(carry))
+
+
+def lex_file(filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields the tokens of a .cat file without reading the whole file into memory."""
+    with open(filename, "r") as file:
+        yield from iter_tokens(file, chunk_size)
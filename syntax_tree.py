@@ -0,0 +1,396 @@
+"""
+Syntax tree of a parsed program.
+
+Parser records every statement it parses in a SyntaxTree: parallel arrays
+with one entry per statement, in source order (preorder), so building the
+tree costs a few array appends per statement and no objects:
+
+    kinds[i]    MAIN, GC, DECLARATION, FOR, IF, ELSE, PRINTF, RETURN or DECREMENT
+    starts[i]   index of the statement's first token
+    ends[i]     one past its last token, so tokens[starts[i]:ends[i]] is its source
+    sizes[i]    records in its body (0 for statements without one); they follow it
+
+A statement gets a record once it has parsed without error up to its body,
+so a block whose body has errors is still in the tree and a statement
+abandoned earlier is not. Comments have no record. An else-body is an ELSE
+record right after its IF, in the same body.
+
+Names, operators and values are not copied: statements() reads them from the
+tokens and returns the tree as node objects (with __slots__), each with its
+token span, and to_dict() / from_dict() (dumps() / loads() for JSON) turn
+those into plain data for other passes and processes:
+
+    Main(body)                                  int main() { ... }
+    Gc(body)                                    gc() { ... }
+    Declaration(type, variables)                int a = 1, b;  (variables are Assignments)
+    Assignment(name, operator, value)           a = 1, b, i++ (operator and value may be None)
+    For(init_type, init, condition, update, body)
+    If(condition, body, else_body)              else_body is None without an else
+    Condition(left, operator, right)            i < 10
+    Printf(format, arguments)
+    Return(value)
+    Decrement(name)                             a--;
+    Value(kind, text)                           one operand token: kind is its token type
+
+    python syntax_tree.py program.cat           # prints the tree as JSON
+"""
+import json
+import sys
+from array import array
+
+MAIN, GC, DECLARATION, FOR, IF, ELSE, PRINTF, RETURN, DECREMENT = range(9)
+KIND_NAMES = ("Main", "Gc", "Declaration", "For", "If", "Else", "Printf", "Return", "Decrement")
+
+_TYPE_KEYS = {"INT_KEY", "FLOAT_KEY", "DOUBLE_KEY", "CHAR_KEY", "BOOL_KEY", "STRING_KEY"}
+_VALUE_OPERATORS = {"ASSIGN_OP", "PLUS-ASSIGN_OP", "MINUS-ASSIGN_OP", "MULTI-ASSIGN_OP", "DIVIDE-ASSIGN_OP",
+                    "MOD-ASSIGN_OP"}
+_STEP_OPERATORS = {"INCRE_OP", "DECRE_OP"}
+
+
+class SyntaxTree:
+    """Statement records of one token list; see the module docstring."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.kinds = array("B")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.sizes = array("q")
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def add(self, kind, start, end):
+        """Appends the record of a statement without a body."""
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.sizes.append(0)
+
+    def open(self, kind, start):
+        """Appends the record of a block, whose body's records follow; returns it for close()."""
+        record = len(self.kinds)
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.ends.append(-1)
+        self.sizes.append(0)
+        return record
+
+    def close(self, record, end):
+        """Ends an open block at token `end`: the records added since open() are its body."""
+        self.ends[record] = end
+        self.sizes[record] = len(self.kinds) - record - 1
+
+    def records(self, first, stop):
+        """Copies of records first..stop-1 as (kinds, starts, ends, sizes), for extend()."""
+        return self.kinds[first:stop], self.starts[first:stop], self.ends[first:stop], self.sizes[first:stop]
+
+    def extend(self, records, delta=0):
+        """Appends what records() returned, with the spans moved by `delta` tokens."""
+        kinds, starts, ends, sizes = records
+        if delta:
+            starts = map(delta.__add__, starts)
+            ends = map(delta.__add__, ends)
+        self.kinds.extend(kinds)
+        self.starts.extend(starts)
+        self.ends.extend(ends)
+        self.sizes.extend(sizes)
+
+    def children(self, record=None):
+        """Indices of the top-level records, or of the records directly in the body of `record`."""
+        sizes = self.sizes
+        if record is None:
+            position, stop = 0, len(sizes)
+        else:
+            position, stop = record + 1, record + 1 + sizes[record]
+        while position < stop:
+            yield position
+            position += sizes[position] + 1
+
+    def statements(self):
+        """The top-level statements as node objects; an ELSE record becomes the else_body of its If."""
+        kinds, ends, sizes = self.kinds, self.ends, self.sizes
+        statements = []
+        bodies = [(len(kinds), statements)]  # (end of the body's records, its node list), innermost last
+        for record in range(len(kinds)):
+            while record >= bodies[-1][0]:
+                bodies.pop()
+            body = bodies[-1][1]
+            if kinds[record] == ELSE:
+                node = body[-1]
+                node.end = ends[record]
+                node.else_body = []
+                nested = node.else_body
+            else:
+                node = self.node(record)
+                body.append(node)
+                nested = getattr(node, "body", None)
+            if sizes[record]:
+                bodies.append((record + sizes[record] + 1, nested))
+        return statements
+
+    def node(self, record):
+        """The node object of one record, with an empty body; statements() fills bodies in."""
+        kind, start, end = self.kinds[record], self.starts[record], self.ends[record]
+        tokens = self.tokens
+        if kind == DECLARATION:
+            variables = [self._assignment(start + 1)]
+            while tokens[variables[-1].end]["type"] == "COMMA_DELI":
+                variables.append(self._assignment(variables[-1].end + 1))
+            return Declaration(start, end, tokens[start]["value"], variables)
+        if kind == FOR:
+            position = start + 2  # after 'for ('
+            init_type = None
+            if tokens[position]["type"] in _TYPE_KEYS:
+                init_type = tokens[position]["value"]
+                position += 1
+            init = self._assignment(position)
+            condition = self._condition(init.end + 1)
+            update = self._assignment(condition.end + 1)
+            return For(start, end, init_type, init, condition, update, [])
+        if kind == IF:
+            return If(start, end, self._condition(start + 2), [], None)
+        if kind == PRINTF:
+            # printf ( format , argument , argument ) ;
+            return Printf(start, end, self._value(start + 2), [self._value(i) for i in range(start + 4, end - 2, 2)])
+        if kind == RETURN:
+            return Return(start, end, self._value(start + 1))
+        if kind == DECREMENT:
+            return Decrement(start, end, tokens[start]["value"])
+        if kind == MAIN:
+            return Main(start, end, [])
+        if kind == GC:
+            return Gc(start, end, [])
+        raise ValueError(f"❌ No node for a {KIND_NAMES[kind]} record on its own")
+
+    def _value(self, position):
+        token = self.tokens[position]
+        return Value(position, position + 1, token["type"], token["value"])
+
+    def _assignment(self, position):
+        """A name, then `= value`, `++` or the like if the parser accepted one there."""
+        tokens = self.tokens
+        name = tokens[position]["value"]
+        operator = tokens[position + 1]
+        if operator["type"] in _VALUE_OPERATORS:
+            return Assignment(position, position + 3, name, operator["value"], self._value(position + 2))
+        if operator["type"] in _STEP_OPERATORS:
+            return Assignment(position, position + 2, name, operator["value"], None)
+        return Assignment(position, position + 1, name, None, None)
+
+    def _condition(self, position):
+        return Condition(position, position + 3, self._value(position), self.tokens[position + 1]["value"],
+                         self._value(position + 2))
+
+
+class Node:
+    """Base of the node objects: the token span and the generic comparison."""
+    __slots__ = ("start", "end")
+    fields = ()
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.start == other.start and self.end == other.end and \
+            all(getattr(self, name) == getattr(other, name) for name in self.fields)
+
+    __hash__ = None
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.fields)
+        return f"{type(self).__name__}[{self.start}:{self.end}]({values})"
+
+
+class Main(Node):
+    __slots__ = ("body",)
+    fields = __slots__
+
+    def __init__(self, start, end, body):
+        self.start = start
+        self.end = end
+        self.body = body
+
+
+class Gc(Node):
+    __slots__ = ("body",)
+    fields = __slots__
+
+    def __init__(self, start, end, body):
+        self.start = start
+        self.end = end
+        self.body = body
+
+
+class Declaration(Node):
+    __slots__ = ("type", "variables")
+    fields = __slots__
+
+    def __init__(self, start, end, type, variables):
+        self.start = start
+        self.end = end
+        self.type = type
+        self.variables = variables
+
+
+class Assignment(Node):
+    __slots__ = ("name", "operator", "value")
+    fields = __slots__
+
+    def __init__(self, start, end, name, operator, value):
+        self.start = start
+        self.end = end
+        self.name = name
+        self.operator = operator
+        self.value = value
+
+
+class For(Node):
+    __slots__ = ("init_type", "init", "condition", "update", "body")
+    fields = __slots__
+
+    def __init__(self, start, end, init_type, init, condition, update, body):
+        self.start = start
+        self.end = end
+        self.init_type = init_type
+        self.init = init
+        self.condition = condition
+        self.update = update
+        self.body = body
+
+
+class If(Node):
+    __slots__ = ("condition", "body", "else_body")
+    fields = __slots__
+
+    def __init__(self, start, end, condition, body, else_body):
+        self.start = start
+        self.end = end
+        self.condition = condition
+        self.body = body
+        self.else_body = else_body
+
+
+class Condition(Node):
+    __slots__ = ("left", "operator", "right")
+    fields = __slots__
+
+    def __init__(self, start, end, left, operator, right):
+        self.start = start
+        self.end = end
+        self.left = left
+        self.operator = operator
+        self.right = right
+
+
+class Printf(Node):
+    __slots__ = ("format", "arguments")
+    fields = __slots__
+
+    def __init__(self, start, end, format, arguments):
+        self.start = start
+        self.end = end
+        self.format = format
+        self.arguments = arguments
+
+
+class Return(Node):
+    __slots__ = ("value",)
+    fields = __slots__
+
+    def __init__(self, start, end, value):
+        self.start = start
+        self.end = end
+        self.value = value
+
+
+class Decrement(Node):
+    __slots__ = ("name",)
+    fields = __slots__
+
+    def __init__(self, start, end, name):
+        self.start = start
+        self.end = end
+        self.name = name
+
+
+class Value(Node):
+    __slots__ = ("kind", "text")
+    fields = __slots__
+
+    def __init__(self, start, end, kind, text):
+        self.start = start
+        self.end = end
+        self.kind = kind
+        self.text = text
+
+
+NODE_TYPES = {cls.__name__: cls for cls in
+              (Main, Gc, Declaration, Assignment, For, If, Condition, Printf, Return, Decrement, Value)}
+
+
+def walk(nodes):
+    """Yields every node in `nodes` (a node or a list of them) and below, parents before children."""
+    pending = [nodes] if isinstance(nodes, Node) else list(reversed(nodes))
+    while pending:
+        node = pending.pop()
+        yield node
+        for name in reversed(node.fields):
+            value = getattr(node, name)
+            if isinstance(value, Node):
+                pending.append(value)
+            elif isinstance(value, list):
+                pending.extend(reversed(value))
+
+
+def to_dict(node):
+    """Plain dicts, lists and strings for `node` and everything below it; "node" holds the class name."""
+    data = {"node": type(node).__name__, "start": node.start, "end": node.end}
+    for name in node.fields:
+        value = getattr(node, name)
+        if isinstance(value, Node):
+            value = to_dict(value)
+        elif isinstance(value, list):
+            value = [to_dict(item) for item in value]
+        data[name] = value
+    return data
+
+
+def from_dict(data):
+    """The node to_dict() returned `data` for."""
+    cls = NODE_TYPES[data["node"]]
+    values = []
+    for name in cls.fields:
+        value = data[name]
+        if isinstance(value, dict):
+            value = from_dict(value)
+        elif isinstance(value, list):
+            value = [from_dict(item) for item in value]
+        values.append(value)
+    return cls(data["start"], data["end"], *values)
+
+
+def dumps(nodes, **options):
+    """JSON for a list of statement nodes; `options` go to json.dumps."""
+    return json.dumps([to_dict(node) for node in nodes], **options)
+
+
+def loads(text):
+    """The list of statement nodes dumps() returned `text` for."""
+    return [from_dict(data) for data in json.loads(text)]
+
+
+if __name__ == "__main__":
+    from main import lex_file
+    from parser import Parser
+    from syntax_tree import dumps  # the node classes Parser's tree builds, not this script's copies
+    if len(sys.argv) != 2:
+        print("Usage: python syntax_tree.py <file.cat>")
+        sys.exit(2)
+    tokens = lex_file(sys.argv[1])
+    parser = Parser(tokens)
+    errors = []
+    while parser.current_token():
+        errors.extend(parser.parse_statement())
+    print(dumps(parser.tree.statements(), indent=2, ensure_ascii=False))
+    for error in errors:
+        print(error, file=sys.stderr)
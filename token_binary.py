@@ -0,0 +1,189 @@
+"""
+Binary token files: a compact alternative to the token CSV.
+
+Layout (little-endian), every section aligned to 8 bytes:
+
+    header         magic "CATTOK", format version, counts and section offsets
+    type names     "\\n"-joined UTF-8 names; token kinds index into them
+    string table   (strings + 1) u64 end offsets, then the UTF-8 blob
+    kinds          u16 per token
+    values         u32 per token, index into the string table
+    line deltas    u8 per token: line - previous line, or 255 = take the next overflow entry
+    line overflow  u32 absolute line numbers for the deltas that did not fit
+
+dump_tokens() writes the format (main.write_tokens_to_binary is the sibling of
+write_tokens_to_csv). load_tokens() maps a file and returns a TokenBuffer
+whose kind and value columns are memoryviews straight into the map, so Parser
+can run over it without building a dict per token.
+
+    python token_binary.py to-binary LexOutput.csv LexOutput.cattok
+    python token_binary.py to-csv LexOutput.cattok LexOutput.csv
+"""
+import csv
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate, islice
+
+from main import write_tokens_to_csv
+from token_buffer import TokenBuffer
+
+MAGIC = b"CATTOK"
+FORMAT_VERSION = 1
+BINARY_EXTENSION = ".cattok"
+
+# magic, version, tokens, type names size, strings, overflow entries, then the section offsets
+_HEADER = struct.Struct("<6sHQQQQ7Q")
+_ESCAPE = 255
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def _aligned(size):
+    return (size + 7) & ~7
+
+
+def _column(typecode, values):
+    column = array(typecode, values)
+    if not _LITTLE_ENDIAN:
+        column.byteswap()
+    return column.tobytes()
+
+
+def encode_tokens(tokens):
+    """Encodes a token list (dicts or a TokenBuffer) in the binary token format."""
+    buffer = tokens if isinstance(tokens, TokenBuffer) else TokenBuffer.from_tokens(tokens)
+
+    type_names = "\n".join(buffer.type_names).encode("utf-8")
+    blobs = [string.encode("utf-8") for string in buffer.strings]
+    string_ends = _column("Q", accumulate(map(len, blobs)))
+    deltas = bytearray()
+    overflow = array("I")
+    previous = 0
+    for line_number in buffer.lines:
+        delta = line_number - previous
+        if 0 <= delta < _ESCAPE:
+            deltas.append(delta)
+        else:
+            deltas.append(_ESCAPE)
+            overflow.append(line_number)
+        previous = line_number
+
+    sections = [type_names, string_ends, b"".join(blobs), _column("H", buffer.kinds),
+                _column("I", buffer.values), bytes(deltas), _column("I", overflow)]
+    offsets = []
+    position = _aligned(_HEADER.size)
+    for section in sections:
+        offsets.append(position)
+        position = _aligned(position + len(section))
+
+    data = bytearray(position)
+    _HEADER.pack_into(data, 0, MAGIC, FORMAT_VERSION, len(buffer), len(type_names), len(blobs), len(overflow),
+                      *offsets)
+    for offset, section in zip(offsets, sections):
+        data[offset:offset + len(section)] = section
+    return bytes(data)
+
+
+def dump_tokens(tokens, filename):
+    """Writes a token list (dicts or a TokenBuffer) to a binary token file."""
+    with open(filename, "wb") as file:
+        file.write(encode_tokens(tokens))
+    return True
+
+
+def _view(data, offset, count, typecode):
+    size = array(typecode).itemsize * count
+    view = memoryview(data)[offset:offset + size]
+    if _LITTLE_ENDIAN:
+        return view.cast(typecode)
+    column = array(typecode, view.tobytes())
+    column.byteswap()
+    return column
+
+
+def _decode_lines(deltas, overflow):
+    lines = array("I")
+    previous = 0
+    start = 0
+    for value in list(overflow) + [None]:
+        escape = deltas.find(_ESCAPE, start) if value is not None else len(deltas)
+        lines.extend(islice(accumulate(deltas[start:escape], initial=previous), 1, None))
+        if value is None:
+            break
+        lines.append(value)
+        previous = value
+        start = escape + 1
+    return lines
+
+
+def decode_tokens(data, name="<bytes>"):
+    """Decodes binary token data (bytes or an mmap) into a read-only TokenBuffer that views it."""
+    if len(data) < _HEADER.size or data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"Not a binary token file: {name}")
+    (_, version, count, types_size, string_count, overflow_count,
+     types_at, ends_at, blob_at, kinds_at, values_at, deltas_at, overflow_at) = _HEADER.unpack_from(data)
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Unsupported binary token file version {version} in {name} (newest is {FORMAT_VERSION}).")
+    sections = ((types_at, types_size), (ends_at, 8 * string_count), (kinds_at, 2 * count), (values_at, 4 * count),
+                (deltas_at, count), (overflow_at, 4 * overflow_count))
+    if any(offset + size > len(data) for offset, size in sections):
+        raise ValueError(f"Truncated binary token file: {name}")
+
+    type_names = data[types_at:types_at + types_size].decode("utf-8").split("\n") if types_size else []
+    string_ends = _view(data, ends_at, string_count, "Q")
+    blob_size = string_ends[-1] if string_count else 0
+    if blob_at + blob_size > len(data):
+        raise ValueError(f"Truncated binary token file: {name}")
+    blob = data[blob_at:blob_at + blob_size]
+    strings = [blob[start:end].decode("utf-8") for start, end in zip([0, *string_ends[:-1]], string_ends)]
+    lines = _decode_lines(data[deltas_at:deltas_at + count], _view(data, overflow_at, overflow_count, "I"))
+    return TokenBuffer(kinds=_view(data, kinds_at, count, "H"), lines=lines,
+                       values=_view(data, values_at, count, "I"), strings=strings, type_names=type_names)
+
+
+def load_tokens(filename):
+    """Maps a binary token file and returns it as a read-only TokenBuffer."""
+    with open(filename, "rb") as file:
+        if os.fstat(file.fileno()).st_size < _HEADER.size:  # mmap cannot map an empty file
+            raise ValueError(f"Not a binary token file: {filename}")
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return decode_tokens(data, filename)
+
+
+def read_tokens_from_csv(filename):
+    """Reads a token CSV in the write_tokens_to_csv layout into a TokenBuffer (malformed rows are skipped)."""
+    buffer = TokenBuffer()
+    with open(filename, mode="r", encoding="utf-8") as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader, None)  # Skip header row
+        for row in reader:
+            if len(row) < 3:
+                print(f"Warning: Skipping malformed CSV row: {row}")
+                continue
+            try:
+                line_number = int(row[0])
+            except ValueError:
+                print(f"Warning: Invalid line number '{row[0]}' in CSV. Skipping row.")
+                continue
+            buffer.append(row[2], row[1], line_number)
+    return buffer
+
+
+def csv_to_binary(csv_filename, binary_filename):
+    """Converts a token CSV into a binary token file."""
+    return dump_tokens(read_tokens_from_csv(csv_filename), binary_filename)
+
+
+def binary_to_csv(binary_filename, csv_filename):
+    """Converts a binary token file into the token CSV layout."""
+    return write_tokens_to_csv(load_tokens(binary_filename), csv_filename)
+
+
+if __name__ == "__main__":
+    commands = {"to-binary": csv_to_binary, "to-csv": binary_to_csv}
+    if len(sys.argv) != 4 or sys.argv[1] not in commands:
+        print("Usage: python token_binary.py (to-binary | to-csv) <input> <output>")
+        sys.exit(2)
+    commands[sys.argv[1]](sys.argv[2], sys.argv[3])
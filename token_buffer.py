@@ -0,0 +1,149 @@
+"""
+Compact struct-of-arrays token store.
+
+A TokenBuffer keeps token kinds as small integers (codes from main.TokenType),
+line numbers as unsigned ints and values as indices into an interned string
+table, instead of one dict per token. Indexing it returns a light TokenView that
+answers token["type"], token["value"] and token["line_number"] like the dicts do,
+so Parser and write_tokens_to_csv work on it unchanged.
+"""
+from array import array
+
+from main import TOKEN_TYPE_NAMES
+
+
+class TokenView:
+    """Read-only, dict-like view of one token in a TokenBuffer."""
+    __slots__ = ("buffer", "index")
+
+    def __init__(self, buffer, index):
+        self.buffer = buffer
+        self.index = index
+
+    def __getitem__(self, key):
+        buffer = self.buffer
+        if key == "type":
+            return buffer.type_names[buffer.kinds[self.index]]
+        if key == "value":
+            return buffer.strings[buffer.values[self.index]]
+        if key == "line_number":
+            return buffer.lines[self.index]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return ("type", "value", "line_number")
+
+    def to_dict(self):
+        return {"type": self["type"], "value": self["value"], "line_number": self["line_number"]}
+
+    def __eq__(self, other):
+        if isinstance(other, (TokenView, dict)):
+            return self.to_dict() == (other.to_dict() if isinstance(other, TokenView) else other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"TokenView({self.to_dict()!r})"
+
+
+class TokenBuffer:
+    """Tokens stored column-wise: kinds in array('H'), lines in array('I'), values interned."""
+    def __init__(self, kinds=None, lines=None, values=None, strings=None, type_names=None):
+        self.kinds = kinds if kinds is not None else array("H")
+        self.lines = lines if lines is not None else array("I")
+        self.values = values if values is not None else array("I")
+        self.strings = strings if strings is not None else []
+        self.type_names = type_names if type_names is not None else list(TOKEN_TYPE_NAMES)
+        self._string_ids = None
+        self._type_codes = None
+        self._last_view = None  # the parser asks for the same token several times in a row
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        """Builds a buffer from an iterable of token dicts (or views)."""
+        buffer = cls()
+        append = buffer.append
+        for token in tokens:
+            append(token["type"], token["value"], token["line_number"])
+        return buffer
+
+    def intern(self, value):
+        """Returns the string-table index of `value`, adding it if needed."""
+        if self._string_ids is None:
+            self._string_ids = {string: index for index, string in enumerate(self.strings)}
+        index = self._string_ids.get(value)
+        if index is None:
+            index = len(self.strings)
+            self.strings.append(value)
+            self._string_ids[value] = index
+        return index
+
+    def type_code(self, token_type):
+        """Returns the integer kind of a token type, registering unknown types (e.g. from old CSVs)."""
+        if self._type_codes is None:
+            self._type_codes = {name: code for code, name in enumerate(self.type_names)}
+        code = self._type_codes.get(token_type)
+        if code is None:
+            code = len(self.type_names)
+            self.type_names.append(token_type)
+            self._type_codes[token_type] = code
+        return code
+
+    def append(self, token_type, value, line_number):
+        self.kinds.append(self.type_code(token_type))
+        self.values.append(self.intern(value))
+        self.lines.append(line_number)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        view = self._last_view
+        if view is not None and view.index == index:
+            return view
+        if index < 0:
+            index += len(self.kinds)
+        if not 0 <= index < len(self.kinds):
+            raise IndexError("token index out of range")
+        view = self._last_view = TokenView(self, index)
+        return view
+
+    def __iter__(self):
+        for index in range(len(self.kinds)):
+            yield TokenView(self, index)
+
+    def type_at(self, index):
+        return self.type_names[self.kinds[index]]
+
+    def value_at(self, index):
+        return self.strings[self.values[index]]
+
+    def line_at(self, index):
+        return self.lines[index]
+
+    def to_dicts(self):
+        """Materializes the tokens as the dicts main.lexer() returns."""
+        type_names = self.type_names
+        strings = self.strings
+        return [{"type": type_names[kind], "value": strings[value], "line_number": line}
+                for kind, value, line in zip(self.kinds, self.values, self.lines)]
+
+
+def lex_to_buffer(input_text):
+    """Lexes `input_text` with the DFA engine straight into a TokenBuffer, without token dicts."""
+    from dfa_lexer import RAW, scan, token_value
+
+    buffer = TokenBuffer()
+    kinds, values, lines = buffer.kinds, buffer.values, buffer.lines
+    type_code, intern = buffer.type_code, buffer.intern
+    for token_type, kind, start, end, line_number in scan(input_text)[0]:
+        value = input_text[start:end] if kind == RAW else token_value(input_text, kind, start, end)
+        kinds.append(type_code(token_type))
+        values.append(intern(value))
+        lines.append(line_number)
+    return buffer
@@ -0,0 +1,420 @@
+"""
+Python backend: transpiles .cat programs to Python code objects, cached on disk.
+
+transpile() turns a parsed program (a Parser's SyntaxTree) into the source
+of a Python module defining one function, and load() compiles that with
+compile() and keeps the code object in a cache directory, in the spirit of
+.pyc files: an unchanged program runs again straight from the cache,
+without lexing, parsing, checking or generating anything.
+
+The program means what it means to the VM (vm.py), whose compiler checks
+it first, so both backends reject the same programs and print the same
+output:
+
+    variables       each symbol of semantic.check()'s table is its own Python local, named
+                    name_<symbol>, so the scopes of main, gc, if, else and for bodies are
+                    already resolved and blocks need no Python scope of their own
+    declarations    assignments, with the VM's conversions and C int division (helpers of
+                    _PRELUDE); every local starts at its type's zero value
+    for             init, then `while condition:` with the update at the end of the body
+    if / else       if / else
+    printf          appends to a list that is written out in one piece when the program
+                    ends, also when it fails
+    return          return
+
+Runtime failures raise vm.ExecutionError with the .cat line, taken from the
+traceback through the line map that comes with each code object.
+
+Python limits how deeply blocks nest (20 loops, 100 indentation levels);
+a program past that gets a nesting_limit error from compile_text(), as
+vm.py runs it.
+
+Cache entries are named by a SHA-256 of the source text, the versions of
+the passes that decide the code (lexer, parser, semantic.check(), the VM
+compiler whose checks it follows, and the transpiler) and Python's bytecode
+magic number (code objects do not carry across Python versions). Each is
+one file: the magic number, then marshal data of (code object, line map,
+warnings as to_dict()s). Only programs without errors are cached; a hit
+returns their warnings as the first compile did.
+
+    python transpile.py program.cat             # runs it, through the cache
+    python transpile.py program.cat --source    # prints the generated Python instead
+"""
+import argparse
+import hashlib
+import importlib.util
+import marshal
+import math
+import os
+import sys
+import tempfile
+
+from diagnostics import Diagnostic
+from semantic import SEMANTIC_VERSION, check
+from syntax_tree import DECLARATION, DECREMENT, ELSE, FOR, IF, PRINTF, RETURN
+from vm import (ADD, COMPILER_VERSION, DIVIDE, INT_DIVIDE, INT_MODULO, MODULO, MULTIPLY, POWER, ROOT, SUBTRACT,
+                ZERO_VALUES, ExecutionError, compile_program, converter, literal, operation, printf_format)
+
+# Bump when the generated code or the cache file format changes; source_key() keys on it
+TRANSPILER_VERSION = 2
+DEFAULT_CODE_CACHE = os.path.join(".catharsis_cache", "code")
+
+_FUNCTION = "_program"
+# What the generated code calls; ValueErrors carry the runtime error's message
+_PRELUDE = '''\
+from math import fmod as _fmod_float
+
+
+def _idiv(left, right):
+    quotient = abs(left) // abs(right)
+    return quotient if (left < 0) == (right < 0) else -quotient
+
+
+def _imod(left, right):
+    remainder = abs(left) % abs(right)
+    return -remainder if left < 0 else remainder
+
+
+def _fmod(left, right):
+    if not right:
+        raise ZeroDivisionError
+    return _fmod_float(left, right)
+
+
+def _power(left, right):
+    result = float(left) ** right
+    if type(result) is complex:
+        raise ValueError("Fractional power of a negative number.")
+    return result
+
+
+def _root(left, right):
+    if left < 0:
+        raise ValueError("Root of a negative number.")
+    return float(left) ** (1 / right)
+
+
+def _format(template, values):
+    try:
+        return template % values
+    except (TypeError, ValueError):
+        raise ValueError("The printf arguments do not match the format.") from None
+'''
+_OPERATIONS = {ADD: "{} + {}", SUBTRACT: "{} - {}", MULTIPLY: "{} * {}", DIVIDE: "{} / {}", INT_DIVIDE: "_idiv({}, {})",
+               MODULO: "_fmod({}, {})", INT_MODULO: "_imod({}, {})", POWER: "_power({}, {})", ROOT: "_root({}, {})"}
+_TYPE_KEYS = {"INT_KEY", "FLOAT_KEY", "DOUBLE_KEY", "CHAR_KEY", "BOOL_KEY", "STRING_KEY"}
+_ASSIGN_TYPES = {"ASSIGN_OP", "PLUS-ASSIGN_OP", "MINUS-ASSIGN_OP", "MULTI-ASSIGN_OP", "DIVIDE-ASSIGN_OP",
+                 "MOD-ASSIGN_OP"}
+
+
+def _constant(value):
+    """A Python expression for a constant."""
+    if type(value) is float and not math.isfinite(value):
+        return f"float({str(value)!r})"
+    return repr(value)
+
+
+class _Transpiler:
+    def __init__(self, tree, table):
+        self.tokens = tree.tokens
+        self.tree = tree
+        self.references = table.references
+        self.types = table.symbol_types
+        self.names = [f"{table.names[id]}_{symbol}" for symbol, id in enumerate(table.symbol_names)]
+        self.declared = {position: symbol for symbol, position in enumerate(table.symbol_positions)}
+        self.source = _PRELUDE.splitlines()
+        self.lines = [0] * len(self.source)  # .cat line of each generated line
+        self.line = 0
+        self.depth = 1
+
+    def write(self, text):
+        self.source.append("    " * self.depth + text)
+        self.lines.append(self.line)
+
+    def operand(self, position):
+        """Python expression and static type of one operand token."""
+        token = self.tokens[position]
+        if token["type"] == "IDENTIFIER":
+            symbol = self.references[position]
+            return self.names[symbol], self.types[symbol]
+        value, type = literal(token)
+        return _constant(value), type
+
+    def store(self, symbol, expression, type, constant=None):
+        """Assigns a `type` value to `symbol`'s local; `constant` is its token when it is a literal."""
+        convert = converter(type, self.types[symbol])
+        if convert and constant is not None:
+            expression = _constant(convert(literal(constant)[0]))
+        elif convert:
+            expression = f"{convert.__name__}({expression})"
+        self.write(f"{self.names[symbol]} = {expression}")
+
+    def assign(self, symbol, position, declaring=False):
+        """`name op value` with the operator at `position`; a declaration starts from the zero value."""
+        operator = self.tokens[position]["value"]
+        expression, type = self.operand(position + 1)
+        if operator == "=":
+            value = self.tokens[position + 1]
+            self.store(symbol, expression, type, None if value["type"] == "IDENTIFIER" else value)
+            return
+        left = _constant(ZERO_VALUES[self.types[symbol]]) if declaring else self.names[symbol]
+        op, type = operation(operator[0], self.types[symbol], type)
+        self.store(symbol, _OPERATIONS[op].format(left, expression), type)
+
+    def condition(self, position):
+        left = self.operand(position)[0]
+        operator = self.tokens[position + 1]["value"]
+        right = self.operand(position + 2)[0]
+        return f"{left} {'and' if operator == '&&' else 'or' if operator == '||' else operator} {right}"
+
+    def declaration(self, start, end):
+        # type name [op value] , name [op value] ... ;
+        tokens, position = self.tokens, start + 1
+        while position < end:
+            symbol = self.declared[position]
+            if tokens[position + 1]["type"] in _ASSIGN_TYPES:
+                self.assign(symbol, position + 1, declaring=True)
+                position += 3
+            else:
+                self.write(f"{self.names[symbol]} = {_constant(ZERO_VALUES[self.types[symbol]])}")
+                position += 1
+            position += 1  # the ',' or ';'
+
+    def for_header(self, start):
+        """Writes a for loop's initialization and `while`; returns the update's position."""
+        tokens, position = self.tokens, start + 2
+        typed = tokens[position]["type"] in _TYPE_KEYS
+        if typed:
+            position += 1
+        symbol = self.declared[position] if typed else self.references[position]
+        if tokens[position + 1]["type"] in _ASSIGN_TYPES:
+            self.assign(symbol, position + 1)
+            position += 3
+        else:
+            if typed:
+                self.write(f"{self.names[symbol]} = {_constant(ZERO_VALUES[self.types[symbol]])}")
+            position += 1
+        self.write(f"while {self.condition(position + 1)}:")
+        return position + 5
+
+    def update(self, position):
+        tokens = self.tokens
+        if tokens[position]["type"] != "IDENTIFIER":
+            return
+        symbol = self.references[position]
+        if tokens[position + 1]["type"] in _ASSIGN_TYPES:
+            self.assign(symbol, position + 1)
+        elif tokens[position + 1]["value"] in ("++", "--"):
+            self.write(f"{self.names[symbol]} {tokens[position + 1]['value'][0]}= 1")
+
+    def printf(self, start, end):
+        # printf ( format [, argument]... ) ;
+        template, count = printf_format(literal(self.tokens[start + 2])[0])
+        arguments = [self.operand(position) for position in range(start + 4, end - 2, 2)]
+        if count:
+            values = ", ".join(expression for expression, _ in arguments[:count])
+            parts = [f"_format({template!r}, ({values},))"]
+        else:
+            parts = [repr(template % ())]
+        for expression, type in arguments[count:]:
+            if type == "bool":
+                parts.append(f'("true" if {expression} else "false")')
+            else:
+                parts.append(expression if type in ("char", "string") else f"str({expression})")
+        self.write(f"_emit({' + '.join(parts)})")
+
+    def close(self, update, opened):
+        """Closes a block's body, opened when the source had `opened` lines; one that wrote nothing gets a `pass`."""
+        if update is not None:
+            self.update(update)
+        elif len(self.source) == opened:
+            self.write("pass")  # an empty body, or one of gc() blocks and nothing else
+        self.depth -= 1
+
+    def transpile(self):
+        tree, tokens = self.tree, self.tokens
+        kinds, starts, ends, sizes = tree.kinds, tree.starts, tree.ends, tree.sizes
+        self.source += ["", "", f"def {_FUNCTION}(_write):"]
+        self.lines += [0, 0, 0]
+        self.write("_output = []")
+        self.write("_emit = _output.append")
+        zeros = {}
+        for symbol, type in enumerate(self.types):
+            zeros.setdefault(_constant(ZERO_VALUES[type]), []).append(self.names[symbol])
+        for zero, names in zeros.items():
+            self.write(f"{' = '.join(names)} = {zero}")
+        self.write("try:")
+        self.depth += 1
+        closers = []  # (record the block ends before, update position or None, len(source) then), innermost last
+
+        for record in range(len(kinds)):
+            while closers and record >= closers[-1][0]:
+                self.close(*closers.pop()[1:])
+            kind, start, end = kinds[record], starts[record], ends[record]
+            self.line = tokens[start]["line_number"]
+            if kind == DECLARATION:
+                self.declaration(start, end)
+            elif kind == FOR:
+                update = self.for_header(start)
+                self.depth += 1
+                closers.append((record + sizes[record] + 1, update, len(self.source)))
+            elif kind == IF or kind == ELSE:
+                self.write(f"if {self.condition(start + 2)}:" if kind == IF else "else:")
+                self.depth += 1
+                closers.append((record + sizes[record] + 1, None, len(self.source)))
+            elif kind == PRINTF:
+                self.printf(start, end)
+            elif kind == RETURN:
+                self.write(f"return {self.operand(start + 1)[0]}")
+            elif kind == DECREMENT:
+                self.write(f"{self.names[self.references[start]]} -= 1")
+            # MAIN and GC bodies run in place: their names are already distinct locals
+        while closers:
+            self.close(*closers.pop()[1:])
+        self.write("pass")
+        self.depth -= 1
+        self.write("finally:")
+        self.write('    _write("".join(_output))')
+        return "\n".join(self.source) + "\n", self.lines
+
+
+def transpile(tree):
+    """
+    Python source of a parsed program (a Parser's SyntaxTree). Returns (source, lines,
+    diagnostics): lines[i] is the .cat line of source line i + 1, and source is None when
+    the semantic findings or the VM compiler's errors include an error.
+    """
+    table, diagnostics = check(tree)
+    if any(diagnostic.severity == "error" for diagnostic in diagnostics):
+        return None, None, diagnostics
+    program, errors = compile_program(tree, table)
+    if program is None:
+        return None, None, diagnostics + errors
+    source, lines = _Transpiler(tree, table).transpile()
+    return source, lines, diagnostics
+
+
+def source_key(text):
+    """Cache key of a program's source text under the current lexer, parser, checks and transpiler."""
+    from main import LEXER_VERSION
+    from parser import PARSER_VERSION
+    versions = (f"lexer {LEXER_VERSION} parser {PARSER_VERSION} semantic {SEMANTIC_VERSION} "
+                f"compiler {COMPILER_VERSION} transpiler {TRANSPILER_VERSION}\n")
+    digest = hashlib.sha256(versions.encode("ascii") + importlib.util.MAGIC_NUMBER)
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _transpile_text(text):
+    from dfa_lexer import lexer
+    from stack_parser import StackParser
+    parser = StackParser(lexer(text))
+    errors = []
+    while parser.current_token():
+        errors.extend(parser.parse_statement())
+    if errors:
+        return None, None, errors
+    return transpile(parser.tree)
+
+
+def compile_text(text, filename="<cat>"):
+    """Lexes, parses and transpiles a program's text and compile()s it: (code, lines, errors); code is None on errors."""
+    source, lines, diagnostics = _transpile_text(text)
+    if source is None:
+        return None, None, diagnostics
+    try:
+        code = compile(source, f"<transpiled {filename}>", "exec")
+    except (SyntaxError, RecursionError, MemoryError) as error:
+        # too many nested blocks for Python; the source is otherwise valid
+        line = getattr(error, "lineno", None)
+        line = lines[line - 1] if line and line <= len(lines) else 0
+        limit = Diagnostic("nesting_limit", line, 0, 0, (getattr(error, "msg", None) or str(error),))
+        return None, None, diagnostics + [limit]
+    return code, lines, diagnostics
+
+
+def load(text, filename="<cat>", cache=DEFAULT_CODE_CACHE):
+    """
+    compile_text() through the code cache directory `cache` (None for no cache). Returns
+    (code, lines, errors, hit): on a hit, errors are the program's warnings, read from the
+    cache entry, and nothing was lexed or parsed.
+    """
+    path = None
+    if cache is not None:
+        path = os.path.join(cache, source_key(text) + ".catc")
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            if data[:len(importlib.util.MAGIC_NUMBER)] == importlib.util.MAGIC_NUMBER:
+                code, lines, warnings = marshal.loads(data[len(importlib.util.MAGIC_NUMBER):])
+                return code, lines, [Diagnostic.from_dict(warning) for warning in warnings], True
+        except (OSError, ValueError, EOFError, TypeError):
+            pass  # missing or unreadable: compile it again
+    code, lines, errors = compile_text(text, filename)
+    if code is not None and path is not None:
+        os.makedirs(cache, exist_ok=True)
+        # written under a temporary name and renamed, so readers never see half a file
+        descriptor, temporary = tempfile.mkstemp(dir=cache, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as file:
+            warnings = [error.to_dict() for error in errors]
+            file.write(importlib.util.MAGIC_NUMBER + marshal.dumps((code, lines, warnings)))
+        os.replace(temporary, path)
+    return code, lines, errors, False
+
+
+def run(code, lines, out=None):
+    """Executes a program's code object, printing to `out` (sys.stdout by default); returns its return value."""
+    namespace = {}
+    exec(code, namespace)
+    try:
+        return namespace[_FUNCTION]((sys.stdout if out is None else out).write)
+    except (ArithmeticError, ValueError) as error:
+        line = 0
+        traceback = error.__traceback__
+        while traceback is not None:
+            if traceback.tb_frame.f_code.co_name == _FUNCTION:
+                line = lines[traceback.tb_lineno - 1]
+            traceback = traceback.tb_next
+        if isinstance(error, ZeroDivisionError):
+            message = "Division by zero."
+        elif isinstance(error, OverflowError):
+            message = "Arithmetic overflow."
+        else:
+            message = str(error)
+        raise ExecutionError(line, message) from None
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Run a .cat program as Python, through a code cache.")
+    arg_parser.add_argument("file", help=".cat file to run")
+    arg_parser.add_argument("--source", action="store_true", help="print the generated Python instead of running it")
+    arg_parser.add_argument("--cache", default=DEFAULT_CODE_CACHE, help="code cache directory")
+    arg_parser.add_argument("--no-cache", action="store_true", help="compile without reading or writing the cache")
+    args = arg_parser.parse_args(argv)
+
+    with open(args.file, encoding="utf-8") as file:
+        text = file.read()
+    if args.source:
+        source, _, diagnostics = _transpile_text(text)
+        for error in diagnostics:
+            print(error)
+        if source is None:
+            return 1
+        print(source, end="")
+        return 0
+
+    code, lines, errors, _ = load(text, args.file, None if args.no_cache else args.cache)
+    for error in errors:
+        print(error)
+    if code is None:
+        return 1
+    try:
+        value = run(code, lines)
+    except ExecutionError as error:
+        print(error)
+        return 1
+    return value if type(value) is int else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
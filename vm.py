@@ -0,0 +1,648 @@
+"""
+Bytecode compiler and stack virtual machine: runs .cat programs.
+
+compile_program() turns a parsed program (a Parser's SyntaxTree, checked by
+semantic.check() first) into a Program, and run() executes it. Programs run
+top to bottom in source order; main and gc bodies run where they appear.
+
+    declarations    type name [op value], ...;   op is = or +=, -=, *=, /=, %= applied to the
+                    type's zero value; a name declared without a value is reset to that value
+    for             init; condition; update (i++, i--, i op= value or nothing)
+    if / else       relational conditions, and && / || of two operands
+    printf          C conversions (%d %i %u %f %e %g %x %o %c %s with flags, width and
+                    precision) take the arguments in order; leftover arguments are printed
+                    after the text, as the reference programs use them
+    return value;   stops the program: run() returns the value
+    name--;
+
+Variables are static: every symbol of the SymbolTable gets its own slot,
+numbered by symbol index, so names are resolved once, at compile time.
+Types are checked while compiling: int, float, double and bool values
+convert to one another on store (as in C; int stores truncate toward zero),
+char and string values go in string variables, and `+=` appends to a
+string. Anything else is a compile error Diagnostic (type_mismatch,
+invalid_operands, printf_arguments), and a program with errors of any kind
+gets no Program.
+
+A Program is wordcode: `code` is an array of (opcode, argument) pairs and
+jumps target code offsets. The VM copies it to a list, preallocates its
+value stack (max_stack is computed while compiling) and its slots (filled
+with each type's zero value), and dispatches in one loop whose tests are
+ordered by how often loops execute them. Conditions compile to one
+compare-and-jump instruction and a for loop is laid out with its test at
+the bottom, so each iteration runs one jump.
+
+The instruction set also has POWER (`^`) and ROOT (`a # b` is a to the
+power 1 / b), with the other arithmetic, for expressions: the parser does
+not accept arithmetic expressions, assignment statements or scanf yet, so
+today only compound assignments compile to arithmetic.
+
+    python vm.py program.cat            # compiles and runs it; exits with its return value
+    python vm.py program.cat --dis      # prints the bytecode instead
+    python vm.py program.cat -O         # runs optimizer.optimize() on the tree first
+"""
+import argparse
+import math
+import re
+import sys
+from array import array
+
+from diagnostics import Diagnostic
+from semantic import check
+from syntax_tree import DECLARATION, DECREMENT, ELSE, FOR, IF, PRINTF, RETURN
+
+# Bump when compile_program() changes the programs it accepts or what they mean; transpile's code cache keys on it
+COMPILER_VERSION = 1
+
+(LOAD, LOAD_CONST, STORE, INCREMENT, DECREMENT_SLOT, JUMP, JUMP_IF_TRUE, JUMP_IF_FALSE,
+ JUMP_IF_LESS, JUMP_IF_LESS_EQUAL, JUMP_IF_GREATER, JUMP_IF_GREATER_EQUAL, JUMP_IF_EQUAL, JUMP_IF_NOT_EQUAL,
+ ADD, SUBTRACT, MULTIPLY, DIVIDE, INT_DIVIDE, MODULO, INT_MODULO, POWER, ROOT, AND, OR,
+ CONVERT, PRINT, RETURN_VALUE, HALT) = range(29)
+
+OPNAMES = ("LOAD", "LOAD_CONST", "STORE", "INCREMENT", "DECREMENT", "JUMP", "JUMP_IF_TRUE", "JUMP_IF_FALSE",
+           "JUMP_IF_LESS", "JUMP_IF_LESS_EQUAL", "JUMP_IF_GREATER", "JUMP_IF_GREATER_EQUAL", "JUMP_IF_EQUAL",
+           "JUMP_IF_NOT_EQUAL", "ADD", "SUBTRACT", "MULTIPLY", "DIVIDE", "INT_DIVIDE", "MODULO", "INT_MODULO",
+           "POWER", "ROOT", "AND", "OR", "CONVERT", "PRINT", "RETURN", "HALT")
+_SLOT_OPS = {LOAD, STORE, INCREMENT, DECREMENT_SLOT}
+_JUMP_OPS = set(range(JUMP, JUMP_IF_NOT_EQUAL + 1))
+# Change of stack depth of each opcode (PRINT also pops its arguments; printf() accounts for them)
+_STACK_EFFECTS = (1, 1, -1, 0, 0, 0, -1, -1, -2, -2, -2, -2, -2, -2,
+                  -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 0, 0, -1, 0)
+
+# Operators compare by value: the lexer's relational token types do not match their text
+_COMPARE_JUMPS = {"<": JUMP_IF_LESS, "<=": JUMP_IF_LESS_EQUAL, ">": JUMP_IF_GREATER,
+                  ">=": JUMP_IF_GREATER_EQUAL, "==": JUMP_IF_EQUAL, "!=": JUMP_IF_NOT_EQUAL}
+_NEGATED = {"<": ">=", "<=": ">", ">": "<=", ">=": "<", "==": "!=", "!=": "=="}
+_ARITHMETIC = {"+": ADD, "-": SUBTRACT, "*": MULTIPLY, "/": DIVIDE, "%": MODULO, "^": POWER, "#": ROOT}
+
+_TYPE_KEYS = {"INT_KEY", "FLOAT_KEY", "DOUBLE_KEY", "CHAR_KEY", "BOOL_KEY", "STRING_KEY"}
+# Value operators: "=" and the compound assignments, as the lexer types them
+_ASSIGN_TYPES = {"ASSIGN_OP", "PLUS-ASSIGN_OP", "MINUS-ASSIGN_OP", "MULTI-ASSIGN_OP", "DIVIDE-ASSIGN_OP",
+                 "MOD-ASSIGN_OP"}
+# Static type of each literal token type (a CHAR_KEY or STRING_KEY in value position is a literal)
+_LITERAL_TYPES = {"INTEGER": "int", "FLOAT": "double", "DOUBLE": "double", "STRING_KEY": "string", "CHAR_KEY": "char",
+                  "TRUE_BOOL": "bool", "FALSE_BOOL": "bool"}
+# int and bool are integers, float and double are floats; char and string are text
+_NUMBER_KINDS = {"int": "int", "bool": "int", "float": "float", "double": "float"}
+_TEXT = {"char", "string"}
+_CONVERTERS = (int, float, bool)  # by CONVERT argument
+_TARGET_CONVERTERS = {"int": int, "float": float, "double": float, "bool": bool}
+ZERO_VALUES = {"int": 0, "float": 0.0, "double": 0.0, "bool": False, "char": "", "string": ""}
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "0": "\0", "\\": "\\", "'": "'", '"': '"'}
+_ESCAPE = re.compile(r"\\(.)")
+_SPECIFIER = re.compile(r"%(?:(%)|([-+ 0#]*\d*(?:\.\d+)?)(?:hh|h|ll|l|L)?([diufFeEgGxXosc]))")
+
+
+class ExecutionError(Exception):
+    """A runtime error of a running program, with the source line of the instruction that failed."""
+
+    def __init__(self, line_number, message):
+        super().__init__(f"❌ Runtime Error on line {line_number}: {message}")
+        self.line_number = line_number
+
+
+class Program:
+    """Compiled program; see the module docstring."""
+    __slots__ = ("code", "lines", "constants", "initial", "names", "max_stack")
+
+    def __init__(self, code, lines, constants, initial, names, max_stack):
+        self.code = code            # array of opcode, argument pairs
+        self.lines = lines          # source line of each instruction
+        self.constants = constants
+        self.initial = initial      # starting value of each slot
+        self.names = names          # variable name of each slot, for disassemble()
+        self.max_stack = max_stack
+
+    def __len__(self):
+        return len(self.code) // 2
+
+
+def _unescape(text):
+    return _ESCAPE.sub(lambda match: _ESCAPES.get(match.group(1), match.group(0)), text)
+
+
+def printf_format(text):
+    """A C printf format as a Python %-template, and the number of arguments it converts."""
+    parts, count, last = [], 0, 0
+    for match in _SPECIFIER.finditer(text):
+        parts.append(text[last:match.start()].replace("%", "%%"))
+        if match.group(1):
+            parts.append("%%")
+        else:
+            count += 1
+            conversion = match.group(3)
+            parts.append(f"%{match.group(2)}{'d' if conversion in 'iu' else conversion}")
+        last = match.end()
+    parts.append(text[last:].replace("%", "%%"))
+    return "".join(parts), count
+
+
+def operation(operator, left, right):
+    """Opcode and result type of `left operator right` for values of two static types, or None if it has none."""
+    left_kind, right_kind = _NUMBER_KINDS.get(left), _NUMBER_KINDS.get(right)
+    if left_kind and right_kind:
+        op = _ARITHMETIC[operator]
+        integers = left_kind == right_kind == "int"
+        if integers and op == DIVIDE:
+            op = INT_DIVIDE
+        elif integers and op == MODULO:
+            op = INT_MODULO
+        return op, "int" if integers and op not in (POWER, ROOT) else "double"
+    if operator == "+" and left == "string" and right in _TEXT:
+        return ADD, "string"
+    return None
+
+
+def storable(type, target):
+    """Whether a value of static type `type` can be stored in a `target` variable."""
+    if type in _NUMBER_KINDS:
+        return target in _NUMBER_KINDS
+    return target == type or target == "string" and type in _TEXT
+
+
+def converter(type, target):
+    """int, float or bool for a storable value that changes type on the way in, else None."""
+    if type == target or _NUMBER_KINDS.get(type) == _NUMBER_KINDS.get(target) == "float" or \
+            target not in _NUMBER_KINDS:
+        return None
+    return _TARGET_CONVERTERS[target]
+
+
+def literal(token):
+    """Python value and static type of a literal token (in value position)."""
+    type = _LITERAL_TYPES[token["type"]]
+    if type == "int":
+        return int(token["value"]), type
+    if type == "double":
+        return float(token["value"]), type
+    if type == "bool":
+        return token["type"] == "TRUE_BOOL", type
+    return _unescape(token["value"]), type
+
+
+def evaluate(operator, left, right):
+    """
+    `left operator right` for two constants, as the VM's instructions compute it (ints and
+    bools divide and take remainders as C ints). Raises ArithmeticError or ValueError where
+    the VM has a runtime error, and TypeError for operands it has no instruction for.
+    """
+    integers = type(left) is not float and type(right) is not float
+    if isinstance(left, str) or isinstance(right, str):
+        if operator == "+" and isinstance(left, str) and isinstance(right, str):
+            return left + right
+        raise TypeError(f"{operator} of text")
+    if operator == "+":
+        return left + right
+    if operator == "-":
+        return left - right
+    if operator == "*":
+        return left * right
+    if operator == "/":
+        if not integers:
+            return left / right
+        quotient = abs(left) // abs(right)
+        return quotient if (left < 0) == (right < 0) else -quotient
+    if operator == "%":
+        if not integers:
+            if not right:
+                raise ZeroDivisionError
+            return math.fmod(left, right)
+        remainder = abs(left) % abs(right)
+        return -remainder if left < 0 else remainder
+    if operator == "^":
+        result = float(left) ** right
+    elif operator == "#":
+        if left < 0:
+            raise ValueError("root of a negative number")
+        result = float(left) ** (1 / right)
+    else:
+        raise TypeError(f"no operator {operator}")
+    if type(result) is complex:
+        raise ValueError("fractional power of a negative number")
+    return result
+
+
+def _text(value):
+    """How printf prints a leftover argument."""
+    if value is True or value is False:
+        return "true" if value else "false"
+    return str(value)
+
+
+class _Compiler:
+    def __init__(self, tree, table):
+        self.tokens = tree.tokens
+        self.tree = tree
+        self.table = table
+        self.references = table.references
+        self.types = table.symbol_types
+        self.declared = {position: symbol for symbol, position in enumerate(table.symbol_positions)}
+        self.code = array("q")
+        self.lines = array("q")
+        self.constants = []
+        self.constant_indexes = {}
+        self.diagnostics = []
+        self.line = 0
+        self.depth = self.max_stack = 0
+
+    def emit(self, op, arg=0):
+        """Appends an instruction and returns its code offset."""
+        offset = len(self.code)
+        self.code.append(op)
+        self.code.append(arg)
+        self.lines.append(self.line)
+        self.depth += _STACK_EFFECTS[op]
+        if self.depth > self.max_stack:
+            self.max_stack = self.depth
+        return offset
+
+    def patch(self, offset, target=None):
+        """Points the jump at `offset` to `target` (by default the next instruction)."""
+        self.code[offset + 1] = len(self.code) if target is None else target
+
+    def constant(self, value):
+        key = (type(value), value)
+        index = self.constant_indexes.get(key)
+        if index is None:
+            index = self.constant_indexes[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def error(self, code, position, *args):
+        self.diagnostics.append(Diagnostic(code, self.line, position, position + 1, args))
+
+    def operand(self, position):
+        """Emits the load of one operand token and returns its static type."""
+        token = self.tokens[position]
+        if token["type"] == "IDENTIFIER":
+            symbol = self.references[position]
+            self.emit(LOAD, symbol)
+            return self.types[symbol]
+        value, type = literal(token)
+        self.emit(LOAD_CONST, self.constant(value))
+        return type
+
+    def arithmetic(self, operator, left, right, position):
+        """Emits a binary operator on the two values on the stack and returns the result's type."""
+        result = operation(operator, left, right)
+        if result is None:
+            self.error("invalid_operands", position, operator, f"{left} and {right} values")
+            return left
+        self.emit(result[0])
+        return result[1]
+
+    def store(self, symbol, type, position):
+        """Emits the store of a `type` value into `symbol`'s slot, converting numbers."""
+        target = self.types[symbol]
+        if not storable(type, target):
+            self.error("type_mismatch", position, type, target, self.table.names[self.table.symbol_names[symbol]])
+        elif converter(type, target):
+            self.emit(CONVERT, _CONVERTERS.index(converter(type, target)))
+        self.emit(STORE, symbol)
+
+    def assign(self, symbol, position, declaring=False):
+        """Emits `name op value` with the operator at `position`; a declaration starts from the zero value."""
+        operator = self.tokens[position]["value"]
+        if operator == "=":
+            type = self.operand(position + 1)
+        else:
+            if declaring:
+                self.emit(LOAD_CONST, self.constant(ZERO_VALUES[self.types[symbol]]))
+            else:
+                self.emit(LOAD, symbol)
+            type = self.arithmetic(operator[0], self.types[symbol], self.operand(position + 1), position)
+        self.store(symbol, type, position + 1)
+
+    def reset(self, symbol):
+        self.emit(LOAD_CONST, self.constant(ZERO_VALUES[self.types[symbol]]))
+        self.emit(STORE, symbol)
+
+    def step(self, symbol, position):
+        """Emits `name++` or `name--` with the operator at `position`."""
+        operator, type = self.tokens[position]["value"], self.types[symbol]
+        if type == "bool" or type not in _NUMBER_KINDS:
+            self.error("invalid_operands", position, operator, f"{type} values")
+            return
+        self.emit(INCREMENT if operator == "++" else DECREMENT_SLOT, symbol)
+
+    def condition(self, position, when):
+        """
+        Emits the condition `left op right` starting at token `position` as a jump taken
+        when it is `when` (True or False); returns the jump's offset for patch().
+        """
+        left = self.operand(position)
+        operator = self.tokens[position + 1]["value"]
+        right = self.operand(position + 2)
+        if operator in ("&&", "||"):
+            self.emit(AND if operator == "&&" else OR)
+            return self.emit(JUMP_IF_TRUE if when else JUMP_IF_FALSE)
+        if (left in _NUMBER_KINDS) != (right in _NUMBER_KINDS):
+            self.error("invalid_operands", position + 1, operator, f"{left} and {right} values")
+        return self.emit(_COMPARE_JUMPS[operator if when else _NEGATED[operator]])
+
+    def declaration(self, start, end):
+        # type name [op value] , name [op value] ... ;
+        tokens, position = self.tokens, start + 1
+        while position < end:
+            symbol = self.declared.get(position)  # None for a redeclared name (a semantic error)
+            if tokens[position + 1]["type"] in _ASSIGN_TYPES:
+                if symbol is not None:
+                    self.assign(symbol, position + 1, declaring=True)
+                position += 3
+            else:
+                if symbol is not None:
+                    self.reset(symbol)
+                position += 1
+            position += 1  # the ',' or ';'
+
+    def for_header(self, start):
+        """Emits a for loop's initialization and returns (condition position, update position)."""
+        tokens, position = self.tokens, start + 2
+        typed = tokens[position]["type"] in _TYPE_KEYS
+        if typed:
+            position += 1
+        symbol = self.declared[position] if typed else self.references[position]
+        if tokens[position + 1]["type"] in _ASSIGN_TYPES:
+            self.assign(symbol, position + 1)
+            position += 3
+        else:
+            if typed:
+                self.reset(symbol)
+            position += 1
+        return position + 1, position + 5
+
+    def update(self, position):
+        """Emits a for loop's update (nothing for an empty one)."""
+        tokens = self.tokens
+        if tokens[position]["type"] != "IDENTIFIER":
+            return
+        symbol = self.references[position]
+        if tokens[position + 1]["type"] in _ASSIGN_TYPES:
+            self.assign(symbol, position + 1)
+        elif tokens[position + 1]["value"] in ("++", "--"):
+            self.step(symbol, position + 1)
+
+    def printf(self, start, end):
+        # printf ( format [, argument]... ) ;
+        tokens = self.tokens
+        template, count = printf_format(_unescape(tokens[start + 2]["value"]))
+        arguments = range(start + 4, end - 2, 2)
+        if count > len(arguments):
+            self.error("printf_arguments", start + 2, count, len(arguments))
+        for position in arguments:
+            self.operand(position)
+        self.emit(PRINT, self.constant((template, count, len(arguments))))
+        self.depth -= len(arguments)
+
+    def compile(self):
+        tree, tokens = self.tree, self.tokens
+        kinds, starts, ends, sizes = tree.kinds, tree.starts, tree.ends, tree.sizes
+        closers = []  # (record the block ends before, kind, data), innermost last
+
+        def close():
+            stop, kind, data = closers.pop()
+            if kind == FOR:
+                body, condition, update, line = data
+                self.line = line
+                self.update(update)
+                self.patch(body - 2)  # the JUMP to the test
+                self.patch(self.condition(condition, True), body)
+            elif kind == IF:
+                # an ELSE right after the body is an enclosing if's when that one ends there too
+                if stop < len(kinds) and kinds[stop] == ELSE and not (closers and closers[-1][0] == stop):
+                    closers.append((stop + 1 + sizes[stop], ELSE, self.emit(JUMP)))
+                self.patch(data)
+            elif kind == ELSE:
+                self.patch(data)
+
+        for record in range(len(kinds)):
+            while closers and record >= closers[-1][0]:
+                close()
+            kind, start, end = kinds[record], starts[record], ends[record]
+            self.line = tokens[start]["line_number"]
+            if kind == DECLARATION:
+                self.declaration(start, end)
+            elif kind == FOR:
+                condition, update = self.for_header(start)
+                self.emit(JUMP)
+                closers.append((record + sizes[record] + 1, FOR, (len(self.code), condition, update, self.line)))
+            elif kind == IF:
+                closers.append((record + sizes[record] + 1, IF, self.condition(start + 2, False)))
+            elif kind == PRINTF:
+                self.printf(start, end)
+            elif kind == RETURN:
+                self.operand(start + 1)
+                self.emit(RETURN_VALUE)
+            elif kind == DECREMENT:
+                self.step(self.references[start], start + 1)
+            # MAIN, GC and ELSE bodies need no code of their own (an ELSE's jump comes with its IF)
+        while closers:
+            close()
+        self.emit(HALT)
+
+
+def compile_program(tree, table=None):
+    """
+    Compiles a parsed program (a Parser's SyntaxTree). Returns (program, diagnostics):
+    the semantic findings and compile errors, and the Program, or None if any is an error.
+    `table` is semantic.check()'s SymbolTable when the caller has already run it.
+    """
+    diagnostics = []
+    if table is None:
+        table, diagnostics = check(tree)
+    if any(diagnostic.severity == "error" for diagnostic in diagnostics):
+        return None, diagnostics
+    compiler = _Compiler(tree, table)
+    compiler.compile()
+    diagnostics = diagnostics + compiler.diagnostics
+    if compiler.diagnostics:
+        return None, diagnostics
+    names = [table.names[id] for id in table.symbol_names]
+    initial = [ZERO_VALUES[type] for type in table.symbol_types]
+    return Program(compiler.code, compiler.lines, compiler.constants, initial, names, compiler.max_stack), diagnostics
+
+
+def run(program, out=None):
+    """Executes `program`, printing to `out` (sys.stdout by default); returns its return value, or None."""
+    code = program.code.tolist()
+    constants = program.constants
+    slots = list(program.initial)
+    stack = [None] * (program.max_stack + 1)
+    write = (sys.stdout if out is None else out).write
+    pc = sp = 0
+    try:
+        while True:
+            op = code[pc]
+            arg = code[pc + 1]
+            pc += 2
+            if op == LOAD:
+                stack[sp] = slots[arg]
+                sp += 1
+            elif op == LOAD_CONST:
+                stack[sp] = constants[arg]
+                sp += 1
+            elif op == INCREMENT:
+                slots[arg] += 1
+            elif op == JUMP_IF_LESS:
+                sp -= 2
+                if stack[sp] < stack[sp + 1]:
+                    pc = arg
+            elif op == STORE:
+                sp -= 1
+                slots[arg] = stack[sp]
+            elif op == JUMP_IF_GREATER:
+                sp -= 2
+                if stack[sp] > stack[sp + 1]:
+                    pc = arg
+            elif op == DECREMENT_SLOT:
+                slots[arg] -= 1
+            elif op == JUMP_IF_LESS_EQUAL:
+                sp -= 2
+                if stack[sp] <= stack[sp + 1]:
+                    pc = arg
+            elif op == JUMP_IF_GREATER_EQUAL:
+                sp -= 2
+                if stack[sp] >= stack[sp + 1]:
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == ADD:
+                sp -= 1
+                stack[sp - 1] += stack[sp]
+            elif op == SUBTRACT:
+                sp -= 1
+                stack[sp - 1] -= stack[sp]
+            elif op == MULTIPLY:
+                sp -= 1
+                stack[sp - 1] *= stack[sp]
+            elif op == JUMP_IF_EQUAL:
+                sp -= 2
+                if stack[sp] == stack[sp + 1]:
+                    pc = arg
+            elif op == JUMP_IF_NOT_EQUAL:
+                sp -= 2
+                if stack[sp] != stack[sp + 1]:
+                    pc = arg
+            elif op == INT_DIVIDE:
+                # C division truncates toward zero
+                sp -= 1
+                left, right = stack[sp - 1], stack[sp]
+                quotient = abs(left) // abs(right)
+                stack[sp - 1] = quotient if (left < 0) == (right < 0) else -quotient
+            elif op == INT_MODULO:
+                # the remainder has the dividend's sign
+                sp -= 1
+                left = stack[sp - 1]
+                remainder = abs(left) % abs(stack[sp])
+                stack[sp - 1] = -remainder if left < 0 else remainder
+            elif op == DIVIDE:
+                sp -= 1
+                stack[sp - 1] /= stack[sp]
+            elif op == MODULO:
+                sp -= 1
+                if not stack[sp]:
+                    raise ZeroDivisionError
+                stack[sp - 1] = math.fmod(stack[sp - 1], stack[sp])
+            elif op == JUMP_IF_FALSE:
+                sp -= 1
+                if not stack[sp]:
+                    pc = arg
+            elif op == JUMP_IF_TRUE:
+                sp -= 1
+                if stack[sp]:
+                    pc = arg
+            elif op == AND:
+                sp -= 1
+                stack[sp - 1] = bool(stack[sp - 1] and stack[sp])
+            elif op == OR:
+                sp -= 1
+                stack[sp - 1] = bool(stack[sp - 1] or stack[sp])
+            elif op == CONVERT:
+                stack[sp - 1] = _CONVERTERS[arg](stack[sp - 1])
+            elif op == PRINT:
+                template, count, total = constants[arg]
+                sp -= total
+                values = stack[sp:sp + total]
+                try:
+                    text = template % tuple(values[:count])
+                except (TypeError, ValueError):
+                    raise ExecutionError(program.lines[pc // 2 - 1], "The printf arguments do not match the format.")
+                write(text + "".join(_text(value) for value in values[count:]))
+            elif op == POWER:
+                sp -= 1
+                stack[sp - 1] = float(stack[sp - 1]) ** stack[sp]
+                if type(stack[sp - 1]) is complex:
+                    raise ExecutionError(program.lines[pc // 2 - 1], "Fractional power of a negative number.")
+            elif op == ROOT:
+                sp -= 1
+                if stack[sp - 1] < 0:
+                    raise ExecutionError(program.lines[pc // 2 - 1], "Root of a negative number.")
+                stack[sp - 1] = float(stack[sp - 1]) ** (1 / stack[sp])
+            elif op == RETURN_VALUE:
+                return stack[sp - 1]
+            elif op == HALT:
+                return None
+    except ZeroDivisionError:
+        raise ExecutionError(program.lines[pc // 2 - 1], "Division by zero.") from None
+    except OverflowError:
+        raise ExecutionError(program.lines[pc // 2 - 1], "Arithmetic overflow.") from None
+
+
+def disassemble(program):
+    """The program's instructions as text, one per line: offset, source line, opcode, argument."""
+    lines = []
+    code = program.code
+    for index in range(len(program)):
+        op, arg = code[2 * index], code[2 * index + 1]
+        if op in _SLOT_OPS:
+            note = program.names[arg]
+        elif op == LOAD_CONST or op == PRINT:
+            note = repr(program.constants[arg])
+        elif op in _JUMP_OPS:
+            note = f"to {arg}"
+        else:
+            note = ""
+        lines.append(f"{2 * index:>6} {program.lines[index]:>5}  {OPNAMES[op]:<22}{arg:>6}  {note}".rstrip())
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    from main import lex_file
+    from stack_parser import StackParser
+    arg_parser = argparse.ArgumentParser(description="Compile and run a .cat program.")
+    arg_parser.add_argument("file", help=".cat file to run")
+    arg_parser.add_argument("--dis", action="store_true", help="print the bytecode instead of running it")
+    arg_parser.add_argument("-O", "--optimize", action="store_true", help="optimize the program before compiling it")
+    args = arg_parser.parse_args(argv)
+
+    parser = StackParser(lex_file(args.file))
+    errors = []
+    while parser.current_token():
+        errors.extend(parser.parse_statement())
+    if errors:
+        for error in errors:
+            print(error)
+        return 1
+    program, diagnostics = compile_program(parser.tree)
+    for diagnostic in diagnostics:
+        print(diagnostic)
+    if program is None:
+        return 1
+    if args.optimize:
+        # the errors above are those of the program as written: optimizing may remove the code they are in
+        from optimizer import optimize
+        program = compile_program(optimize(parser.tree)[0])[0]
+    if args.dis:
+        print(disassemble(program))
+        return 0
+    try:
+        value = run(program)
+    except ExecutionError as error:
+        print(error)
+        return 1
+    return value if type(value) is int else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())